@@ -0,0 +1,50 @@
+'''
+Benchmarks cross validated model selection between predictor families.
+
+Usage: python benchmarks/model_selection.py [datapoints] [folds]
+
+Reports cross validated error, mean fit time and mean per-prediction latency
+for each predictor, so that a more accurate model can be checked against the
+cost it adds to the callback thread.
+'''
+import random
+import sys
+import time
+from os import path
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(path.join(path.dirname(path.realpath(__file__)), "../smartclimate"))
+
+from modelselection import select_predictor # pylint: disable=wrong-import-position
+
+def synthetic_datapoints(count, seed=0):
+    '''datapoints following t = 1800(g - s) + 60(s - o) + 900 plus noise'''
+    rng = random.Random(seed)
+    datapoints = []
+    for _ in range(count):
+        start = rng.uniform(14., 20.)
+        target = start + rng.uniform(0.5, 4.)
+        outside = rng.uniform(-5., 15.)
+        duration = 1800*(target - start) + 60*(start - outside) + 900 + rng.gauss(0, 120)
+        datapoints.append({'start_temp': start, 'target_temp': target,
+                           'sensor_readings': [('outside', outside)], 'duration_s': duration})
+    return datapoints
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    folds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    datapoints = synthetic_datapoints(count)
+
+    with ProcessPoolExecutor() as executor:
+        started = time.perf_counter()
+        best, results = select_predictor(datapoints, folds=folds, executor=executor)
+        elapsed = time.perf_counter() - started
+
+    print("{:<12} {:>10} {:>12} {:>14}".format("predictor", "error_s", "fit_time_s", "predict_time_s"))
+    for kind, result in results.items():
+        print("{:<12} {:>10.1f} {:>12.5f} {:>14.7f}".format(
+            kind, result['error_s'], result['fit_time_s'], result['predict_time_s']))
+    print("selected {} from {} datapoints in {:.3f}s".format(best, count, elapsed))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+'''
+Benchmarks predictor fitting and prediction as history and sensor counts grow.
+
+Usage: python benchmarks/predictor_scaling.py [--counts 100,1000,...] [--sensors 0,2,8]
+           [--predictors linear,ridge,...] [--exponential-max 10000] [--output results.json]
+
+Datapoints follow t = 1800(g - s) + 60(s - o) + 900 with further sensors
+adding known coefficients, plus noise. For every predictor, datapoint count
+and sensor count it reports check_ready, fit and prediction times, peak
+memory allocated while fitting, the RMSE of predictions against the noise
+free durations and, from sensitivities(), the largest relative error in the
+learned sensor coefficients. Results are written as JSON with sorted keys
+so runs can be diffed.
+'''
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from os import path
+
+sys.path.append(path.join(path.dirname(path.realpath(__file__)), "../smartclimate"))
+
+# pylint: disable=wrong-import-position
+import numpy as np
+from predictor import PREDICTORS, create_predictor
+
+FORMAT_VERSION = 1
+PREDICT_CALLS = 1000
+
+class _Log:
+    def debug(self, *args, **kwargs):
+        pass
+    info = warning = error = debug
+
+def coefficients(sensors):
+    '''return {sensor name: seconds per unit} for the generated data'''
+    return {'sensor{}'.format(i): -60. if i == 0 else 25. * (-1) ** i * (1 + i % 3) for i in range(sensors)}
+
+def generate(count, sensors, seed=0, noise_s=120.):
+    '''return (datapoints, features, true durations) for count heat-ups'''
+    rng = np.random.default_rng(seed)
+    start = rng.uniform(14., 20., count)
+    target = start + rng.uniform(0.5, 4., count)
+    values = rng.uniform(-5., 15., (count, sensors))
+    coefs = np.array(list(coefficients(sensors).values()))
+    truth = 1800 * (target - start) + 900 + (60 * start if sensors else 0.) + values @ coefs
+    durations = truth + rng.normal(0., noise_s, count)
+    names = list(coefficients(sensors))
+    datapoints = [{'start_temp': float(start[i]), 'target_temp': float(target[i]),
+                   'sensor_readings': list(zip(names, values[i].tolist())), 'duration_s': float(durations[i])}
+                  for i in range(count)]
+    features = np.column_stack([target, start, values])
+    return datapoints, features, truth
+
+def warm_up(kind, sensors):
+    '''fit and predict once, so lazy imports of numpy, scipy and sklearn aren't timed'''
+    datapoints, features, _ = generate(50, sensors, seed=2)
+    predictor = create_predictor(kind, 'benchmark', _Log())
+    predictor.learn(datapoints)
+    predictor.predict_many(features, list(coefficients(sensors)))
+    predictor.prediction_interval(datapoints[0]['target_temp'], datapoints[0]['start_temp'],
+                                  datapoints[0]['sensor_readings'], 0.9)
+
+def run(kind, count, sensors):
+    datapoints, _, _ = generate(count, sensors)
+    test_datapoints, test_features, test_truth = generate(1000, sensors, seed=1, noise_s=0.)
+    names = list(coefficients(sensors))
+    warm_up(kind, sensors)
+    predictor = create_predictor(kind, 'benchmark', _Log())
+
+    started = time.perf_counter()
+    predictor.check_ready(datapoints)
+    check_ready_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    predictor.learn(datapoints)
+    fit_s = time.perf_counter() - started
+
+    calls = [(datapoint['target_temp'], datapoint['start_temp'], datapoint['sensor_readings'])
+             for datapoint in test_datapoints[:PREDICT_CALLS]]
+    started = time.perf_counter()
+    for call in calls:
+        predictor.predict(*call)
+    predict_s = (time.perf_counter() - started) / len(calls)
+
+    started = time.perf_counter()
+    predictions = predictor.predict_many(test_features, names)
+    predict_many_s = time.perf_counter() - started
+
+    error_s = float(np.sqrt(np.mean((np.asarray(predictions, dtype=float) - test_truth) ** 2)))
+    sensitivities = predictor.sensitivities() or {}
+    sensitivity_error = max([abs(sensitivities.get(name, 0.) - abs(coef)) / abs(coef)
+                             for name, coef in coefficients(sensors).items()] or [0.])
+
+    # fit again under tracemalloc, which would distort the timing above
+    predictor = create_predictor(kind, 'benchmark', _Log())
+    tracemalloc.start()
+    predictor.learn(datapoints)
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {'predictor': kind, 'datapoints': count, 'sensors': sensors,
+            'check_ready_s': check_ready_s, 'fit_s': fit_s, 'predict_s': predict_s,
+            'predict_many_s': predict_many_s, 'peak_bytes': peak_bytes,
+            'error_s': error_s, 'sensitivity_error': sensitivity_error}
+
+def versions():
+    import scipy
+    import sklearn
+    return {'python': platform.python_version(), 'numpy': np.__version__,
+            'scipy': scipy.__version__, 'sklearn': sklearn.__version__}
+
+def parse_list(value, convert=str):
+    return [convert(item) for item in value.split(',')]
+
+def parse_count(value):
+    '''int accepting 1e6 style counts'''
+    return int(float(value))
+
+def main():
+    parser = argparse.ArgumentParser(description='Predictor scaling benchmark')
+    parser.add_argument('--counts', default='100,1000,10000,100000,1000000')
+    parser.add_argument('--sensors', default='0,2,8')
+    parser.add_argument('--predictors', default=','.join(PREDICTORS))
+    parser.add_argument('--exponential-max', type=int, default=10000,
+                        help='largest datapoint count for the exponential model, which is far slower to fit')
+    parser.add_argument('--output', default=None, help='file to write JSON to, instead of stdout')
+    args = parser.parse_args()
+
+    results = []
+    for kind in parse_list(args.predictors):
+        for sensors in parse_list(args.sensors, int):
+            for count in parse_list(args.counts, parse_count):
+                if kind == 'exponential' and count > args.exponential_max:
+                    continue
+                result = run(kind, count, sensors)
+                results.append(result)
+                print("{predictor:<12} n={datapoints:<8} sensors={sensors:<3} fit={fit_s:.4f}s "
+                      "predict={predict_s:.7f}s peak={peak_bytes}B error={error_s:.1f}s".format(**result),
+                      file=sys.stderr)
+
+    report = json.dumps({'benchmark': 'predictor_scaling', 'format_version': FORMAT_VERSION,
+                         'versions': versions(), 'results': results}, sort_keys=True, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(report + '\n')
+    else:
+        print(report)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+'''
+Replays a recorded callback log against one zone on FakeHass's virtual clock.
+
+Usage: python benchmarks/replay.py LOG ZONE_CONFIG [--realtime] [--speed 60]
+
+LOG is a file written by a zone with record_callbacks set. ZONE_CONFIG is a
+JSON file with the zone's app args, optionally 'states' holding the initial
+entity states and 'datapoints' to seed the store with. Callbacks are fed as
+fast as possible unless --realtime is given, which keeps the recorded gaps
+divided by --speed. Reports callbacks per second and what the zone wrote.
+'''
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from os import path
+
+sys.path.append(path.join(path.dirname(path.realpath(__file__)), ".."))
+sys.path.append(path.join(path.dirname(path.realpath(__file__)), "../smartclimate"))
+
+# pylint: disable=wrong-import-position
+from callbacklog import read_log
+from zoneimpl import ZoneImpl
+from tests.common import FakeHass, FakeStore
+from tests.replay import replay
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a recorded callback log')
+    parser.add_argument('log')
+    parser.add_argument('config')
+    parser.add_argument('--realtime', action='store_true')
+    parser.add_argument('--speed', type=float, default=1.)
+    args = parser.parse_args()
+
+    with open(args.config) as file:
+        config = json.load(file)
+    records = list(read_log(args.log))
+    if not records:
+        print("{} holds no callbacks".format(args.log))
+        return
+
+    hass = FakeHass()
+    hass.name = config.get('name', 'replay')
+    hass.time = datetime.fromtimestamp(records[0][0])
+    hass.args = dict(config['args'], store='store')
+    hass.args.pop('record_callbacks', None)
+    hass.states.update(config.get('states', {}))
+    store = FakeStore()
+    store.data[hass.name] = {'datapoints': config.get('datapoints', [])}
+    zone = ZoneImpl(hass, store)
+
+    started = time.perf_counter()
+    delivered = replay(hass, records, realtime=args.realtime, speed=args.speed)
+    elapsed = time.perf_counter() - started
+    zone.terminate()
+
+    print("{} records, {} callbacks delivered in {:.2f}s ({:.0f} callbacks/s)".format(
+        len(records), delivered, elapsed, delivered / elapsed if elapsed else float('inf')))
+    print("{} events fired, {} states set".format(len(hass.fired_events), len(hass.set_states)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+'''
+Simulates zones with daily preheat events against FakeHass's virtual clock.
+
+Usage: python benchmarks/simulation.py [days] [zones] [tick_s]
+
+Every zone gets a preheat event for 07:00 each day and a climate update every
+15 minutes, while the clock advances in tick_s steps.
+'''
+import sys
+import time
+from os import path
+
+sys.path.append(path.join(path.dirname(path.realpath(__file__)), ".."))
+sys.path.append(path.join(path.dirname(path.realpath(__file__)), "../smartclimate"))
+
+# pylint: disable=wrong-import-position
+from zoneimpl import ZoneImpl
+from tests.common import FakeHass, FakeStore, relative_time
+
+DATAPOINTS = [{'start_temp':18.0, 'target_temp':19.0, 'duration_s':2700.0, 'sensor_readings':[]},
+              {'start_temp':19.0, 'target_temp':20.0, 'duration_s':2700.0, 'sensor_readings':[]},
+              {'start_temp':18.0, 'target_temp':20.0, 'duration_s':4500.0, 'sensor_readings':[]}]
+
+def make_zone(name, store):
+    hass = FakeHass()
+    hass.name = name
+    hass.args = {'store': 'store', 'entity_id': 'climate.' + name}
+    hass.states['climate.' + name] = {'state': 'Manual',
+                                      'attributes': {'temperature': 18.0, 'current_temperature': 18.0}}
+    store.data[name] = {'datapoints': list(DATAPOINTS)}
+    ZoneImpl(hass, store)
+    return hass
+
+def main():
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 365
+    zones = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    tick_s = int(sys.argv[3]) if len(sys.argv) > 3 else 60
+
+    store = FakeStore()
+    hasses = [make_zone('zone{}'.format(i), store) for i in range(zones)]
+
+    started = time.perf_counter()
+    ticks = 0
+    for second in range(0, days * 86400, tick_s):
+        now = relative_time(second)
+        for hass in hasses:
+            hass.advance_to(now)
+            if second % 86400 == 0:
+                hass.trigger_event_callback('smartclimate.set_preheat',
+                                            {'zone': hass.name, 'name': 'morning', 'type': 'event',
+                                             'target_temp': '21', 'target_time': '07:00'})
+            if second % 900 == 0:
+                state = hass.states['climate.' + hass.name]
+                hass.trigger_state_callback('climate.' + hass.name, None, state, state)
+        ticks += 1
+    elapsed = time.perf_counter() - started
+
+    fired = sum(len([event for event in hass.fired_events if event['event'] == 'smartclimate.start_preheat'])
+                for hass in hasses)
+    print("simulated {} days x {} zones ({} ticks of {}s) in {:.2f}s".format(days, zones, ticks, tick_s, elapsed))
+    print("preheat events fired: {}".format(fired))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+'''
+Benchmarks cold start of the SmartClimate apps.
+
+Usage: python benchmarks/startup.py [--zones 8] [--datapoints 500] [--backend pickle|sqlite]
+           [--background-fit] [--top 15] [--output results.json]
+
+Reports, each in a fresh interpreter so nothing is already imported:
+python -X importtime for the app modules, with the slowest modules; the
+import time of numpy, scipy and sklearn that the first fit pays for; store
+load time for a data file of zones x datapoints; and for the zones, each
+zone's init time, the time until every zone has fitted and the time to the
+first prediction of each. With --background-fit zones fit on a thread pool
+rather than during init, as with the background_fit zone option.
+'''
+import argparse
+import json
+import os
+import pickle
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from os import path
+
+ROOT = path.join(path.dirname(path.realpath(__file__)), "..")
+MOD_PATH = path.join(ROOT, "smartclimate")
+sys.path.append(ROOT)
+sys.path.append(MOD_PATH)
+
+FORMAT_VERSION = 1
+APP_MODULES = ['zoneimpl', 'eventrouterimpl', 'sensorhubimpl', 'sqlitestore']
+HEAVY_MODULES = ['numpy', 'scipy.optimize', 'sklearn.linear_model']
+
+def _importtime(code):
+    '''return [(module, cumulative seconds)] of the top level imports python -X importtime reports for code'''
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            stderr=subprocess.PIPE, check=True).stderr.decode()
+    times = []
+    for line in stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = line.split('|')
+        if not line.startswith('import time:') or len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        if not name.startswith('  '):
+            times.append((name.strip(), int(parts[1]) / 1e6))
+    return times
+
+def import_times(modules, top):
+    '''return (total seconds, [(module, cumulative seconds)] of the slowest) importing modules in a new process'''
+    startup = {name for name, _ in _importtime('pass')}
+    times = [(name, seconds) for name, seconds in
+             _importtime('import sys; sys.path.append({!r}); import {}'.format(MOD_PATH, ', '.join(modules)))
+             if name not in startup]
+    total = sum(seconds for _, seconds in times)
+    return total, sorted(times, key=lambda item: -item[1])[:top]
+
+def datapoints(count, rng):
+    points = []
+    for _ in range(count):
+        start = rng.uniform(14., 20.)
+        target = start + rng.uniform(0.5, 4.)
+        outside = rng.uniform(-5., 15.)
+        points.append({'start_temp': start, 'target_temp': target, 'sensor_readings': [('outside', outside)],
+                       'duration_s': 1800*(target - start) + 60*(start - outside) + 900 + rng.gauss(0, 120)})
+    return points
+
+def write_store(tmp, backend, zones, count):
+    rng = random.Random(0)
+    data = {'_version': 1}
+    for i in range(zones):
+        data['zone{}'.format(i)] = {'datapoints': datapoints(count, rng)}
+    if backend == 'sqlite':
+        store = open_store(tmp, backend)[0]
+        for zone, zone_data in data.items():
+            if zone != '_version':
+                store.add_datapoints(zone, zone_data['datapoints'])
+        store.close()
+        return path.join(tmp, 'smartclimate.db')
+    data_file = path.join(tmp, 'smartclimate.dat')
+    with open(data_file, 'wb') as file:
+        pickle.dump(data, file)
+    return data_file
+
+def open_store(tmp, backend):
+    '''load the store as the DataStore app would, returning (store, seconds)'''
+    from tests.common import FakeHass, FakeStore
+    started = time.perf_counter()
+    if backend == 'sqlite':
+        from sqlitestore import SqliteDataStoreImpl
+        store_hass = FakeHass()
+        store_hass.args = {'data_file': path.join(tmp, 'smartclimate.db')}
+        store = SqliteDataStoreImpl(store_hass)
+    else:
+        # DataStoreImpl needs appdaemon, but only unpickles the file
+        store = FakeStore()
+        with open(path.join(tmp, 'smartclimate.dat'), 'rb') as file:
+            store.data = pickle.load(file)
+    return store, time.perf_counter() - started
+
+def start_zones(store, zones, background_fit):
+    from tests.common import FakeHass, time_of_day
+    from zoneimpl import ZoneImpl
+    results = []
+    started = time.perf_counter()
+    for i in range(zones):
+        hass = FakeHass()
+        hass.name = 'zone{}'.format(i)
+        hass.time = time_of_day(hour=4)
+        hass.args = {'store': 'store', 'entity_id': 'climate.' + hass.name, 'background_fit': background_fit,
+                     'sensors': [{'name': 'outside', 'entity_id': 'sensor.outside'}]}
+        hass.states['climate.' + hass.name] = {'state': 'Manual',
+                                               'attributes': {'temperature': 18.0, 'current_temperature': 18.0}}
+        hass.states['sensor.outside'] = {'state': '5.0'}
+        zone_started = time.perf_counter()
+        zone = ZoneImpl(hass, store)
+        results.append({'zone': hass.name, 'init_s': time.perf_counter() - zone_started, 'hass': hass, 'zone': zone})
+    initialised_s = time.perf_counter() - started
+
+    for result in results:
+        hass, zone = result.pop('hass'), result.pop('zone')
+        zone.wait_fitted()
+        # background fits are installed by a timer on the zone's callback path
+        hass.advance_time(hass.time + timedelta(seconds=1))
+        result['ready_s'] = time.perf_counter() - started
+        result['first_prediction'] = zone.predict(21.)
+        result['first_prediction_s'] = time.perf_counter() - started
+        zone.terminate()
+    return initialised_s, time.perf_counter() - started, results
+
+def child(args):
+    '''run the store and zone measurements in this, fresh, process'''
+    with tempfile.TemporaryDirectory() as tmp:
+        write_store(tmp, args.backend, args.zones, args.datapoints)
+        for name in list(sys.modules):
+            if name.split('.')[0] in ('numpy', 'scipy', 'sklearn'):
+                # writing the store must not warm up the imports being measured
+                raise RuntimeError('{} imported before zones start'.format(name))
+        store, load_s = open_store(tmp, args.backend)
+        initialised_s, ready_s, zones = start_zones(store, args.zones, args.background_fit)
+    return {'store_load_s': load_s, 'all_initialised_s': initialised_s, 'all_ready_s': ready_s, 'zones': zones}
+
+def main():
+    parser = argparse.ArgumentParser(description='SmartClimate cold start benchmark')
+    parser.add_argument('--zones', type=int, default=8)
+    parser.add_argument('--datapoints', type=int, default=500)
+    parser.add_argument('--backend', choices=['pickle', 'sqlite'], default='pickle')
+    parser.add_argument('--background-fit', action='store_true')
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--output', default=None, help='file to write JSON to, instead of stdout')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args)))
+        return
+
+    app_s, slowest = import_times(APP_MODULES, args.top)
+    heavy_s, _ = import_times(HEAVY_MODULES, 0)
+    command = [sys.executable, path.realpath(__file__), '--child', '--zones', str(args.zones),
+               '--datapoints', str(args.datapoints), '--backend', args.backend]
+    startup = json.loads(subprocess.run(command + (['--background-fit'] if args.background_fit else []),
+                                        stdout=subprocess.PIPE, check=True, env=os.environ).stdout)
+
+    print("app modules imported in {:.3f}s, numpy/scipy/sklearn in {:.3f}s".format(app_s, heavy_s), file=sys.stderr)
+    for name, seconds in slowest:
+        print("  {:<30} {:.4f}s".format(name, seconds), file=sys.stderr)
+    print("store loaded in {store_load_s:.3f}s, {} zones initialised in {all_initialised_s:.3f}s, "
+          "ready in {all_ready_s:.3f}s".format(args.zones, **startup), file=sys.stderr)
+
+    report = json.dumps({'benchmark': 'startup', 'format_version': FORMAT_VERSION,
+                         'python': platform.python_version(),
+                         'config': {'zones': args.zones, 'datapoints': args.datapoints, 'backend': args.backend,
+                                    'background_fit': args.background_fit},
+                         'app_import_s': app_s, 'heavy_import_s': heavy_s,
+                         'slowest_imports': [{'module': name, 'cumulative_s': seconds} for name, seconds in slowest],
+                         **startup}, sort_keys=True, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(report + '\n')
+    else:
+        print(report)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+'''
+Times generating synthetic heat-up datapoints.
+
+Usage: python benchmarks/synthetic.py [datapoints] [zones]
+
+Draws ground truth heat-ups for the zones with datapoint_arrays, which is
+vectorized so a million datapoints should take a few seconds at most.
+'''
+import sys
+import time
+from os import path
+
+sys.path.append(path.join(path.dirname(path.realpath(__file__)), ".."))
+sys.path.append(path.join(path.dirname(path.realpath(__file__)), "../smartclimate"))
+
+# pylint: disable=wrong-import-position
+from tests.synthetic import random_zones, datapoint_arrays
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    zones = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    started = time.perf_counter()
+    arrays = datapoint_arrays(count, zones=random_zones(zones), noise_s=0.)
+    elapsed = time.perf_counter() - started
+    print("generated {} of {} datapoints for {} zones in {:.2f}s".format(
+        len(arrays['duration_s']), count, zones, elapsed))
+
+if __name__ == '__main__':
+    main()
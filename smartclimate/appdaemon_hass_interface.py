@@ -1,6 +1,17 @@
+from threading import local
+
 class AppDaemonHassInterface:
-    def __init__(self, app):
+    '''Wraps the AppDaemon app calls used by SmartClimate
+
+    With batch_writes, set_state and fire_event calls made while handling a
+    callback are queued and flushed when it returns, keeping only the last
+    state written to each entity. With a recorder, every inbound callback
+    is recorded as it arrives, before any actor queueing.'''
+    def __init__(self, app, actor=None, batch_writes=False, recorder=None):
         self._app = app
+        self._actor = actor
+        self._batch = local() if batch_writes else None
+        self._recorder = recorder
 
     @property
     def name(self):
@@ -10,6 +21,60 @@ class AppDaemonHassInterface:
     def config(self):
         return self._app.args
 
+    def record(self, kind, *args):
+        '''record an inbound callback if there is a recorder'''
+        if self._recorder is not None:
+            self._recorder.record(self._app.datetime(), kind, *args)
+
+    def wrap_callback(self, callback, record=None):
+        '''return callback, batching its writes and routed through the zone actor if there is one
+
+        record maps the callback's arguments to the (kind, args...) to record, for
+        callbacks delivered by other apps rather than AppDaemon.'''
+        if self._batch is not None:
+            callback = self._batched(callback)
+        if self._actor is not None:
+            callback = self._actor.wrap(callback)
+        if record is None or self._recorder is None:
+            return callback
+        def handler(*args):
+            self.record(*record(*args))
+            callback(*args)
+        return handler
+
+    def dispatch_callback(self, callback, record=None):
+        '''return callback for delivery by another app, run on this app rather than the caller's thread
+
+        Without an actor, AppDaemon only serialises callbacks per app, so the
+        call is handed over with run_in. With one, the actor's queue does it.'''
+        callback = self.wrap_callback(callback, record=record)
+        if self._actor is not None:
+            return callback
+        def handler(*args):
+            self._app.run_in(lambda kwargs: callback(*args), 0)
+        return handler
+
+    def _batched(self, callback):
+        def handler(*args, **kwargs):
+            # nested callbacks, e.g. router handlers, join the outer batch
+            outer = getattr(self._batch, 'writes', None) is None
+            if outer:
+                self._batch.writes = {}
+            try:
+                return callback(*args, **kwargs)
+            finally:
+                if outer:
+                    writes, self._batch.writes = self._batch.writes, None
+                    self._flush(writes)
+        return handler
+
+    def _pending_writes(self):
+        return getattr(self._batch, 'writes', None) if self._batch is not None else None
+
+    def _flush(self, writes):
+        for write, args, kwargs in writes.values():
+            write(*args, **kwargs)
+
     def listen_state(self, callback, entity_id, all_attributes=False, attribute=None):
         if all_attributes:
             self._app.listen_state(self._listen_state_handler(callback), entity_id, attribute="all")
@@ -18,29 +83,39 @@ class AppDaemonHassInterface:
         else:
             self._app.listen_state(self._listen_state_handler(callback), entity_id)
 
-    @staticmethod
-    def _listen_state_handler(callback):
+    def _listen_state_handler(self, callback):
+        callback = self.wrap_callback(callback)
         def handler(entity, attribute, old, new, kwargs):
+            self.record('state', entity, attribute, old, new)
             callback(entity, new, old)
         return handler
 
     def listen_event(self, callback, event, **kwargs):
         self._app.listen_event(self._listen_event_handler(callback), event, **kwargs)
 
-    @staticmethod
-    def _listen_event_handler(callback):
+    def _listen_event_handler(self, callback):
+        callback = self.wrap_callback(callback)
         def handler(event, data, kwargs):
+            self.record('event', event, data)
             callback(event, data)
         return handler
 
     def fire_event(self, event, **kwargs):
-        self._app.fire_event(event, **kwargs)
+        writes = self._pending_writes()
+        if writes is None:
+            self._app.fire_event(event, **kwargs)
+        else:
+            writes[object()] = (self._app.fire_event, (event,), kwargs)
 
     def run_at(self, callback, when):
         if when.tzinfo is not None:
             # AD requires timezone naive local time
             when = when.astimezone().replace(tzinfo=None)
-        return self._app.run_at(callback, when)
+        callback = self.wrap_callback(callback)
+        def handler(*args, **kwargs):
+            self.record('timer')
+            callback(*args, **kwargs)
+        return self._app.run_at(handler if self._recorder is not None else callback, when)
 
     def cancel_timer(self, timer):
         self._app.cancel_timer(timer)
@@ -52,7 +127,13 @@ class AppDaemonHassInterface:
             return self._app.get_state(entity_id)
 
     def set_state(self, entity_id, state=None, attributes=None):
-        self._app.set_state(entity_id, state, attributes)
+        writes = self._pending_writes()
+        if writes is None:
+            self._app.set_state(entity_id, state, attributes)
+        else:
+            # the last write wins, in the position it was made
+            writes.pop(entity_id, None)
+            writes[entity_id] = (self._app.set_state, (entity_id, state, attributes), {})
 
     def datetime(self):
         return self._app.datetime()
@@ -0,0 +1,91 @@
+import os
+import pickle
+import struct
+from threading import Lock
+
+MAGIC = b'SCCB1\n'
+_HEADER = struct.Struct('<dI')
+
+class CallbackRecorder:
+    '''Appends inbound callbacks to a compact rotating binary log
+
+    Each record is the AppDaemon time as a float timestamp and the length of
+    a pickled (kind, args) payload, followed by the payload. Once the log
+    reaches max_bytes it is rotated to path.1, path.2, ... keeping backups
+    old files, as logging's RotatingFileHandler does.'''
+
+    def __init__(self, path, max_bytes=16 << 20, backups=3, log=None):
+        self._path = path
+        self._max_bytes = int(max_bytes)
+        self._backups = int(backups)
+        self._log = log
+        self._lock = Lock()
+        self._file = None
+        self._failed = False
+
+    def record(self, when, kind, *args):
+        '''record a callback of kind ('state', 'event' or 'timer') arriving at when'''
+        if self._failed:
+            return
+        try:
+            payload = pickle.dumps((kind, args), protocol=4)
+            with self._lock:
+                if self._file is None:
+                    self._open()
+                elif self._file.tell() + _HEADER.size + len(payload) > self._max_bytes:
+                    self._rotate()
+                self._file.write(_HEADER.pack(when.timestamp(), len(payload)))
+                self._file.write(payload)
+                self._file.flush()
+        except Exception: # pylint: disable=broad-except
+            # never let recording break the callback itself
+            self._failed = True
+            if self._log is not None:
+                self._log.error("Recording callbacks to {} failed, recording stopped", self._path, exc_info=True)
+
+    def _open(self):
+        self._file = open(self._path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+
+    def _rotate(self):
+        self._file.close()
+        for index in range(self._backups - 1, 0, -1):
+            if os.path.exists('{}.{}'.format(self._path, index)):
+                os.replace('{}.{}'.format(self._path, index), '{}.{}'.format(self._path, index + 1))
+        if self._backups:
+            os.replace(self._path, self._path + '.1')
+        else:
+            os.remove(self._path)
+        self._open()
+
+    def close(self):
+        '''close the log file'''
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+def read_log(path):
+    '''yield (timestamp, kind, args) from a log and its rotated backups, oldest first'''
+    index = 1
+    while os.path.exists('{}.{}'.format(path, index)):
+        index += 1
+    paths = ['{}.{}'.format(path, i) for i in range(index - 1, 0, -1)] + [path]
+    for log_path in paths:
+        if not os.path.exists(log_path):
+            continue
+        with open(log_path, 'rb') as file:
+            if file.read(len(MAGIC)) != MAGIC:
+                raise ValueError("{} is not a callback log".format(log_path))
+            while True:
+                header = file.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    break
+                timestamp, length = _HEADER.unpack(header)
+                payload = file.read(length)
+                if len(payload) < length:
+                    # the last record of a live log may be partly written
+                    break
+                kind, args = pickle.loads(payload)
+                yield timestamp, kind, args
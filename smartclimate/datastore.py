@@ -3,6 +3,7 @@ import pickle
 from threading import Lock
 import appdaemon.plugins.hass.hassapi as hass
 from hasslog import HassLog
+from snapshots import SnapshotStore
 
 class DataStore(hass.Hass):
     '''Data store for SmartClimate'''
@@ -10,7 +11,11 @@ class DataStore(hass.Hass):
     def initialize(self):
         '''appdaemon init callback'''
         # pylint: disable=attribute-defined-outside-init
-        self.impl = DataStoreImpl(self)
+        if self.args.get("backend", "pickle") == "sqlite":
+            from sqlitestore import SqliteDataStoreImpl
+            self.impl = SqliteDataStoreImpl(self)
+        else:
+            self.impl = DataStoreImpl(self)
 
     @property
     def data(self):
@@ -25,7 +30,19 @@ class DataStore(hass.Hass):
         '''Commit current data to disk'''
         self.impl.save()
 
-class DataStoreImpl(HassLog):
+    def zone_size(self, zone):
+        '''report the datapoint count and size of zone's data'''
+        return self.impl.zone_size(zone)
+
+    def snapshot(self, zone):
+        '''return an immutable, versioned view of zone's datapoints'''
+        return self.impl.snapshot(zone)
+
+    def add_datapoint(self, zone, datapoint):
+        '''add a datapoint to zone, save, and return the new snapshot'''
+        return self.impl.add_datapoint(zone, datapoint)
+
+class DataStoreImpl(HassLog, SnapshotStore):
     def __init__(self, app):
         super().__init__(app)
         self.lock = Lock()
@@ -46,6 +63,11 @@ class DataStoreImpl(HassLog):
             self.info('No data file found, using blank')
             self.data = self._default_data()
 
+    def zone_size(self, zone):
+        '''report the datapoint count, in-memory bytes and pickled bytes of zone's data'''
+        from memoryreport import zone_data_size
+        return zone_data_size({'datapoints': list(self.snapshot(zone))})
+
     @staticmethod
     def _default_data():
         return {'_version': 1}
@@ -57,9 +79,8 @@ class DataStoreImpl(HassLog):
             temp_file = self._data_file+'.tmp'
             with open(temp_file, 'wb') as file:
                 pickle.dump(self.data, file)
-            if os.path.isfile(self._data_file):
-                os.remove(self._data_file)
-            os.rename(temp_file, self._data_file)
+            # atomic, so readers such as export.py always find a complete file
+            os.replace(temp_file, self._data_file)
         except:
             self.error('Error saving data {}', self._data_file, exc_info=True)
             raise
@@ -0,0 +1,18 @@
+import appdaemon.plugins.hass.hassapi as hass
+from eventrouterimpl import EventRouterImpl
+
+class EventRouter(hass.Hass):
+    '''Single listener for SmartClimate events, dispatching to registered zones'''
+
+    def initialize(self):
+        '''appdaemon init callback'''
+        # pylint: disable=attribute-defined-outside-init
+        self.impl = EventRouterImpl(self)
+
+    def register(self, zone, set_preheat, clear_preheat, query=None, memory_report=None):
+        '''route preheat, query and memory report events for zone to the given handlers'''
+        self.impl.register(zone, set_preheat, clear_preheat, query=query, memory_report=memory_report)
+
+    def unregister(self, zone):
+        '''stop routing events to zone'''
+        self.impl.unregister(zone)
@@ -0,0 +1,80 @@
+from threading import Lock
+from hasslog import HassLog
+from appdaemon_hass_interface import AppDaemonHassInterface
+
+class EventRouterImpl(HassLog):
+    '''Implementation of EventRouter
+
+    Zones are indexed by name, and preheats by name to the zones which have
+    been sent them, so dispatching an event costs the same however many
+    zones are registered.'''
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.hass = AppDaemonHassInterface(app)
+        self._lock = Lock()
+        self._zones = {}
+        self._preheat_zones = {}
+
+        self.hass.listen_event(self._handle_set_preheat, "smartclimate.set_preheat")
+        self.hass.listen_event(self._handle_clear_preheat, "smartclimate.clear_preheat")
+        self.hass.listen_event(self._handle_query, "smartclimate.query")
+        self.hass.listen_event(self._handle_memory_report, "smartclimate.memory_report")
+
+    def register(self, zone, set_preheat, clear_preheat, query=None, memory_report=None):
+        '''route preheat, query and memory report events for zone to the given handlers'''
+        self.info("Registering zone {}", zone)
+        with self._lock:
+            self._zones[zone] = (set_preheat, clear_preheat, query, memory_report)
+
+    def unregister(self, zone):
+        '''stop routing events to zone'''
+        with self._lock:
+            self._zones.pop(zone, None)
+            for zones in self._preheat_zones.values():
+                zones.discard(zone)
+
+    def _handle_set_preheat(self, event, data):
+        zone = data.get('zone', None)
+        with self._lock:
+            handlers = self._zones.get(zone, None)
+            if handlers is None:
+                self.debug("Ignoring preheat {} for unknown zone {}", data.get('name', None), zone)
+                return
+            self._preheat_zones.setdefault(data['name'], set()).add(zone)
+        handlers[0](event, data)
+
+    def _handle_clear_preheat(self, event, data):
+        name = data['name']
+        with self._lock:
+            zones = self._preheat_zones.get(name, set())
+            if 'zone' in data:
+                zones.discard(data['zone'])
+                targets = [data['zone']]
+            else:
+                self._preheat_zones.pop(name, None)
+                targets = list(zones)
+            if not zones:
+                self._preheat_zones.pop(name, None)
+            handlers = [self._zones[zone][1] for zone in targets if zone in self._zones]
+        for handler in handlers:
+            handler(event, data)
+
+    def _handle_query(self, event, data):
+        with self._lock:
+            handlers = self._zones.get(data.get('zone', None), None)
+        if handlers is not None and handlers[2] is not None:
+            handlers[2](event, data)
+
+    def _handle_memory_report(self, event, data):
+        # allocations are process wide, so diffed once here rather than by each zone
+        from memoryreport import TRACER
+        TRACER.report(self.hass, self, data)
+        with self._lock:
+            if 'zone' in data:
+                handlers = [self._zones[data['zone']]] if data['zone'] in self._zones else []
+            else:
+                handlers = list(self._zones.values())
+        for handler in handlers:
+            if handler[3] is not None:
+                handler[3](event, data)
@@ -0,0 +1,201 @@
+'''
+Streams datapoints out of a SmartClimate data file as CSV, JSONL or NPZ.
+
+Usage: python smartclimate/export.py DATA_FILE OUTPUT [--format csv|jsonl|npz] [--zone ZONE ...]
+
+Works on the pickle and SQLite stores, and is safe against a running
+AppDaemon: a pickle file is only ever replaced whole, so the open file is a
+consistent snapshot, and SQLite exports read inside one transaction. Rows
+are written one at a time. SQLite exports run in constant memory; the
+pickle store has to be unpickled whole, but each zone is dropped once it
+has been written.
+'''
+import argparse
+import base64
+import csv
+import json
+import os
+import pickle
+import sqlite3
+import sys
+import tempfile
+import time
+import zipfile
+from contextlib import contextmanager
+
+FIELDS = ['zone', 'completed_at', 'start_temp', 'target_temp', 'duration_s']
+SQLITE_HEADER = b'SQLite format 3\x00'
+
+def is_sqlite(data_file):
+    '''return whether data_file is a SQLite database rather than a pickle'''
+    with open(data_file, 'rb') as file:
+        return file.read(len(SQLITE_HEADER)) == SQLITE_HEADER
+
+class _PickleSource:
+    def __init__(self, data):
+        self._data = data
+
+    def records(self, zones=None, release=False):
+        for zone in sorted(key for key in self._data if key != '_version'):
+            if zones is None or zone in zones:
+                for datapoint in self._data[zone].get('datapoints', []):
+                    yield zone, datapoint
+                if release:
+                    del self._data[zone]
+
+class _SqliteSource:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def records(self, zones=None, release=False): # pylint: disable=unused-argument
+        from sqlitestore import SqliteDataStoreImpl
+        sql = 'SELECT zone, completed_at, start_temp, target_temp, duration_s, sensor_readings, curve ' \
+              'FROM datapoints'
+        params = []
+        if zones is not None:
+            sql += ' WHERE zone IN ({})'.format(', '.join('?' * len(zones)))
+            params = list(zones)
+        for row in self._conn.execute(sql + ' ORDER BY zone, completed_at, id', params):
+            yield row[0], SqliteDataStoreImpl._from_row(row[1:]) # pylint: disable=protected-access
+
+@contextmanager
+def open_source(data_file, retries=10):
+    '''open a consistent snapshot of data_file, whose records() can be iterated more than once'''
+    for attempt in range(retries):
+        try:
+            sqlite = is_sqlite(data_file)
+            break
+        except FileNotFoundError:
+            # older stores removed the file before renaming the new one into place
+            if attempt == retries - 1:
+                raise
+            time.sleep(0.1)
+
+    if sqlite:
+        conn = sqlite3.connect('file:{}?mode=ro'.format(data_file), uri=True, isolation_level=None)
+        try:
+            conn.execute('BEGIN')
+            yield _SqliteSource(conn)
+        finally:
+            conn.close()
+    else:
+        with open(data_file, 'rb') as file:
+            data = pickle.load(file) or {}
+        yield _PickleSource(data)
+
+def _flat(zone, datapoint):
+    record = {'zone': zone, 'completed_at': datapoint.get('completed_at', None),
+              'start_temp': datapoint['start_temp'], 'target_temp': datapoint['target_temp'],
+              'duration_s': datapoint['duration_s'],
+              'sensor_readings': [list(reading) for reading in datapoint['sensor_readings']]}
+    if datapoint.get('curve', None) is not None:
+        record['curve'] = base64.b64encode(datapoint['curve']).decode('ascii')
+    return record
+
+def write_jsonl(source, output, zones=None):
+    '''write one JSON object per datapoint, returning the count'''
+    count = 0
+    for zone, datapoint in source.records(zones, release=True):
+        output.write(json.dumps(_flat(zone, datapoint)) + '\n')
+        count += 1
+    return count
+
+def write_csv(source, output, zones=None):
+    '''write one row per datapoint with sensor readings as JSON, returning the count'''
+    writer = csv.DictWriter(output, FIELDS + ['sensor_readings', 'curve'])
+    writer.writeheader()
+    count = 0
+    for zone, datapoint in source.records(zones, release=True):
+        record = _flat(zone, datapoint)
+        record['sensor_readings'] = json.dumps(record['sensor_readings'])
+        writer.writerow(record)
+        count += 1
+    return count
+
+def write_npz(source, output, zones=None, chunk=4096):
+    '''write columns as arrays, sensors as one (n, sensors) array with NaN gaps, returning the count
+
+    A first pass finds the zones and sensor names, then each column is
+    streamed through a temporary file into its .npy member of the archive.'''
+    import numpy as np
+    zone_names, sensor_names, count = {}, {}, 0
+    for zone, datapoint in source.records(zones):
+        zone_names.setdefault(zone, len(zone_names))
+        for name, _ in datapoint['sensor_readings']:
+            sensor_names.setdefault(name, len(sensor_names))
+        count += 1
+
+    columns = FIELDS + ['sensors']
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {column: open(os.path.join(tmp, column), 'wb') for column in columns}
+        try:
+            rows = []
+            def flush():
+                block = np.full((len(rows), len(FIELDS) + len(sensor_names)), np.nan)
+                for i, (zone, datapoint) in enumerate(rows):
+                    block[i, :len(FIELDS)] = (zone_names[zone], datapoint.get('completed_at', np.nan),
+                                              datapoint['start_temp'], datapoint['target_temp'],
+                                              datapoint['duration_s'])
+                    for name, value in datapoint['sensor_readings']:
+                        block[i, len(FIELDS) + sensor_names[name]] = value
+                files['zone'].write(block[:, 0].astype('<i4').tobytes())
+                for index, column in enumerate(FIELDS[1:], 1):
+                    files[column].write(block[:, index].astype('<f8').tobytes())
+                files['sensors'].write(np.ascontiguousarray(block[:, len(FIELDS):], dtype='<f8').tobytes())
+                rows.clear()
+
+            for record in source.records(zones, release=True):
+                rows.append(record)
+                if len(rows) >= chunk:
+                    flush()
+            if rows:
+                flush()
+        finally:
+            for file in files.values():
+                file.close()
+
+        shapes = {column: (count,) for column in FIELDS}
+        shapes['sensors'] = (count, len(sensor_names))
+        with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+            for column in columns:
+                dtype = '<i4' if column == 'zone' else '<f8'
+                with archive.open(column + '.npy', 'w', force_zip64=True) as member, \
+                        open(os.path.join(tmp, column), 'rb') as file:
+                    np.lib.format.write_array_header_1_0(
+                        member, {'descr': dtype, 'fortran_order': False, 'shape': shapes[column]})
+                    while True:
+                        data = file.read(1 << 20)
+                        if not data:
+                            break
+                        member.write(data)
+            for name, values in (('zones', list(zone_names)), ('sensor_names', list(sensor_names))):
+                with archive.open(name + '.npy', 'w') as member:
+                    np.lib.format.write_array(member, np.array(values, dtype=str))
+    return count
+
+WRITERS = {
+    'csv': (write_csv, 'w'),
+    'jsonl': (write_jsonl, 'w'),
+    'npz': (write_npz, 'wb'),
+}
+
+def export(data_file, output, fmt='jsonl', zones=None):
+    '''export datapoints of zones, or all zones, from data_file to the output path, returning the count'''
+    writer, mode = WRITERS[fmt]
+    with open_source(data_file) as source, open(output, mode, newline='' if mode == 'w' else None) as file:
+        return writer(source, file, zones=zones)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export SmartClimate datapoints')
+    parser.add_argument('data_file')
+    parser.add_argument('output')
+    parser.add_argument('--format', choices=sorted(WRITERS), default=None,
+                        help='defaults to the output file extension')
+    parser.add_argument('--zone', action='append', default=None, help='zone to export, may be repeated')
+    args = parser.parse_args(argv)
+    fmt = args.format or os.path.splitext(args.output)[1].lstrip('.') or 'jsonl'
+    count = export(args.data_file, args.output, fmt, zones=args.zone)
+    print("exported {} datapoints to {}".format(count, args.output), file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
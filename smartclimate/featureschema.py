@@ -0,0 +1,115 @@
+class FeatureSchema:
+    '''Sensor feature columns keyed by sensor name
+
+    Datapoints are converted into a matrix of [target_temp, start_temp,
+    sensor columns...] incrementally: appended datapoints only add rows, and
+    a sensor seen for the first time only adds a column, which is masked for
+    older rows. Missing values are imputed with the column mean, and a column
+    is only used once it has min_observations values.'''
+    min_observations = 3
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        import numpy as np
+        # pylint: disable=attribute-defined-outside-init
+        self._columns = {}
+        self._base = np.empty((0, 3))
+        self._values = np.empty((0, 0))
+        self._count = 0
+        self._first = None
+        self._last = None
+        self._active = []
+        self._means = np.empty(0)
+
+    @property
+    def names(self):
+        '''names of the sensor columns used for fitting, in column order'''
+        return list(self._active)
+
+    def __len__(self):
+        return self._count
+
+    def update(self, datapoints):
+        '''bring the matrix up to date with datapoints, converting only new ones if they were appended'''
+        import numpy as np
+        if not (self._count and len(datapoints) >= self._count and
+                datapoints[0] == self._first and datapoints[self._count - 1] == self._last):
+            self._reset()
+        new = [datapoints[i] for i in range(self._count, len(datapoints))]
+        if new:
+            self._append(new)
+            self._first = datapoints[0]
+            self._last = datapoints[len(datapoints) - 1]
+
+        observed = (~np.isnan(self._values[:self._count])).sum(axis=0)
+        self._active = [name for name, index in self._columns.items() if observed[index] >= self.min_observations]
+        self._means = self._column_means([self._columns[name] for name in self._active])
+
+    def _append(self, datapoints):
+        import numpy as np
+        for datapoint in datapoints:
+            for name, _ in datapoint['sensor_readings']:
+                if name not in self._columns:
+                    self._columns[name] = len(self._columns)
+
+        needed = self._count + len(datapoints)
+        rows, columns = self._values.shape
+        # rows and columns grow independently, so a new sensor doesn't reallocate room for more datapoints
+        if needed > rows:
+            rows = max(needed, 2 * rows, 16)
+            base = np.empty((rows, 3))
+            base[:self._count] = self._base[:self._count]
+            self._base = base
+        if len(self._columns) > columns:
+            columns = max(len(self._columns), 2 * columns)
+        if (rows, columns) != self._values.shape:
+            values = np.full((rows, columns), np.nan)
+            values[:self._count, :self._values.shape[1]] = self._values[:self._count]
+            self._values = values
+
+        for row, datapoint in enumerate(datapoints, self._count):
+            self._base[row] = (datapoint['target_temp'], datapoint['start_temp'], datapoint['duration_s'])
+            for name, value in datapoint['sensor_readings']:
+                self._values[row, self._columns[name]] = value
+        self._count = needed
+
+    def _column_means(self, indexes):
+        import numpy as np
+        if not indexes:
+            return np.empty(0)
+        return np.nanmean(self._values[:self._count, indexes], axis=0)
+
+    def design(self):
+        '''return (x, y) with imputed values for the active columns'''
+        import numpy as np
+        values = self._values[:self._count, [self._columns[name] for name in self._active]]
+        values = np.where(np.isnan(values), self._means, values)
+        return np.column_stack([self._base[:self._count, :2], values]), self._base[:self._count, 2].copy()
+
+    def vector(self, target_temp, current_temp, sensor_readings):
+        '''return a feature row from readings given as (name, value) pairs'''
+        readings = dict(sensor_readings or [])
+        return [target_temp, current_temp] + [readings.get(name, mean)
+                                              for name, mean in zip(self._active, self._means)]
+
+    def matrix(self, features, sensor_names):
+        '''return feature rows from rows of [target_temp, current_temp, values for sensor_names...]'''
+        import numpy as np
+        features = np.asarray(features, dtype=float).reshape(-1, 2 + len(sensor_names))
+        positions = {name: 2 + i for i, name in enumerate(sensor_names)}
+        result = np.empty((len(features), 2 + len(self._active)))
+        result[:, :2] = features[:, :2]
+        for i, (name, mean) in enumerate(zip(self._active, self._means)):
+            result[:, 2 + i] = features[:, positions[name]] if name in positions else mean
+        return result
+
+    @classmethod
+    def count_features(cls, datapoints):
+        '''return the number of sensor columns datapoints have enough observations of'''
+        observed = {}
+        for datapoint in datapoints:
+            for name, _ in datapoint['sensor_readings']:
+                observed[name] = observed.get(name, 0) + 1
+        return len([count for count in observed.values() if count >= cls.min_observations])
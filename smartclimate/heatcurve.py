@@ -0,0 +1,50 @@
+class HeatCurve:
+    '''Bounded buffer of (elapsed seconds, temperature) samples for one heat-up
+
+    Samples are decimated online: when the buffer fills, every other sample
+    is dropped and the sampling stride doubles, so a session of any length
+    is kept in the same preallocated arrays at a roughly even spacing.'''
+    def __init__(self, capacity):
+        import numpy as np
+        self._capacity = max(capacity - capacity % 2, 2)
+        self._samples = np.zeros((self._capacity, 2), dtype=np.float32)
+        self._count = 0
+        self._stride = 1
+        self._seen = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, elapsed_s, temp, force=False):
+        '''offer a sample, keeping it if it falls on the current stride'''
+        keep = force or self._seen % self._stride == 0
+        self._seen += 1
+        if not keep:
+            return
+        if self._count == self._capacity:
+            self._samples[:self._capacity // 2] = self._samples[::2]
+            self._count = self._capacity // 2
+            self._stride *= 2
+        self._samples[self._count] = (elapsed_s, temp)
+        self._count += 1
+
+    def finish(self, elapsed_s, temp):
+        '''make sure the final sample is kept'''
+        if self._count and self._samples[self._count - 1][0] == elapsed_s:
+            self._samples[self._count - 1][1] = temp
+        else:
+            self.append(elapsed_s, temp, force=True)
+
+    def samples(self):
+        '''return an (n, 2) array of (elapsed seconds, temperature)'''
+        return self._samples[:self._count].copy()
+
+    def encode(self):
+        '''return samples as compact float32 bytes for storing with a datapoint'''
+        return self._samples[:self._count].tobytes()
+
+    @staticmethod
+    def decode(data):
+        '''return an (n, 2) array of (elapsed seconds, temperature) from encode()'''
+        import numpy as np
+        return np.frombuffer(data, dtype=np.float32).reshape(-1, 2)
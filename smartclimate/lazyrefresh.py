@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+class LazyRefresh:
+    '''Decides how long an event far from its trigger can go without being recomputed
+
+    An event is refreshed at most every fraction of its time to trigger, but
+    no more often than min_s, and always once it is within window_s of
+    triggering, from where every update recomputes it. Refreshes get closer
+    together as the trigger nears, so an event a day away is recomputed tens
+    of times rather than on every update.'''
+
+    def __init__(self, config):
+        config = config if isinstance(config, dict) else {}
+        self.fraction = float(config.get('fraction', 0.1))
+        self.min_s = float(config.get('min_s', 60))
+        self.window_s = float(config.get('window_s', 1800))
+        self.deferred = 0
+        self.refreshed = 0
+
+    def next_refresh(self, now, trigger_time):
+        '''return when an event triggering at trigger_time next needs recomputing, or None if it always does'''
+        remaining_s = (trigger_time - now).total_seconds()
+        if remaining_s <= self.window_s:
+            return None
+        # never later than the start of the window, so the event enters it up to date
+        delay_s = min(max(self.min_s, self.fraction * remaining_s), remaining_s - self.window_s)
+        return now + timedelta(seconds=delay_s)
+
+    def metrics(self):
+        '''return counts of deferred and lazily refreshed updates'''
+        return {'deferred': self.deferred, 'refreshed': self.refreshed}
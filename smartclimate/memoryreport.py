@@ -0,0 +1,111 @@
+import pickle
+import sys
+import tracemalloc
+import weakref
+from threading import Lock
+from types import FunctionType, MethodType, ModuleType
+
+_OPAQUE = (type, ModuleType, FunctionType, MethodType)
+
+def deep_sizeof(obj, exclude=()):
+    '''return an estimate of the bytes held by obj and everything it references
+
+    Objects in exclude, such as a zone's parent, aren't followed. Arrays are
+    counted by sys.getsizeof, which includes data they own.'''
+    seen = {id(excluded) for excluded in exclude}
+    stack = [obj]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, _OPAQUE):
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, (str, bytes, bytearray, int, float)) or hasattr(item, '__array_interface__'):
+            continue
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        if hasattr(item, '__dict__'):
+            stack.append(item.__dict__)
+        for slot in getattr(type(item), '__slots__', ()):
+            if hasattr(item, slot):
+                stack.append(getattr(item, slot))
+    return total
+
+def pickled_size(obj):
+    '''return the size of obj as the pickle store would write it'''
+    return len(pickle.dumps(obj))
+
+def zone_data_size(zone_data):
+    '''return the size report for one zone of a dict based store'''
+    datapoints = zone_data.get('datapoints', [])
+    return {'datapoints': len(datapoints), 'memory_bytes': deep_sizeof(zone_data),
+            'serialized_bytes': pickled_size(zone_data)}
+
+ALLOCATIONS_ENTITY = 'sensor.smartclimate_memory'
+
+class AllocationTracer:
+    '''process wide tracemalloc snapshots, each diffed against the one before
+
+    The first request starts tracing, so there is only something to compare
+    from the second one on. Allocations are the whole process's, so each
+    memory report event is answered once: by the EventRouter, or without one
+    by the zone which claimed the tracer.'''
+
+    def __init__(self):
+        self._lock = Lock()
+        self._snapshot = None
+        self._owner = None
+
+    def claim(self, owner):
+        '''make owner answer memory report events if nothing else does yet, returning whether it does'''
+        with self._lock:
+            if self._owner is None or self._owner() is None:
+                self._owner = weakref.ref(owner)
+            return self._owner() is owner
+
+    def release(self, owner):
+        '''stop owner answering memory report events, so another can claim the tracer'''
+        with self._lock:
+            if self._owner is not None and self._owner() is owner:
+                self._owner = None
+
+    def report(self, hass, log, data):
+        '''handle a memory report event's tracemalloc option, publishing to ALLOCATIONS_ENTITY'''
+        option = data.get('tracemalloc', False)
+        if option == 'stop':
+            self.stop()
+            return
+        if not option:
+            return
+        lines = self.diff(int(data.get('top', 10)))
+        log.info("Allocation changes since the last memory report: {}", 'none yet' if lines is None else len(lines))
+        for line in lines or []:
+            log.info("  {}", line)
+        if data.get('output', 'sensor') == 'sensor':
+            hass.set_state(ALLOCATIONS_ENTITY, state=tracemalloc.get_traced_memory()[0],
+                           attributes={'tracemalloc': lines, 'unit_of_measurement': 'B'})
+
+    def diff(self, top=10):
+        '''take a snapshot and return the top allocation changes since the last one, or None'''
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._snapshot = None
+            snapshot = tracemalloc.take_snapshot()
+            previous, self._snapshot = self._snapshot, snapshot
+            if previous is None:
+                return None
+            return [str(stat) for stat in snapshot.compare_to(previous, 'lineno')[:top]]
+
+    def stop(self):
+        '''stop tracing and drop the last snapshot'''
+        with self._lock:
+            self._snapshot = None
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+
+TRACER = AllocationTracer()
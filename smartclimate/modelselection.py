@@ -0,0 +1,75 @@
+import math
+import time
+from itertools import repeat
+from predictor import PREDICTORS, create_predictor
+
+_EXECUTOR = None
+
+class _NullLog:
+    def debug(self, message, *args, **kwargs):
+        pass
+
+def get_executor(max_workers=None):
+    '''Return the process pool shared by all zones, creating it on first use'''
+    global _EXECUTOR # pylint: disable=global-statement
+    if _EXECUTOR is None:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        # forking a threaded process, e.g. one importing sklearn on another thread, can deadlock the children
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        _EXECUTOR = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(method))
+    return _EXECUTOR
+
+def cross_validate(kind, datapoints, folds=5):
+    '''Return k-fold error and timings for one predictor family'''
+    squared_error = 0.0
+    predictions = 0
+    fit_time = 0.0
+    predict_time = 0.0
+    fits = 0
+    for fold in range(folds):
+        training = [datapoint for i, datapoint in enumerate(datapoints) if i % folds != fold]
+        testing = datapoints[fold::folds]
+        predictor = create_predictor(kind, kind, _NullLog())
+        if not testing or not predictor.check_ready(training):
+            continue
+
+        started = time.perf_counter()
+        try:
+            predictor.learn(training)
+        except (ValueError, ArithmeticError):
+            continue
+        fit_time += time.perf_counter() - started
+        fits += 1
+
+        started = time.perf_counter()
+        for datapoint in testing:
+            prediction = predictor.predict(datapoint['target_temp'], datapoint['start_temp'],
+                                           datapoint['sensor_readings'])
+            squared_error += (prediction - datapoint['duration_s']) ** 2
+        predict_time += time.perf_counter() - started
+        predictions += len(testing)
+
+    return {
+        'kind': kind,
+        'error_s': math.sqrt(squared_error / predictions) if predictions else math.inf,
+        'fit_time_s': fit_time / fits if fits else math.inf,
+        'predict_time_s': predict_time / predictions if predictions else math.inf,
+    }
+
+def select_predictor(datapoints, candidates=None, folds=5, executor=None, timeout=None):
+    '''Cross validate candidate predictors and return (best kind, results)
+
+    Candidates are evaluated on executor if given, otherwise in process, in
+    which case concurrent.futures.TimeoutError is raised if they take longer
+    than timeout seconds. The winner is the candidate with the lowest RMS
+    error in seconds.'''
+    candidates = list(candidates or PREDICTORS)
+    if executor is None:
+        results = [cross_validate(kind, datapoints, folds) for kind in candidates]
+    else:
+        results = list(executor.map(cross_validate, candidates, repeat(datapoints), repeat(folds),
+                                    timeout=timeout))
+
+    best = min(results, key=lambda result: result['error_s'])
+    return best['kind'], {result['kind']: result for result in results}
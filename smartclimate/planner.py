@@ -0,0 +1,122 @@
+from datetime import datetime, timezone
+
+class Planner:
+    '''Plans preheat trigger times ahead from a weather forecast
+
+    For every event the trigger time t solves t + duration(forecast(t)) =
+    target time. Durations are predicted for all events over a grid of
+    candidate start times in a single batch, and the root is interpolated
+    between grid points. Live readings then only shift the plan by the
+    difference between the live prediction and the forecast one, both at
+    the event's quantile.'''
+
+    def __init__(self, parent, config):
+        self._parent = parent
+        self.entity_id = config['entity_id']
+        self.attribute = config.get('attribute', 'forecast')
+        self._field = config.get('field', 'temperature')
+        self._sensor = config['sensor']
+        self._step_s = float(config.get('step_s', 600))
+        self._horizon_s = float(config.get('horizon_h', 48)) * 3600
+        self._plans = {}
+
+    def forget(self, name=None):
+        '''drop the plan for one event, or all plans'''
+        if name is None:
+            self._plans = {}
+        else:
+            self._plans.pop(name, None)
+
+    def trigger_time(self, event):
+        '''return the planned trigger time for event, corrected by live readings, or None'''
+        if event.name not in self._plans:
+            self.plan([event])
+        plan = self._plans.get(event.name, None)
+        if plan is None:
+            return None
+
+        trigger_ts, baseline = plan
+        live = self._parent.predict(event.target_temp, quantile=event.quantile)
+        if live is not None:
+            trigger_ts -= live - baseline
+        return datetime.fromtimestamp(trigger_ts, timezone.utc)
+
+    def plan(self, events):
+        '''solve trigger times for events in one batch'''
+        import numpy as np
+        for event in events:
+            self._plans[event.name] = None
+
+        forecast = self._forecast()
+        current_temp = self._parent.hass.get_state(self._parent.climate_entity, attribute='current_temperature')
+        readings = self._parent.sensors.get_readings()
+        names = self._parent.sensors.names()
+        if forecast is None or current_temp is None or readings is None or self._sensor not in names:
+            self._parent.debug("Unable to plan from forecast {}", self.entity_id)
+            return
+
+        now = self._parent.hass.datetime().timestamp()
+        sensor_index = names.index(self._sensor)
+        values = [value for _, value in readings]
+        events = [event for event in events if event.target_time.timestamp() > now]
+        if not events:
+            return
+
+        horizon = min(max(event.target_time.timestamp() for event in events), now + self._horizon_s)
+        times = np.arange(now, horizon + self._step_s, self._step_s)
+        forecast_values = np.interp(times, forecast[0], forecast[1])
+        rows = np.empty((len(events) * len(times), 2 + len(values)))
+        rows[:, 1] = float(current_temp)
+        rows[:, 2:] = values
+        rows[:, 2 + sensor_index] = np.tile(forecast_values, len(events))
+        rows[:, 0] = np.repeat([event.target_temp for event in events], len(times))
+
+        durations = self._parent.predictor.predict_many(rows, names)
+        if durations is None:
+            return
+        durations = np.asarray(durations, dtype=float).reshape(len(events), len(times))
+
+        forecast_readings = [(name, forecast_values[0] if name == self._sensor else value)
+                             for name, value in readings]
+        for event, event_durations in zip(events, durations):
+            if event.quantile is not None:
+                event_durations = event_durations + self._margin(event, float(current_temp), forecast_readings)
+            target = event.target_time.timestamp()
+            slack = times + event_durations - target
+            late = np.nonzero(slack >= 0)[0]
+            if not late.size:
+                trigger = target - max(event_durations[-1], 0.)
+            elif late[0] == 0:
+                trigger = times[0]
+            else:
+                k = late[0]
+                trigger = times[k-1] + self._step_s * -slack[k-1] / (slack[k] - slack[k-1])
+            self._plans[event.name] = (float(trigger), float(event_durations[0]))
+            self._parent.debug("Planned {} for {} from forecast", event.name,
+                               datetime.fromtimestamp(trigger, timezone.utc))
+
+    def _margin(self, event, current_temp, readings):
+        '''return the seconds the event's quantile adds to the mean prediction, taken as constant over the plan'''
+        predictor = self._parent.predictor
+        mean = predictor.predict(event.target_temp, current_temp, readings)
+        upper = predictor.predict_quantile(event.target_temp, current_temp, readings, event.quantile)
+        if mean is None or upper is None:
+            return 0.
+        return float(upper - mean)
+
+    def _forecast(self):
+        '''return (timestamps, values) arrays from the forecast attribute, or None'''
+        import numpy as np
+        forecast = self._parent.hass.get_state(self.entity_id, attribute=self.attribute)
+        points = []
+        for entry in forecast or []:
+            try:
+                when = entry['datetime']
+                when = when if isinstance(when, datetime) else datetime.fromisoformat(when)
+                points.append((when.timestamp(), float(entry[self._field])))
+            except (KeyError, ValueError, TypeError):
+                continue
+        if not points:
+            return None
+        points.sort()
+        return np.array([point[0] for point in points]), np.array([point[1] for point in points])
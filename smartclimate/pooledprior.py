@@ -0,0 +1,162 @@
+from threading import Lock
+from weakref import WeakKeyDictionary
+
+_PRIORS = WeakKeyDictionary()
+_PRIORS_LOCK = Lock()
+
+def get_prior(store):
+    '''return the PooledPrior shared by zones of store, seeding it from the store on first use'''
+    with _PRIORS_LOCK:
+        prior = _PRIORS.get(store, None)
+        if prior is None:
+            prior = _PRIORS[store] = PooledPrior()
+            for zone in list(store.data):
+                if zone != '_version':
+                    prior.set_zone(zone, store.snapshot(zone))
+    return prior
+
+class PooledPrior:
+    '''Linear fit of duration on [1, target_temp, start_temp] pooled across zones
+
+    Each zone's X'X and X'y are kept alongside running totals, so adding a
+    datapoint is a rank one update and the prior for a zone, which leaves
+    out its own data, is a 3x3 solve.'''
+    min_datapoints = 3
+
+    def __init__(self):
+        import numpy as np
+        self._lock = Lock()
+        self._zones = {}
+        self._total = (np.zeros((3, 3)), np.zeros(3), 0)
+        self._cache = {}
+
+    @staticmethod
+    def _statistics(datapoints):
+        import numpy as np
+        rows = np.array([[1., datapoint['target_temp'], datapoint['start_temp'], datapoint['duration_s']]
+                         for datapoint in datapoints]).reshape(-1, 4)
+        return rows[:, :3].T @ rows[:, :3], rows[:, :3].T @ rows[:, 3], len(rows)
+
+    def set_zone(self, zone, datapoints):
+        '''replace zone's statistics with those of datapoints'''
+        statistics = self._statistics(datapoints)
+        with self._lock:
+            old = self._zones.get(zone, None)
+            self._zones[zone] = statistics
+            self._adjust(statistics, old)
+
+    def add(self, zone, datapoint):
+        '''add one datapoint of zone'''
+        statistics = self._statistics([datapoint])
+        with self._lock:
+            old = self._zones.get(zone, None)
+            self._zones[zone] = statistics if old is None else \
+                (old[0] + statistics[0], old[1] + statistics[1], old[2] + statistics[2])
+            self._adjust(statistics)
+
+    def _adjust(self, add, remove=None):
+        xtx, xty, count = self._total
+        xtx, xty, count = xtx + add[0], xty + add[1], count + add[2]
+        if remove is not None:
+            xtx, xty, count = xtx - remove[0], xty - remove[1], count - remove[2]
+        self._total = (xtx, xty, count)
+        self._cache = {}
+
+    def coefficients(self, exclude=None):
+        '''return [intercept, target_temp coef, start_temp coef] fitted on every zone but exclude, or None'''
+        import numpy as np
+        with self._lock:
+            if exclude in self._cache:
+                return self._cache[exclude]
+            xtx, xty, count = self._total
+            if exclude in self._zones:
+                own = self._zones[exclude]
+                xtx, xty, count = xtx - own[0], xty - own[1], count - own[2]
+            coefficients = None
+            if count >= self.min_datapoints:
+                # least squares copes with a singular X'X when all heat-ups look alike
+                coefficients = np.linalg.lstsq(xtx, xty, rcond=None)[0]
+            self._cache[exclude] = coefficients
+            return coefficients
+
+class PooledPredictor:
+    '''Shrinks a zone's predictor toward the pooled prior of all other zones
+
+    Predictions are weighted n / (n + weight) toward the zone's own model,
+    where n is the number of datapoints it learned from, so a new zone uses
+    the prior alone and converges to its own fit as data accumulates.'''
+
+    def __init__(self, predictor, prior, zone, weight=5.):
+        self.predictor = predictor
+        self._prior = prior
+        self._zone = zone
+        self._weight = float(weight)
+        self._count = 0
+
+    def check_ready(self, datapoints):
+        '''Return whether the zone's own model can be fitted'''
+        return self.predictor.check_ready(datapoints)
+
+    def learn(self, datapoints):
+        '''Fit the zone's own model'''
+        self._count = len(datapoints)
+        self.predictor.learn(datapoints)
+
+    @property
+    def own_weight(self):
+        '''weight given to the zone's own predictions'''
+        return self._count / (self._count + self._weight)
+
+    def _prior_predictions(self, target_temps, current_temps):
+        import numpy as np
+        coefficients = self._prior.coefficients(exclude=self._zone)
+        if coefficients is None:
+            return None
+        return coefficients[0] + coefficients[1] * np.asarray(target_temps, dtype=float) + \
+            coefficients[2] * np.asarray(current_temps, dtype=float)
+
+    def _blend(self, own, prior):
+        if prior is None:
+            return own
+        if own is None:
+            return int(round(float(prior)))
+        return int(round(self.own_weight * own + (1. - self.own_weight) * float(prior)))
+
+    def predict(self, target_temp, current_temp, sensor_readings):
+        '''Predict the time to reach target_temp'''
+        return self._blend(self.predictor.predict(target_temp, current_temp, sensor_readings),
+                           self._prior_predictions(target_temp, current_temp))
+
+    def predict_many(self, features, sensor_names):
+        '''Predict times to heat for rows of [target_temp, current_temp, values of sensor_names...]'''
+        import numpy as np
+        own = self.predictor.predict_many(features, sensor_names)
+        features = np.asarray(features, dtype=float).reshape(-1, 2 + len(sensor_names))
+        prior = self._prior_predictions(features[:, 0], features[:, 1])
+        if prior is None:
+            return own
+        return [self._blend(own[i] if own is not None else None, prior[i]) for i in range(len(features))]
+
+    def predict_quantile(self, target_temp, current_temp, sensor_readings, quantile):
+        '''Predict a quantile, keeping the own model's spread around the blended prediction'''
+        own = self.predictor.predict(target_temp, current_temp, sensor_readings)
+        prediction = self.predict(target_temp, current_temp, sensor_readings)
+        if own is None or prediction is None:
+            return prediction
+        return prediction + self.predictor.predict_quantile(target_temp, current_temp, sensor_readings, quantile) - own
+
+    def prediction_interval(self, target_temp, current_temp, sensor_readings, confidence):
+        '''Return the own model's interval shifted to the blended prediction, or None'''
+        interval = self.predictor.prediction_interval(target_temp, current_temp, sensor_readings, confidence)
+        if interval is None:
+            return None
+        shift = self.predict(target_temp, current_temp, sensor_readings) - \
+            self.predictor.predict(target_temp, current_temp, sensor_readings)
+        return interval[0] + shift, interval[1] + shift
+
+    def sensitivities(self):
+        '''Return the own model's sensitivities scaled by its weight; the prior has no sensors'''
+        sensitivities = self.predictor.sensitivities()
+        if sensitivities is None:
+            return {} if self._prior.coefficients(exclude=self._zone) is not None else None
+        return {name: value * self.own_weight for name, value in sensitivities.items()}
@@ -1,11 +1,24 @@
+import math
+from featureschema import FeatureSchema
+
 class LinearPredictor:
     '''Linear regression model for predicting heating time'''
     def __init__(self, name, hasslog):
-        from sklearn import linear_model
         self._name = name
         self.log = hasslog
-        self._predictor = linear_model.LinearRegression()
+        # created on first fit, so constructing a predictor doesn't import sklearn
+        self._predictor = None
+        self._schema = FeatureSchema()
         self._ready = False
+        self._covariance = None
+        self._residual_var = None
+        self._dof = 0
+        self._t_quantiles = {}
+
+    @staticmethod
+    def _create_model():
+        from sklearn import linear_model
+        return linear_model.LinearRegression()
 
     def predict(self, target_temp, current_temp, sensor_readings):
         '''Predict the time to reach target_temp'''
@@ -13,11 +26,10 @@ class LinearPredictor:
             self.log.debug("[{}] Insufficient data, not making prediction", self._name)
             return None
 
-        prediction = (self._predictor.intercept_ +
-                      target_temp * self._predictor.coef_[0] +
-                      current_temp * self._predictor.coef_[1])
-        for i, (_, value) in enumerate(sensor_readings):
-            prediction += value * self._predictor.coef_[i+2]
+        x_value = self._schema.vector(target_temp, current_temp, sensor_readings)
+        prediction = self._predictor.intercept_
+        for value, coef in zip(x_value, self._predictor.coef_):
+            prediction += value * coef
 
         prediction = int(round(prediction))
 
@@ -25,24 +37,207 @@ class LinearPredictor:
                        target_temp, current_temp, sensor_readings, prediction)
         return prediction
 
+    def predict_many(self, features, sensor_names):
+        '''Predict times to heat for rows of [target_temp, current_temp, values of sensor_names...]'''
+        if not self._ready:
+            self.log.debug("[{}] Insufficient data, not making predictions", self._name)
+            return None
+
+        predictions = self._predictor.intercept_ + self._schema.matrix(features, sensor_names) @ self._predictor.coef_
+        return [int(round(prediction)) for prediction in predictions]
+
     def learn(self, datapoints):
         '''Intrepret measured data'''
         if not self.check_ready(datapoints):
             self._ready = False
             return
 
-        x_values = [[datapoint['target_temp'], datapoint['start_temp']] +
-                    [value for _, value in datapoint['sensor_readings']] for datapoint in datapoints]
-        y_values = [datapoint['duration_s'] for datapoint in datapoints]
+        self._schema.update(datapoints)
+        x_values, y_values = self._schema.design()
+        if self._predictor is None:
+            self._predictor = self._create_model()
         self._predictor.fit(x_values, y_values)
         self._ready = True
-        self.log.debug("[{}] Intercept:{} Coefficients:{}", self._name,
+        self._fit_uncertainty(x_values, y_values)
+        self.log.debug("[{}] Sensors:{} Intercept:{} Coefficients:{}", self._name, self._schema.names,
                        self._predictor.intercept_, self._predictor.coef_)
 
+    def _fit_uncertainty(self, x_values, y_values):
+        '''cache (X'X)^-1 and the residual variance for prediction intervals'''
+        import numpy as np
+        design = np.column_stack([np.ones(len(x_values)), np.asarray(x_values, dtype=float)])
+        coefficients = np.concatenate([[self._predictor.intercept_], self._predictor.coef_])
+        residuals = np.asarray(y_values, dtype=float) - design @ coefficients
+        self._dof = len(y_values) - design.shape[1]
+        self._covariance = np.linalg.pinv(design.T @ design)
+        self._residual_var = float(residuals @ residuals) / self._dof if self._dof > 0 else None
+        self._t_quantiles = {}
+
+    def sensitivities(self):
+        '''Return {sensor name: seconds of prediction per unit change}, or None if not ready'''
+        if not self._ready:
+            return None
+        return {name: abs(float(coef)) for name, coef in zip(self._schema.names, self._predictor.coef_[2:])}
+
+    def predict_quantile(self, target_temp, current_temp, sensor_readings, quantile):
+        '''Predict the given quantile of the time to reach target_temp
+
+        Falls back to the point prediction when there is too little data to
+        estimate the spread.'''
+        prediction = self.predict(target_temp, current_temp, sensor_readings)
+        if prediction is None or self._residual_var is None:
+            return prediction
+
+        import numpy as np
+        x_value = np.array([1.] + self._schema.vector(target_temp, current_temp, sensor_readings))
+        std_err = (self._residual_var * (1. + x_value @ self._covariance @ x_value)) ** 0.5
+        return int(round(prediction + self._t_quantile(quantile) * std_err))
+
+    def prediction_interval(self, target_temp, current_temp, sensor_readings, confidence):
+        '''Return (lower, upper) bounds containing the time to heat with the given confidence'''
+        if not self._ready or self._residual_var is None:
+            return None
+        lower = self.predict_quantile(target_temp, current_temp, sensor_readings, (1. - confidence) / 2.)
+        upper = self.predict_quantile(target_temp, current_temp, sensor_readings, (1. + confidence) / 2.)
+        return lower, upper
+
+    def _t_quantile(self, quantile):
+        if quantile not in self._t_quantiles:
+            from scipy.stats import t
+            self._t_quantiles[quantile] = float(t.ppf(quantile, self._dof))
+        return self._t_quantiles[quantile]
+
     @staticmethod
     def check_ready(datapoints):
         '''Return whether there are anough datapoints to make sensible predictions'''
         if not datapoints:
             return False
-        num_sensors = len(datapoints[0]['sensor_readings'])
-        return len(datapoints) >= num_sensors + 3
+        return len(datapoints) >= FeatureSchema.count_features(datapoints) + 3
+
+class RidgePredictor(LinearPredictor):
+    '''L2-regularised linear model, more stable with correlated sensors'''
+    @staticmethod
+    def _create_model():
+        from sklearn import linear_model
+        return linear_model.Ridge(alpha=0.1)
+
+class HuberPredictor(LinearPredictor):
+    '''Linear model with a Huber loss, robust to badly tracked outliers'''
+    @staticmethod
+    def _create_model():
+        from sklearn import linear_model
+        return linear_model.HuberRegressor(max_iter=1000)
+
+class ExponentialPredictor(LinearPredictor):
+    '''Newton's law of heating model for predicting heating time
+
+    The zone approaches an equilibrium temperature exponentially with time
+    constant tau, so the time from s to g is tau * ln((e - s) / (e - g)),
+    where e is the equilibrium temperature. The headroom e - g is modelled
+    as exp(c0 + c1*g + c.sensors) to keep it positive.'''
+
+    _warned_no_interval = False
+
+    @staticmethod
+    def _create_model():
+        return None
+
+    def predict_quantile(self, target_temp, current_temp, sensor_readings, quantile):
+        '''Predict the time to reach target_temp; the model has no spread, so this is the point prediction'''
+        self._warn_no_interval()
+        return self.predict(target_temp, current_temp, sensor_readings)
+
+    def prediction_interval(self, target_temp, current_temp, sensor_readings, confidence):
+        '''Return None, the model has no prediction interval'''
+        self._warn_no_interval()
+        return None
+
+    def _warn_no_interval(self):
+        if not self._warned_no_interval:
+            self._warned_no_interval = True
+            self.log.warning("[{}] Exponential model has no prediction interval, using its point prediction",
+                             self._name)
+
+    def predict(self, target_temp, current_temp, sensor_readings):
+        '''Predict the time to reach target_temp'''
+        if not self._ready:
+            self.log.debug("[{}] Insufficient data, not making prediction", self._name)
+            return None
+
+        prediction = int(round(self._duration(self._predictor,
+                                              self._schema.vector(target_temp, current_temp, sensor_readings))))
+
+        self.log.debug("[{}] Prediction for {} {} {}: {}", self._name,
+                       target_temp, current_temp, sensor_readings, prediction)
+        return prediction
+
+    def predict_many(self, features, sensor_names):
+        '''Predict times to heat for rows of [target_temp, current_temp, values of sensor_names...]'''
+        if not self._ready:
+            self.log.debug("[{}] Insufficient data, not making predictions", self._name)
+            return None
+
+        import numpy as np
+        features = self._schema.matrix(features, sensor_names)
+        params = np.asarray(self._predictor)
+        tau = np.exp(min(params[0], 50.0))
+        exponent = params[1] + features[:, 0] * params[2] + features[:, 2:] @ params[3:]
+        headroom = np.exp(np.clip(exponent, -50.0, 50.0))
+        rise = features[:, 0] - features[:, 1]
+        predictions = tau * np.log(np.maximum(headroom + rise, 1e-9) / headroom)
+        return [int(round(prediction)) for prediction in predictions]
+
+    def sensitivities(self):
+        '''Return {sensor name: seconds of prediction per unit change}, or None if not ready
+
+        The model isn't linear, so this is the largest slope over the training data.'''
+        if not self._ready:
+            return None
+        import numpy as np
+        x_values, _ = self._schema.design()
+        params = np.asarray(self._predictor)
+        tau = np.exp(min(params[0], 50.0))
+        exponent = params[1] + x_values[:, 0] * params[2] + x_values[:, 2:] @ params[3:]
+        headroom = np.exp(np.clip(exponent, -50.0, 50.0))
+        rise = x_values[:, 0] - x_values[:, 1]
+        # d duration / d headroom * d headroom / d sensor
+        slope = np.max(np.abs(tau * rise / np.maximum(headroom + rise, 1e-9)))
+        return {name: float(slope * abs(coef)) for name, coef in zip(self._schema.names, params[3:])}
+
+    def learn(self, datapoints):
+        '''Intrepret measured data'''
+        if not self.check_ready(datapoints):
+            self._ready = False
+            return
+
+        from scipy.optimize import least_squares
+        self._schema.update(datapoints)
+        x_values, durations = self._schema.design()
+
+        def residuals(params):
+            return [self._duration(params, x_value) - duration for x_value, duration in zip(x_values, durations)]
+
+        initial = [math.log(max(durations.mean(), 1.0)), 0.0] + [0.0] * (x_values.shape[1] - 1)
+        self._predictor = list(least_squares(residuals, initial).x)
+        self._ready = True
+        self.log.debug("[{}] Sensors:{} Parameters:{}", self._name, self._schema.names, self._predictor)
+
+    @staticmethod
+    def _duration(params, x_value):
+        '''time to heat for a feature row of [target_temp, start_temp, sensor values...]'''
+        tau = math.exp(min(params[0], 50.0))
+        exponent = params[1] + params[2] * x_value[0] + sum(coef * value
+                                                             for coef, value in zip(params[3:], x_value[2:]))
+        headroom = math.exp(min(max(exponent, -50.0), 50.0))
+        return tau * math.log(max(headroom + x_value[0] - x_value[1], 1e-9) / headroom)
+
+PREDICTORS = {
+    'linear': LinearPredictor,
+    'ridge': RidgePredictor,
+    'huber': HuberPredictor,
+    'exponential': ExponentialPredictor,
+}
+
+def create_predictor(kind, name, hasslog):
+    '''Create a predictor from the PREDICTORS registry'''
+    return PREDICTORS[kind](name, hasslog)
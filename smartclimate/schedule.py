@@ -0,0 +1,197 @@
+import heapq
+from itertools import count
+from datetime import datetime, timedelta
+
+DAY_NAMES = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+DAY_ALIASES = {
+    'daily': range(7),
+    'weekdays': range(5),
+    'weekends': range(5, 7),
+}
+
+class ScheduleRule:
+    '''Recurring target times as sets of cron fields
+
+    Weekdays are numbered from Monday = 0. As in cron, when both the day of
+    the month and the weekday are restricted a day matching either is used.'''
+
+    def __init__(self, minutes, hours, days=None, months=None, weekdays=None):
+        self.minutes = sorted(minutes)
+        self.hours = sorted(hours)
+        self.days = set(days) if days is not None else None
+        self.months = set(months) if months is not None else None
+        self.weekdays = set(weekdays) if weekdays is not None else None
+
+    @classmethod
+    def parse(cls, data):
+        '''return a rule from a set_preheat event's cron, or target_time and days, fields'''
+        if 'cron' in data:
+            return cls.from_cron(data['cron'])
+        parts = [int(part) for part in str(data['target_time']).split(':')]
+        return cls([parts[1] if len(parts) >= 2 else 0], [parts[0]],
+                   weekdays=cls._parse_weekdays(data.get('days', 'daily')))
+
+    @classmethod
+    def from_cron(cls, expression):
+        '''return a rule from a 'minute hour day month weekday' expression'''
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError("Expected 5 cron fields in '{}'".format(expression))
+        weekdays = cls._parse_field(fields[4], 0, 7)
+        if weekdays is not None:
+            # cron counts from Sunday = 0 (or 7)
+            weekdays = {(day + 6) % 7 for day in weekdays}
+        return cls(cls._parse_field(fields[0], 0, 59) or range(60), cls._parse_field(fields[1], 0, 23) or range(24),
+                   days=cls._parse_field(fields[2], 1, 31), months=cls._parse_field(fields[3], 1, 12),
+                   weekdays=weekdays)
+
+    @staticmethod
+    def _parse_field(field, low, high):
+        '''return the set of values a cron field matches, or None for any'''
+        if field == '*':
+            return None
+        values = set()
+        for part in field.split(','):
+            part, _, step = part.partition('/')
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start, end = (int(value) for value in part.split('-'))
+            else:
+                start = int(part)
+                end = high if step else start
+            if not low <= start <= end <= high:
+                raise ValueError("Cron field '{}' out of range {}-{}".format(field, low, high))
+            values.update(range(start, end + 1, int(step) if step else 1))
+        return values
+
+    @staticmethod
+    def _parse_weekdays(days):
+        if isinstance(days, str):
+            if days in DAY_ALIASES:
+                return set(DAY_ALIASES[days])
+            days = days.split(',')
+        weekdays = set()
+        for day in days:
+            if isinstance(day, int):
+                weekdays.add(day)
+            elif '-' in day:
+                start, end = (DAY_NAMES.index(name.strip()[:3].lower()) for name in day.split('-'))
+                weekdays.update(range(start, end + 1))
+            else:
+                weekdays.add(DAY_NAMES.index(day.strip()[:3].lower()))
+        return weekdays
+
+    def _matches_day(self, day):
+        if self.months is not None and day.month not in self.months:
+            return False
+        if self.days is not None and self.weekdays is not None:
+            return day.day in self.days or day.weekday() in self.weekdays
+        if self.days is not None:
+            return day.day in self.days
+        return self.weekdays is None or day.weekday() in self.weekdays
+
+    def next_after(self, when):
+        '''return the first occurrence strictly after when, or None within the next four years'''
+        day = when.date()
+        for _ in range(4 * 366):
+            if self._matches_day(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        occurrence = datetime(day.year, day.month, day.day, hour, minute)
+                        if occurrence > when:
+                            return occurrence
+            day += timedelta(days=1)
+        return None
+
+class ScheduleEngine:
+    '''Recurring preheats for a zone
+
+    Each rule is only expanded to its next occurrence. Occurrences sit in a
+    heap until lookahead_s before their target time, when activate is called
+    with a preheat for them, and expire is called at the target time before
+    the rule moves on to its next occurrence. A single timer is kept for the
+    earliest heap entry however many rules there are.'''
+
+    def __init__(self, parent, activate, expire, lookahead_s=6*3600):
+        self._parent = parent
+        self._activate = activate
+        self._expire = expire
+        self._lookahead = timedelta(seconds=lookahead_s)
+        self._rules = {}
+        self._heap = []
+        self._sequence = count()
+        self._timer = None
+        self._timer_when = None
+
+    def __contains__(self, name):
+        return name in self._rules
+
+    def __len__(self):
+        return len(self._rules)
+
+    def add(self, name, rule, create):
+        '''schedule create(target_time) to be activated ahead of each occurrence of rule'''
+        self.remove(name)
+        self._rules[name] = (rule, create, next(self._sequence))
+        self._arm(name, self._parent.hass.datetime())
+        self._run_due()
+
+    def remove(self, name):
+        '''stop scheduling name; its heap entries are skipped when they come up'''
+        self._rules.pop(name, None)
+
+    def cancel(self):
+        '''remove every rule and the timer'''
+        self._rules = {}
+        self._heap = []
+        if self._timer is not None:
+            self._parent.hass.cancel_timer(self._timer)
+            self._timer = self._timer_when = None
+
+    def next_occurrence(self, name):
+        '''return the next target time scheduled for name, or None'''
+        entries = [entry for entry in self._heap if entry[2] == name and self._is_current(entry)]
+        return min(entries)[4] if entries else None
+
+    def _arm(self, name, after):
+        rule, _, generation = self._rules[name]
+        occurrence = rule.next_after(after)
+        if occurrence is None:
+            self._parent.info("Schedule {} has no further occurrences", name)
+            return
+        heapq.heappush(self._heap, (occurrence - self._lookahead, next(self._sequence), name,
+                                    generation, occurrence, 'activate'))
+
+    def _is_current(self, entry):
+        rule = self._rules.get(entry[2], None)
+        return rule is not None and rule[2] == entry[3]
+
+    def _run_due(self):
+        now = self._parent.hass.datetime()
+        while self._heap and (self._heap[0][0] <= now or not self._is_current(self._heap[0])):
+            entry = heapq.heappop(self._heap)
+            if not self._is_current(entry):
+                continue
+            _, _, name, generation, occurrence, action = entry
+            if action == 'activate':
+                self._parent.debug("Activating schedule {} for {}", name, occurrence)
+                self._activate(name, self._rules[name][1](occurrence))
+                heapq.heappush(self._heap, (occurrence, next(self._sequence), name, generation, occurrence, 'expire'))
+            else:
+                self._expire(name)
+                self._arm(name, occurrence)
+        self._set_timer()
+
+    def _set_timer(self):
+        when = self._heap[0][0] if self._heap else None
+        if when == self._timer_when:
+            return
+        if self._timer is not None:
+            self._parent.hass.cancel_timer(self._timer)
+        self._timer_when = when
+        self._timer = self._parent.hass.run_at(self._handle_timer, when) if when is not None else None
+
+    def _handle_timer(self, *args, **kwargs):
+        self._timer = self._timer_when = None
+        self._run_due()
@@ -0,0 +1,89 @@
+import math
+from collections import deque
+
+class SensorHistory:
+    '''Fixed size ring buffer of timestamped readings for one sensor
+
+    Rolling mean, EWMA, min and max are maintained as readings arrive so
+    querying them is O(1).'''
+    STATISTICS = ('latest', 'mean', 'ewma', 'min', 'max')
+
+    def __init__(self, size, ewma_tau_s=600.):
+        import numpy as np
+        self._size = size
+        self._ewma_tau_s = ewma_tau_s
+        self._timestamps = np.zeros(size, dtype=np.float64)
+        self._values = np.zeros(size, dtype=np.float64)
+        self._count = 0
+        self._sum = 0.
+        self._ewma = None
+        # monotonic queues of (sequence number, value) for rolling min/max
+        self._min_queue = deque()
+        self._max_queue = deque()
+
+    def __len__(self):
+        return min(self._count, self._size)
+
+    def append(self, timestamp, value):
+        '''add a reading, evicting the oldest once the buffer is full'''
+        index = self._count % self._size
+        previous = self._timestamps[(self._count - 1) % self._size]
+        if self._count >= self._size:
+            self._sum -= self._values[index]
+
+        self._timestamps[index] = timestamp
+        self._values[index] = value
+        self._sum += value
+
+        if self._ewma is None:
+            self._ewma = value
+        else:
+            weight = 1. - math.exp(-max(timestamp - previous, 0.) / self._ewma_tau_s)
+            self._ewma += weight * (value - self._ewma)
+
+        oldest = self._count - self._size + 1
+        self._push(self._min_queue, self._count, value, oldest, lambda last: last >= value)
+        self._push(self._max_queue, self._count, value, oldest, lambda last: last <= value)
+        self._count += 1
+
+    @staticmethod
+    def _push(queue, sequence, value, oldest, dominated):
+        while queue and dominated(queue[-1][1]):
+            queue.pop()
+        queue.append((sequence, value))
+        while queue[0][0] < oldest:
+            queue.popleft()
+
+    @property
+    def latest(self):
+        return float(self._values[(self._count - 1) % self._size]) if self._count else None
+
+    @property
+    def mean(self):
+        return self._sum / len(self) if self._count else None
+
+    @property
+    def ewma(self):
+        return self._ewma
+
+    @property
+    def min(self):
+        return self._min_queue[0][1] if self._count else None
+
+    @property
+    def max(self):
+        return self._max_queue[0][1] if self._count else None
+
+    def statistic(self, name):
+        '''return one of STATISTICS by name'''
+        if name not in self.STATISTICS:
+            raise ValueError('Unknown sensor statistic {}'.format(name))
+        return getattr(self, name)
+
+    def readings(self):
+        '''return (timestamps, values) arrays in chronological order'''
+        import numpy as np
+        if self._count <= self._size:
+            return self._timestamps[:self._count].copy(), self._values[:self._count].copy()
+        start = self._count % self._size
+        return np.roll(self._timestamps, -start), np.roll(self._values, -start)
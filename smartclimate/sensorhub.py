@@ -0,0 +1,22 @@
+import appdaemon.plugins.hass.hassapi as hass
+from sensorhubimpl import SensorHubImpl
+
+class SensorHub(hass.Hass):
+    '''Shared sensor subscriptions and cached readings for all zones'''
+
+    def initialize(self):
+        '''appdaemon init callback'''
+        # pylint: disable=attribute-defined-outside-init
+        self.impl = SensorHubImpl(self)
+
+    def subscribe(self, callback, entity_id, attribute=None):
+        '''call callback(entity_id, new, old) when the sensor changes'''
+        self.impl.subscribe(callback, entity_id, attribute=attribute)
+
+    def unsubscribe(self, callback, entity_id, attribute=None):
+        '''stop calling callback for the sensor'''
+        self.impl.unsubscribe(callback, entity_id, attribute=attribute)
+
+    def get_value(self, entity_id, attribute=None):
+        '''return the cached reading for the sensor'''
+        return self.impl.get_value(entity_id, attribute=attribute)
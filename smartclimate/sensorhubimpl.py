@@ -0,0 +1,61 @@
+from threading import Lock
+from hasslog import HassLog
+from sensorset import SensorSet
+from appdaemon_hass_interface import AppDaemonHassInterface
+
+class SensorHubImpl(HassLog):
+    '''Implementation of SensorHub
+
+    Each (entity_id, attribute) is subscribed to once however many zones
+    use it, and its parsed reading is cached for SensorSet to read.'''
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.hass = AppDaemonHassInterface(app)
+        self._lock = Lock()
+        self._subscribers = {}
+        self._values = {}
+
+    def subscribe(self, callback, entity_id, attribute=None):
+        '''call callback(entity_id, new, old) when the sensor changes'''
+        key = (entity_id, attribute)
+        with self._lock:
+            subscribers = self._subscribers.get(key, None)
+            if subscribers is not None:
+                subscribers.append(callback)
+                return
+            self._subscribers[key] = [callback]
+            self._values[key] = self._read(entity_id, attribute)
+
+        self.debug("Subscribing to {}", key)
+        self.hass.listen_state(self._state_handler(key), entity_id, attribute=attribute)
+
+    def unsubscribe(self, callback, entity_id, attribute=None):
+        '''stop calling callback for the sensor'''
+        with self._lock:
+            subscribers = self._subscribers.get((entity_id, attribute), [])
+            if callback in subscribers:
+                subscribers.remove(callback)
+
+    def get_value(self, entity_id, attribute=None):
+        '''return the cached reading for the sensor'''
+        key = (entity_id, attribute)
+        with self._lock:
+            if key in self._values:
+                return self._values[key]
+        return self._read(entity_id, attribute)
+
+    def _read(self, entity_id, attribute):
+        return SensorSet.parse_reading(self.hass.get_state(entity_id, attribute=attribute))
+
+    def _state_handler(self, key):
+        def handler(entity_id, new, old):
+            value = SensorSet.parse_reading(new, key[1])
+            with self._lock:
+                if value is not None and value == self._values.get(key, None):
+                    return
+                self._values[key] = value
+                subscribers = list(self._subscribers[key])
+            for callback in subscribers:
+                callback(entity_id, new, old)
+        return handler
@@ -1,8 +1,16 @@
+from sensorhistory import SensorHistory
+
 class SensorSet:
     '''sensors for a particular zone'''
-    def __init__(self, parent, sensors):
+    default_history = 60
+
+    def __init__(self, parent, sensors, hub=None):
         self._parent = parent
         self._sensors = sensors
+        self._hub = hub
+        self._histories = [SensorHistory(sensor.get('history', self.default_history),
+                                         float(sensor.get('ewma_tau_s', 600)))
+                           for sensor in sensors]
 
     def __iter__(self):
         return iter(self._sensors)
@@ -10,10 +18,35 @@ class SensorSet:
     def __len__(self):
         return len(self._sensors)
 
+    def names(self):
+        '''return the names readings are reported under'''
+        return [self._get_sensor_name(sensor) for sensor in self._sensors]
+
+    def history(self, index):
+        '''return the SensorHistory of the sensor at index'''
+        return self._histories[index]
+
+    def record(self, index, new):
+        '''record a state update for the sensor at index from a listen_state callback, returning its value'''
+        value = self.parse_reading(new, self._sensors[index].get('attribute', None))
+        if value is not None:
+            self._histories[index].append(self._parent.hass.datetime().timestamp(), value)
+        return value
+
+    @staticmethod
+    def parse_reading(new, attribute=None):
+        '''return a state or attribute value as a float, or None if it isn't numeric'''
+        if isinstance(new, dict):
+            new = new.get('attributes', {}).get(attribute) if attribute is not None else new.get('state')
+        try:
+            return float(new)
+        except (TypeError, ValueError):
+            return None
+
     def get_readings(self):
         '''return readings for all sensors, or None on error'''
-        sensor_readings = [(self._get_sensor_name(sensor), self._read_sensor(sensor))
-                           for sensor in self._sensors]
+        sensor_readings = [(self._get_sensor_name(sensor), self._get_value(sensor, history))
+                           for sensor, history in zip(self._sensors, self._histories)]
 
         if None in (value for (_, value) in sensor_readings):
             self._parent.warning("Failed getting one or more sensor readings...")
@@ -21,6 +54,12 @@ class SensorSet:
 
         return sensor_readings
 
+    def _get_value(self, sensor, history):
+        smoothing = sensor.get('smoothing', 'none')
+        if smoothing != 'none' and len(history):
+            return history.statistic(smoothing)
+        return self._read_sensor(sensor)
+
     @staticmethod
     def _get_sensor_name(sensor):
         if 'name' in sensor:
@@ -31,6 +70,9 @@ class SensorSet:
             return sensor['entity_id']
 
     def _read_sensor(self, sensor):
+        if self._hub is not None:
+            return self._hub.get_value(sensor['entity_id'], attribute=sensor.get('attribute', None))
+
         if 'attribute' in sensor:
             value = self._parent.hass.get_state(sensor['entity_id'], attribute=sensor['attribute'])
             return float(value) if value is not None else None
@@ -1,9 +1,16 @@
 import appdaemon.plugins.hass.hassapi as hass
 from datastore import DataStore # pylint: disable=unused-import
+from eventrouter import EventRouter # pylint: disable=unused-import
+from sensorhub import SensorHub # pylint: disable=unused-import
 from zoneimpl import ZoneImpl
 
 class Zone(hass.Hass):
     def initialize(self):
         # pylint: disable=attribute-defined-outside-init
         store = self.get_app(self.config["store"])
-        self.zone = ZoneImpl(self, store)
+        router = self.get_app(self.config["router"]) if "router" in self.config else None
+        sensor_hub = self.get_app(self.config["sensor_hub"]) if "sensor_hub" in self.config else None
+        self.zone = ZoneImpl(self, store, router=router, sensor_hub=sensor_hub)
+
+    def terminate(self):
+        self.zone.terminate()
@@ -2,16 +2,64 @@ from datetime import datetime, time, timezone, timedelta
 
 class SmartEvent:
     '''binary sensor which turns on when preheat should begin'''
-    def __init__(self, name, target_temp, target_time, parent):
+    def __init__(self, name, target_temp, target_time, parent, quantile=None):
         self._name = name
         self._parent = parent
         self._target_temp = target_temp
+        self._quantile = quantile
         self._target_time = self._convert_time(target_time)
         self._timer = None
+        self._trigger_time = None
+        self._next_refresh = None
+        self._timer_generation = 0
         self._triggered = False
         self.update()
 
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def target_temp(self):
+        return self._target_temp
+
+    @property
+    def target_time(self):
+        return self._target_time
+
+    @property
+    def triggered(self):
+        return self._triggered
+
+    @property
+    def quantile(self):
+        return self._quantile
+
+    def interval(self, confidence=0.9):
+        '''return (lower, upper) bounds on the current time to heat, or None'''
+        return self._parent.predict_interval(self._target_temp, confidence)
+
+    def urgent(self, horizon_s):
+        '''return whether the event may trigger within horizon_s, so it shouldn't wait for a deferred update'''
+        if self._triggered:
+            return False
+        if self._trigger_time is None:
+            return True
+        now = self._parent.hass.datetime().astimezone(timezone.utc)
+        return (self._trigger_time - now).total_seconds() <= horizon_s
+
+    @property
+    def next_refresh(self):
+        '''when the event next needs recomputing under lazy refresh, or None'''
+        return self._next_refresh
+
+    def deferrable(self, now):
+        '''return whether an update at now can wait until next_refresh'''
+        return not self._triggered and self._next_refresh is not None and now < self._next_refresh
+
     def _convert_time(self, timestr):
+        if isinstance(timestr, datetime):
+            return timestr
         parts = timestr.split(':')
         timeval = time(hour=int(parts[0]),
                        minute=int(parts[1] if len(parts) >= 2 else 0),
@@ -33,18 +81,27 @@ class SmartEvent:
         if self._timer is not None:
             self._parent.hass.cancel_timer(self._timer)
 
-        prediction = self._parent.predict(self._target_temp)
-        if prediction is None:
-            prediction = self._parent.default_preheat
+        trigger_time = None
+        if self._parent.planner is not None:
+            trigger_time = self._parent.planner.trigger_time(self)
 
-        trigger_time = self._target_time.astimezone(timezone.utc) - timedelta(seconds=prediction)
-        if trigger_time <= self._parent.hass.datetime().astimezone(timezone.utc):
+        if trigger_time is None:
+            prediction = self._parent.predict(self._target_temp, quantile=self._quantile)
+            if prediction is None:
+                prediction = self._parent.default_preheat
+            trigger_time = self._target_time.astimezone(timezone.utc) - timedelta(seconds=prediction)
+        self._trigger_time = trigger_time
+        now = self._parent.hass.datetime().astimezone(timezone.utc)
+        policy = self._parent.refresh_policy
+        self._next_refresh = policy.next_refresh(now, trigger_time) if policy is not None else None
+        if trigger_time <= now:
             self._fire_event()
         else:
             # ugh, appdaemon uses timezone-naive local time...
             ad_trigger_time = trigger_time.astimezone().replace(tzinfo=None)
             self._parent.info("Setting event {} timer for {}", self._name, ad_trigger_time)
-            self._timer = self._parent.hass.run_at(self._handle_timer, ad_trigger_time)
+            self._timer_generation += 1
+            self._timer = self._parent.hass.run_at(self._timer_handler(self._timer_generation), ad_trigger_time)
 
     def _fire_event(self):
         self._triggered = True
@@ -53,9 +110,15 @@ class SmartEvent:
 
     def cancel(self):
         '''cancel timer'''
+        self._timer_generation += 1
         if self._timer is not None:
             self._parent.hass.cancel_timer(self._timer)
 
-    def _handle_timer(self, **kwargs):
-        self._timer = None
-        self._fire_event()
+    def _timer_handler(self, generation):
+        def handler(*args, **kwargs):
+            # a queued callback may arrive after its timer was replaced
+            if generation != self._timer_generation or self._triggered:
+                return
+            self._timer = None
+            self._fire_event()
+        return handler
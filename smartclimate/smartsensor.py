@@ -1,16 +1,30 @@
 class SmartSensor:
     '''binary sensor which turns on when preheat should begin'''
-    def __init__(self, name, target_temp, parent):
+    def __init__(self, name, target_temp, parent, confidence=None):
         self._name = name
         self._parent = parent
         self._target_temp = target_temp
+        self._confidence = confidence
         self.update()
 
+    def urgent(self, horizon_s): # pylint: disable=unused-argument
+        '''sensor publishes can always wait for a deferred update'''
+        return False
+
+    def deferrable(self, now): # pylint: disable=unused-argument
+        '''sensors publish the current prediction, so are never refreshed lazily'''
+        return False
+
     def update(self):
         '''update sensor state'''
         prediction = self._parent.predict(self._target_temp)
         prediction = prediction if prediction is not None else self._parent.default_preheat
         attributes = {'target_temp': self._target_temp}
+        if self._confidence is not None:
+            interval = self._parent.predict_interval(self._target_temp, self._confidence)
+            if interval is not None:
+                attributes['lower'], attributes['upper'] = interval
+                attributes['confidence'] = self._confidence
         self._parent.info("setting state for {} to {} with attrs {}", 'sensor.'+self._name, prediction, attributes)
         self._parent.hass.set_state('sensor.'+self._name, state=prediction, attributes=attributes)
 
@@ -0,0 +1,57 @@
+class Snapshot(tuple):
+    '''immutable datapoints of one zone at a version'''
+
+    def __new__(cls, datapoints, version=0, source=None):
+        snapshot = super().__new__(cls, datapoints)
+        snapshot.version = version
+        snapshot._source = source
+        return snapshot
+
+    def __reduce__(self):
+        # the source list is only for noticing direct appends in this process, so isn't pickled
+        return (Snapshot, (tuple(self), self.version))
+
+    def current(self, source):
+        '''return whether this snapshot still matches the list it was taken from'''
+        return self._source is source and (source is None or len(source) == len(self))
+
+class SnapshotStore:
+    '''Copy-on-write snapshots of each zone's datapoints for dict based stores
+
+    Writers hold the store lock, append to the datapoint list and publish a
+    new Snapshot, so readers get a consistent version with a dict lookup and
+    never wait for a writer. Code which still appends to
+    data[zone]['datapoints'] directly is noticed and a fresh snapshot built.
+    Expects the class to provide data, lock and save().'''
+
+    _snapshots = None
+
+    def snapshot(self, zone):
+        '''return the current Snapshot of zone's datapoints, without taking the store lock'''
+        snapshot = (self._snapshots or {}).get(zone, None)
+        source = self.data.get(zone, {}).get('datapoints', None)
+        if snapshot is not None and snapshot.current(source):
+            return snapshot
+        with self.lock:
+            return self._publish(zone)
+
+    def add_datapoint(self, zone, datapoint):
+        '''append datapoint to zone, save, and return the new Snapshot'''
+        with self.lock:
+            # snapshots are copies, so the list can be appended to in place
+            self.data.setdefault(zone, {}).setdefault('datapoints', []).append(datapoint)
+            snapshot = self._publish(zone)
+            self.save()
+        return snapshot
+
+    def _publish(self, zone):
+        '''build and publish a snapshot of zone from data, holding the lock'''
+        if self._snapshots is None:
+            self._snapshots = {}
+        previous = self._snapshots.get(zone, None)
+        source = self.data.get(zone, {}).get('datapoints', None)
+        if previous is not None and previous.current(source):
+            return previous
+        snapshot = Snapshot(source or (), version=previous.version + 1 if previous is not None else 1, source=source)
+        self._snapshots[zone] = snapshot
+        return snapshot
@@ -0,0 +1,291 @@
+import json
+import sqlite3
+import time
+from collections.abc import MutableMapping, Sequence
+from contextlib import contextmanager
+from queue import Queue
+from threading import Lock
+from hasslog import HassLog
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS zones (
+    zone TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS datapoints (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    zone TEXT NOT NULL,
+    completed_at REAL NOT NULL,
+    start_temp REAL NOT NULL,
+    target_temp REAL NOT NULL,
+    duration_s REAL NOT NULL,
+    sensor_readings TEXT NOT NULL,
+    curve BLOB
+);
+CREATE INDEX IF NOT EXISTS datapoints_zone_completed ON datapoints (zone, completed_at);
+'''
+
+class SqliteDataStoreImpl(HassLog):
+    '''SQLite backed implementation of DataStore
+
+    Datapoints are stored one row each, indexed by zone and completion time,
+    so adding one is a single insert and recent history can be queried
+    without loading everything. The data property gives the same nested
+    dict view as DataStoreImpl for existing callers.'''
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.lock = Lock()
+        self._data_file = app.args["data_file"]
+        self._pool = Queue()
+        self.info('Opening SQLite data store {}', self._data_file)
+        for _ in range(int(app.args.get("connections", 4))):
+            self._pool.put(self._connect())
+        with self.connection() as conn:
+            conn.executescript(_SCHEMA)
+        self.data = _SqliteData(self)
+
+    def _connect(self):
+        conn = sqlite3.connect(self._data_file, check_same_thread=False, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    @contextmanager
+    def connection(self):
+        '''borrow a connection from the pool'''
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        '''borrow a connection inside a transaction, committed on success and rolled back on error
+
+        Connections are in autocommit mode, so one returned to the pool mid
+        transaction would make every later BEGIN on it fail.'''
+        with self.connection() as conn:
+            conn.execute('BEGIN')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            try:
+                conn.execute('COMMIT')
+            except BaseException:
+                # e.g. SQLITE_BUSY leaves the transaction open
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                raise
+
+    def save(self):
+        '''Commit current data to disk
+
+        Every write is already committed, so this only checkpoints the WAL.'''
+        with self.connection() as conn:
+            conn.execute('PRAGMA wal_checkpoint(PASSIVE)')
+
+    def close(self):
+        '''close all pooled connections'''
+        while not self._pool.empty():
+            self._pool.get().close()
+
+    def zones(self):
+        '''return the names of all zones'''
+        with self.connection() as conn:
+            return [row[0] for row in conn.execute('SELECT zone FROM zones ORDER BY zone')]
+
+    def add_zone(self, zone):
+        '''create zone if it doesn't exist'''
+        with self.connection() as conn:
+            conn.execute('INSERT OR IGNORE INTO zones (zone) VALUES (?)', (zone,))
+
+    def remove_zone(self, zone):
+        '''delete zone and all its datapoints'''
+        with self.transaction() as conn:
+            conn.execute('DELETE FROM datapoints WHERE zone = ?', (zone,))
+            conn.execute('DELETE FROM zones WHERE zone = ?', (zone,))
+
+    def add_datapoints(self, zone, datapoints, replace=False):
+        '''insert datapoints for zone, in the same transaction as deleting its existing ones if replace'''
+        rows = [self._to_row(zone, datapoint) for datapoint in datapoints]
+        with self.transaction() as conn:
+            conn.execute('INSERT OR IGNORE INTO zones (zone) VALUES (?)', (zone,))
+            if replace:
+                conn.execute('DELETE FROM datapoints WHERE zone = ?', (zone,))
+            conn.executemany('INSERT INTO datapoints (zone, completed_at, start_temp, target_temp, duration_s, '
+                             'sensor_readings, curve) VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+
+    def clear_datapoints(self, zone):
+        '''delete all datapoints for zone'''
+        with self.connection() as conn:
+            conn.execute('DELETE FROM datapoints WHERE zone = ?', (zone,))
+
+    def count(self, zone, upto=None):
+        '''return the number of datapoints for zone, up to row id upto'''
+        with self.connection() as conn:
+            if upto is not None:
+                return conn.execute('SELECT COUNT(*) FROM datapoints WHERE zone = ? AND id <= ?',
+                                    (zone, upto)).fetchone()[0]
+            return conn.execute('SELECT COUNT(*) FROM datapoints WHERE zone = ?', (zone,)).fetchone()[0]
+
+    def snapshot(self, zone):
+        '''return zone's datapoints pinned to those present now, whose version is the newest row id
+
+        Reads go through their own pooled connection and never take the lock.'''
+        with self.connection() as conn:
+            upto = conn.execute('SELECT COALESCE(MAX(id), 0) FROM datapoints WHERE zone = ?', (zone,)).fetchone()[0]
+        return SqliteDatapoints(self, zone, upto=upto)
+
+    def add_datapoint(self, zone, datapoint):
+        '''insert a single datapoint and return the new snapshot'''
+        self.add_datapoints(zone, [datapoint])
+        return self.snapshot(zone)
+
+    def zone_size(self, zone):
+        '''report the datapoint count and approximate stored bytes of zone; nothing is held in memory'''
+        with self.connection() as conn:
+            count, stored = conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(LENGTH(sensor_readings) + COALESCE(LENGTH(curve), 0) + 40), 0) '
+                'FROM datapoints WHERE zone = ?', (zone,)).fetchone()
+        return {'datapoints': count, 'memory_bytes': 0, 'serialized_bytes': stored}
+
+    def query(self, zone, limit=None, offset=0, since=None, newest_first=False, upto=None):
+        '''return datapoints for zone, oldest first unless newest_first
+
+        since is a unix timestamp and upto the newest row id; limit and offset apply after ordering.'''
+        sql = 'SELECT completed_at, start_temp, target_temp, duration_s, sensor_readings, curve ' \
+              'FROM datapoints WHERE zone = ?'
+        params = [zone]
+        if upto is not None:
+            sql += ' AND id <= ?'
+            params.append(upto)
+        if since is not None:
+            sql += ' AND completed_at >= ?'
+            params.append(since)
+        sql += ' ORDER BY completed_at DESC, id DESC' if newest_first else ' ORDER BY completed_at, id'
+        if limit is not None or offset:
+            sql += ' LIMIT ? OFFSET ?'
+            params += [-1 if limit is None else limit, offset]
+        with self.connection() as conn:
+            return [self._from_row(row) for row in conn.execute(sql, params)]
+
+    def recent(self, zone, limit=None, days=None, upto=None):
+        '''return the newest datapoints for zone, oldest first'''
+        since = time.time() - days * 86400 if days is not None else None
+        return list(reversed(self.query(zone, limit=limit, since=since, newest_first=True, upto=upto)))
+
+    @staticmethod
+    def _to_row(zone, datapoint):
+        return (zone, datapoint.get('completed_at', time.time()), datapoint['start_temp'],
+                datapoint['target_temp'], datapoint['duration_s'],
+                json.dumps([list(reading) for reading in datapoint['sensor_readings']]),
+                datapoint.get('curve', None))
+
+    @staticmethod
+    def _from_row(row):
+        completed_at, start_temp, target_temp, duration_s, sensor_readings, curve = row
+        datapoint = {
+            'start_temp': start_temp,
+            'target_temp': target_temp,
+            'sensor_readings': [tuple(reading) for reading in json.loads(sensor_readings)],
+            'duration_s': duration_s,
+            'completed_at': completed_at
+        }
+        if curve is not None:
+            datapoint['curve'] = curve
+        return datapoint
+
+class _SqliteData(MutableMapping):
+    '''dict view of the store matching the DataStoreImpl data layout'''
+    def __init__(self, store):
+        self._store = store
+
+    def __getitem__(self, key):
+        if key == '_version':
+            return 1
+        if key not in self._store.zones():
+            raise KeyError(key)
+        return _SqliteZoneData(self._store, key)
+
+    def __setitem__(self, key, value):
+        if key == '_version':
+            return
+        self._store.add_zone(key)
+        if 'datapoints' in value:
+            _SqliteZoneData(self._store, key)['datapoints'] = value['datapoints']
+
+    def __delitem__(self, key):
+        self._store.remove_zone(key)
+
+    def __iter__(self):
+        return iter(['_version'] + self._store.zones())
+
+    def __len__(self):
+        return len(self._store.zones()) + 1
+
+class _SqliteZoneData(MutableMapping):
+    '''dict view of one zone, holding only datapoints'''
+    def __init__(self, store, zone):
+        self._store = store
+        self._zone = zone
+
+    def __getitem__(self, key):
+        if key != 'datapoints':
+            raise KeyError(key)
+        return SqliteDatapoints(self._store, self._zone)
+
+    def __setitem__(self, key, value):
+        if key != 'datapoints':
+            raise KeyError(key)
+        self._store.add_datapoints(self._zone, value, replace=True)
+
+    def __delitem__(self, key):
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(['datapoints'])
+
+    def __len__(self):
+        return 1
+
+class SqliteDatapoints(Sequence):
+    '''list view of a zone's datapoints, oldest first
+
+    With upto it is a snapshot, only showing rows up to that id, which stays
+    the same as datapoints are added, though not if the zone is rewritten.'''
+    def __init__(self, store, zone, upto=None):
+        self._store = store
+        self._zone = zone
+        self._upto = upto
+
+    @property
+    def version(self):
+        '''the newest row id in the snapshot, or None for a live view'''
+        return self._upto
+
+    def __len__(self):
+        return self._store.count(self._zone, upto=self._upto)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._store.query(self._zone, upto=self._upto)[index]
+        if index < 0:
+            index += len(self)
+        rows = self._store.query(self._zone, limit=1, offset=index, upto=self._upto) if index >= 0 else []
+        if not rows:
+            raise IndexError(index)
+        return rows[0]
+
+    def __iter__(self):
+        return iter(self._store.query(self._zone, upto=self._upto))
+
+    def append(self, datapoint):
+        '''insert a single datapoint'''
+        self._store.add_datapoints(self._zone, [datapoint])
+
+    def recent(self, limit=None, days=None):
+        '''return the newest datapoints, oldest first'''
+        return self._store.recent(self._zone, limit=limit, days=days, upto=self._upto)
@@ -1,14 +1,16 @@
 from datetime import timezone
+from heatcurve import HeatCurve
 
 class Tracker:
     '''Class for tracking temperature changes to learn from'''
     IDLE = 'idle'
     TRACKING = 'tracking'
 
-    def __init__(self, entity_id, sensors, parent):
+    def __init__(self, entity_id, sensors, parent, curve_points=0):
         self._entity_id = entity_id
         self._sensors = sensors
         self._parent = parent
+        self._curve_points = curve_points
 
         self._tracking_state = self.IDLE
 
@@ -17,6 +19,7 @@ class Tracker:
         self._target_temp = None
         self._sensor_readings = None
         self._tracking_started_time = None
+        self._curve = None
 
     def handle_update(self, old_state, new_state):
         '''handle state update of the tracked climate entity'''
@@ -39,6 +42,8 @@ class Tracker:
         if self._tracking_state == self.IDLE:
             self._handle_idle_update(old_temp, new_temp, current_temp)
         elif self._tracking_state == self.TRACKING:
+            if self._curve is not None:
+                self._curve.append(self._elapsed_s(), current_temp)
             if float(new_state["attributes"]["temperature"]) == self._target_temp:
                 self._handle_tracked_temp_change(current_temp)
             else:
@@ -56,6 +61,9 @@ class Tracker:
 
         self._tracking_state = self.TRACKING
         self._tracking_started_time = self._parent.hass.datetime().astimezone(timezone.utc)
+        if self._curve_points:
+            self._curve = HeatCurve(self._curve_points)
+            self._curve.append(0., current_temp)
 
         self._parent.info('Tracking {} from {} to {}',
                           self._entity_id, self._start_temp, self._target_temp)
@@ -82,11 +90,18 @@ class Tracker:
             self._parent.info("Tracking aborted for {} - no temperature change", self._entity_id)
             return
 
-        now = self._parent.hass.datetime().astimezone(timezone.utc)
-        duration_s = (now - self._tracking_started_time).total_seconds()
+        duration_s = self._elapsed_s()
         self._parent.info("Tracking complete for {}, took {} seconds",
                           self._entity_id, duration_s)
-        self._parent.add_datapoint(end_temp, self._start_temp, self._sensor_readings, duration_s)
+        curve = None
+        if self._curve is not None:
+            self._curve.finish(duration_s, end_temp)
+            curve = self._curve.encode()
+        self._parent.add_datapoint(end_temp, self._start_temp, self._sensor_readings, duration_s, curve=curve)
+
+    def _elapsed_s(self):
+        now = self._parent.hass.datetime().astimezone(timezone.utc)
+        return (now - self._tracking_started_time).total_seconds()
 
     @staticmethod
     def _should_begin_monitoring(old_temp, new_temp, current_temp):
@@ -0,0 +1,62 @@
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+class Watchdog:
+    '''Measures callback delay and handler time for a zone and decides when to shed load
+
+    The zone is overloaded once the smoothed queueing delay or handler time
+    exceeds its budget, and recovers when both fall below half of it.'''
+    smoothing = 0.3
+
+    def __init__(self, parent, config):
+        self._parent = parent
+        self.delay_budget_s = float(config.get('delay_s', 5))
+        self.handler_budget_s = float(config.get('handler_s', 0.5))
+        self.coalesce_s = float(config.get('coalesce_s', 30))
+        self.urgent_s = float(config.get('urgent_s', 300))
+        self.overloaded = False
+        self._delay_s = 0.
+        self._handler_s = 0.
+        self.shed = 0
+
+    @contextmanager
+    def measure(self, new=None, delay_s=None):
+        '''time a callback; delay_s, or new's last_updated, gives how long it was queued'''
+        if delay_s is None:
+            delay_s = self._state_delay(new)
+        if delay_s is not None:
+            self._delay_s += self.smoothing * (delay_s - self._delay_s)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._handler_s += self.smoothing * (time.perf_counter() - started - self._handler_s)
+            self._check()
+
+    def _state_delay(self, new):
+        if not isinstance(new, dict) or 'last_updated' not in new:
+            return None
+        try:
+            updated = datetime.fromisoformat(new['last_updated'])
+        except (TypeError, ValueError):
+            return None
+        now = self._parent.hass.datetime().astimezone(timezone.utc)
+        return max((now - updated.astimezone(timezone.utc)).total_seconds(), 0.)
+
+    def _check(self):
+        if not self.overloaded and (self._delay_s > self.delay_budget_s or
+                                    self._handler_s > self.handler_budget_s):
+            self.overloaded = True
+            self._parent.warning("Zone {} overloaded (delay {:.1f}s, handler {:.3f}s), shedding load",
+                                 self._parent.hass.name, self._delay_s, self._handler_s)
+        elif self.overloaded and (self._delay_s < self.delay_budget_s / 2 and
+                                  self._handler_s < self.handler_budget_s / 2):
+            self.overloaded = False
+            self._parent.info("Zone {} recovered after shedding {} updates", self._parent.hass.name, self.shed)
+            self.shed = 0
+
+    def metrics(self):
+        '''return smoothed delay and handler time'''
+        return {'overloaded': self.overloaded, 'delay_s': self._delay_s,
+                'handler_s': self._handler_s, 'shed': self.shed}
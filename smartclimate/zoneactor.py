@@ -0,0 +1,72 @@
+import time
+from queue import Queue
+from threading import Thread, Lock
+
+class ZoneActor:
+    '''Single worker thread processing one zone's callbacks in order
+
+    Callbacks for different zones run on their own actors, so zones run in
+    parallel while each zone's state is only ever touched by one thread.'''
+    _STOP = object()
+
+    def __init__(self, name, hasslog):
+        self._name = name
+        self.log = hasslog
+        self._queue = Queue()
+        self._metrics_lock = Lock()
+        self._processed = 0
+        self._total_wait_s = 0.
+        self._max_wait_s = 0.
+        self._last_wait_s = 0.
+        self._thread = Thread(target=self._run, name='smartclimate-' + name, daemon=True)
+        self._thread.start()
+
+    def submit(self, callback, *args, **kwargs):
+        '''queue callback to run on the zone's worker'''
+        self._queue.put((time.monotonic(), callback, args, kwargs))
+
+    def wrap(self, callback):
+        '''return a function which queues callback instead of calling it'''
+        def handler(*args, **kwargs):
+            self.submit(callback, *args, **kwargs)
+        return handler
+
+    def join(self):
+        '''block until every queued callback has been processed'''
+        self._queue.join()
+
+    def stop(self):
+        '''finish queued callbacks then stop the worker'''
+        self._queue.put(self._STOP)
+        self._thread.join()
+
+    def metrics(self):
+        '''return queue depth and wait time statistics'''
+        with self._metrics_lock:
+            return {
+                'depth': self._queue.qsize(),
+                'processed': self._processed,
+                'last_wait_s': self._last_wait_s,
+                'max_wait_s': self._max_wait_s,
+                'mean_wait_s': self._total_wait_s / self._processed if self._processed else 0.,
+            }
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                self._queue.task_done()
+                return
+            queued, callback, args, kwargs = item
+            wait_s = time.monotonic() - queued
+            with self._metrics_lock:
+                self._processed += 1
+                self._total_wait_s += wait_s
+                self._max_wait_s = max(self._max_wait_s, wait_s)
+                self._last_wait_s = wait_s
+            try:
+                callback(*args, **kwargs)
+            except Exception: # pylint: disable=broad-except
+                self.log.error("[{}] Error in queued callback", self._name, exc_info=True)
+            finally:
+                self._queue.task_done()
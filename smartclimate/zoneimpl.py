@@ -1,64 +1,317 @@
+import time
+from contextlib import nullcontext
+from datetime import timedelta, timezone
+from itertools import product
 from hasslog import HassLog
+from lazyrefresh import LazyRefresh
 from sensorset import SensorSet
 from tracker import Tracker
-from predictor import LinearPredictor
+from predictor import create_predictor
+from planner import Planner
+from pooledprior import get_prior, PooledPredictor
+from schedule import ScheduleEngine, ScheduleRule
 from smartevent import SmartEvent
 from smartsensor import SmartSensor
 from appdaemon_hass_interface import AppDaemonHassInterface
+from zoneactor import ZoneActor
+from watchdog import Watchdog
+
+_FIT_EXECUTOR = None
+
+def get_fit_executor(max_workers=None):
+    '''Return the thread pool zones fit their first model on, creating it on first use'''
+    global _FIT_EXECUTOR # pylint: disable=global-statement
+    if _FIT_EXECUTOR is None:
+        from concurrent.futures import ThreadPoolExecutor
+        _FIT_EXECUTOR = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='smartclimate-fit')
+    return _FIT_EXECUTOR
 
 class ZoneImpl(HassLog):
     '''Implementation of Zone'''
 
     default_preheat = 3600
 
-    def __init__(self, app, store):
+    def __init__(self, app, store, router=None, sensor_hub=None):
         super().__init__(app)
-        self.hass = AppDaemonHassInterface(app)
+        self._actor = ZoneActor(app.name, self) if app.args.get("actor", False) else None
+        self._recorder = self._create_recorder(app)
+        self.hass = AppDaemonHassInterface(app, actor=self._actor, batch_writes=app.args.get("batch_writes", False),
+                                           recorder=self._recorder)
         self._preheats = {}
+        self._watchdog = Watchdog(self, self.hass.config["load_shedding"]) \
+            if "load_shedding" in self.hass.config else None
+        self._refresh_timer = None
+        self.refresh_policy = LazyRefresh(self.hass.config["lazy_refresh"]) \
+            if self.hass.config.get("lazy_refresh", False) else None
+        self._stale = set()
+        self._stale_timer = None
+        self._stale_timer_due = None
+        self._schedule = ScheduleEngine(self, self._activate_preheat, self._expire_preheat,
+                                        lookahead_s=float(app.args.get("schedule_lookahead_h", 6)) * 3600)
         self._climate_entity = self.hass.config["entity_id"]
-        self._sensors = SensorSet(self, self.hass.config.get("sensors", []))
+        self._router = router
+        self._sensor_hub = sensor_hub
+        self._hub_subscriptions = []
+        self._sensors = SensorSet(self, self.hass.config.get("sensors", []), hub=sensor_hub)
+        self._sensor_thresholds = [None] * len(self._sensors)
+        self._sensor_references = [None] * len(self._sensors)
 
         self.info("Initialising zone {} for entity {} with {} sensors",
                   self.hass.name, self._climate_entity, len(self._sensors))
 
-        self._tracker = Tracker(self._climate_entity, self._sensors, self)
+        self.planner = Planner(self, self.hass.config["forecast"]) if "forecast" in self.hass.config else None
+        self._tracker = Tracker(self._climate_entity, self._sensors, self,
+                                curve_points=self.hass.config.get("curve_points", 0))
 
         self._store = store
-        datapoints = None
         with self._store.lock:
             if self.hass.name not in self._store.data:
                 self._store.data[self.hass.name] = {}
             if "datapoints" not in self._store.data[self.hass.name]:
                 self._store.data[self.hass.name]["datapoints"] = []
+        datapoints = self._store.snapshot(self.hass.name)
 
-            datapoints = self._store.data[self.hass.name]["datapoints"]
+        self._predictor_kind = self.hass.config.get("predictor", "linear")
+        self._selected_kind = 'linear' if self._predictor_kind == 'auto' else self._predictor_kind
+        self._prior = get_prior(self._store) if self.hass.config.get("pooled_prior", False) else None
+        self.predictor = self._create_predictor(self._selected_kind)
+        self._learned_version = None
+        self._fit_future = None
+        self._selected_at = None
+        if self.hass.config.get("background_fit", False):
+            # AppDaemon initialises apps one at a time, so fit elsewhere and let every zone start at once
+            if self._predictor_kind == 'auto':
+                self._selected_at = len(datapoints)
+            self._fit_future = get_fit_executor().submit(self._background_fit, datapoints, True)
+        else:
+            self._learn(datapoints)
 
-        self.predictor = LinearPredictor(self.hass.name, self)
-        self.predictor.learn(datapoints)
+        if self.planner is not None:
+            self.hass.listen_state(self._handle_forecast_updated, self.planner.entity_id,
+                                   attribute=self.planner.attribute)
 
         self.hass.listen_state(self._handle_climate_updated, self._climate_entity, attribute="all")
-        for sensor in self._sensors:
-            self._listen_sensor_state(sensor)
+        for index, sensor in enumerate(self._sensors):
+            self._listen_sensor_state(index, sensor)
 
-        self.hass.listen_event(self._handle_set_preheat, "smartclimate.set_preheat", zone=self.hass.name)
-        self.hass.listen_event(self._handle_clear_preheat, "smartclimate.clear_preheat")
+        # allocations are process wide, so only diffed by one zone per event, or by the router
+        self._claims_tracer = router is None
+        if router is not None:
+            def wrap(callback):
+                # the router calls on its own thread, so run the handlers on the zone's
+                return self.hass.dispatch_callback(callback, record=lambda event, data: ('event', event, data))
+            router.register(self.hass.name, wrap(self._handle_set_preheat), wrap(self._handle_clear_preheat),
+                            query=wrap(self._handle_query), memory_report=wrap(self._handle_memory_report))
+        else:
+            self.hass.listen_event(self._handle_set_preheat, "smartclimate.set_preheat", zone=self.hass.name)
+            self.hass.listen_event(self._handle_clear_preheat, "smartclimate.clear_preheat")
+            self.hass.listen_event(self._handle_query, "smartclimate.query", zone=self.hass.name)
+            self.hass.listen_event(self._handle_memory_report, "smartclimate.memory_report")
 
         self.hass.fire_event("smartclimate.up", zone=self.hass.name)
 
-    def _listen_sensor_state(self, sensor):
-        if 'attribute' in sensor:
-            self.hass.listen_state(self._handle_sensor_updated, sensor['entity_id'], attribute=sensor['attribute'])
+    @property
+    def climate_entity(self):
+        return self._climate_entity
+
+    @property
+    def sensors(self):
+        return self._sensors
+
+    def metrics(self):
+        '''return actor queue, watchdog and lazy refresh metrics, or None if the zone has none of them'''
+        if self._actor is None and self._watchdog is None and self.refresh_policy is None:
+            return None
+        metrics = self._actor.metrics() if self._actor is not None else {}
+        if self._watchdog is not None:
+            metrics['watchdog'] = self._watchdog.metrics()
+        if self.refresh_policy is not None:
+            metrics['lazy_refresh'] = self.refresh_policy.metrics()
+        return metrics
+
+    def memory_report(self):
+        '''return datapoint count and estimated sizes of the zone's stored data and in-memory state'''
+        from memoryreport import deep_sizeof
+        exclude = [self, self.hass, self._sensor_hub, self._store]
+        report = self._store.zone_size(self.hass.name)
+        report['predictor_bytes'] = deep_sizeof(self.predictor, exclude=exclude)
+        report['tracker_bytes'] = deep_sizeof(self._tracker, exclude=exclude + [self._sensors])
+        report['sensor_bytes'] = deep_sizeof(self._sensors, exclude=exclude)
+        report['preheats'] = len(self._preheats)
+        report['schedules'] = len(self._schedule)
+        return report
+
+    def terminate(self):
+        '''stop processing callbacks'''
+        if self._router is not None:
+            self._router.unregister(self.hass.name)
+        for callback, entity_id, attribute in self._hub_subscriptions:
+            self._sensor_hub.unsubscribe(callback, entity_id, attribute=attribute)
+        self._hub_subscriptions = []
+        self._schedule.cancel()
+        if self._refresh_timer is not None:
+            self.hass.cancel_timer(self._refresh_timer)
+            self._refresh_timer = None
+        if self._stale_timer is not None:
+            self.hass.cancel_timer(self._stale_timer)
+            self._stale_timer = None
+        if self._actor is not None:
+            self._actor.stop()
+        if self._recorder is not None:
+            self._recorder.close()
+        if self._claims_tracer:
+            from memoryreport import TRACER
+            TRACER.release(self)
+
+    def _create_recorder(self, app):
+        '''return a CallbackRecorder if record_callbacks is configured, as a path or {path, max_mb, backups}'''
+        config = app.args.get("record_callbacks", None)
+        if not config:
+            return None
+        from callbacklog import CallbackRecorder
+        config = config if isinstance(config, dict) else {'path': config}
+        self.info("Recording callbacks for zone {} to {}", app.name, config['path'])
+        return CallbackRecorder(config['path'], max_bytes=float(config.get('max_mb', 16)) * (1 << 20),
+                                backups=config.get('backups', 3), log=self)
+
+    def _listen_sensor_state(self, index, sensor):
+        def handler(entity_id, new, old):
+            value = self._sensors.record(index, new)
+            if self._sensor_changed(index, value):
+                self._handle_sensor_updated(entity_id, new, old)
+
+        if self._sensor_hub is not None:
+            attribute = sensor.get('attribute', None)
+            record = lambda entity_id, new, old: ('state', entity_id, attribute, old, new)
+            # the hub calls on its own thread, so run the handler on the zone's
+            callback = self.hass.dispatch_callback(handler, record=record)
+            self._sensor_hub.subscribe(callback, sensor['entity_id'], attribute=attribute)
+            self._hub_subscriptions.append((callback, sensor['entity_id'], attribute))
+        elif 'attribute' in sensor:
+            self.hass.listen_state(handler, sensor['entity_id'], attribute=sensor['attribute'])
         else:
-            self.hass.listen_state(self._handle_sensor_updated, sensor['entity_id'])
+            self.hass.listen_state(handler, sensor['entity_id'])
+
+    def _sensor_changed(self, index, value):
+        '''return whether value moved far enough from the last one acted on to change a prediction'''
+        threshold = self._sensor_thresholds[index]
+        reference = self._sensor_references[index]
+        if value is not None and reference is not None and threshold is not None and \
+                abs(value - reference) < threshold:
+            return False
+        self._sensor_references[index] = value
+        return True
+
+    def _update_sensor_thresholds(self):
+        '''work out the smallest change in each sensor which moves predictions by sensor_resolution_s'''
+        sensitivities = self.predictor.sensitivities()
+        resolution_s = float(self.hass.config.get("sensor_resolution_s", 1))
+        if sensitivities is None or resolution_s <= 0:
+            self._sensor_thresholds = [None] * len(self._sensors)
+            return
+        # sensors the model doesn't use never change a prediction
+        self._sensor_thresholds = [resolution_s / sensitivities[name] if sensitivities.get(name, 0.) > 0.
+                                   else float('inf') for name in self._sensors.names()]
+        self.debug("Sensor update thresholds for zone {}: {}", self.hass.name,
+                   dict(zip(self._sensors.names(), self._sensor_thresholds)))
 
     def _handle_climate_updated(self, entity_id, new, old):
-        self._tracker.handle_update(old, new)
-        for _, preheat in self._preheats.items():
-            preheat.update()
+        with self._measure(new):
+            # the tracker sees every update, only recomputes are shed
+            self._tracker.handle_update(old, new)
+            self._update_preheats()
 
     def _handle_sensor_updated(self, entity_id, new, old):
         self.debug("Sensor entity {} updated", entity_id)
-        for _, preheat in self._preheats.items():
+        with self._measure(new):
+            self._update_preheats()
+
+    def _measure(self, new):
+        if self._watchdog is None:
+            return nullcontext()
+        delay_s = self._actor.metrics()['last_wait_s'] if self._actor is not None else None
+        if isinstance(new, dict) and 'last_updated' in new:
+            delay_s = None
+        return self._watchdog.measure(new, delay_s=delay_s)
+
+    def _update_preheats(self):
+        '''update preheats now, or when overloaded only those about to trigger and the rest later'''
+        preheats = self._due_preheats()
+        if self._watchdog is None or not self._watchdog.overloaded:
+            for preheat in preheats:
+                preheat.update()
+            return
+
+        for preheat in preheats:
+            if preheat.urgent(self._watchdog.urgent_s):
+                preheat.update()
+        self._watchdog.shed += 1
+        if self._refresh_timer is None:
+            # readings are read when the timer fires, so queued updates collapse to the latest state
+            when = self.hass.datetime() + timedelta(seconds=self._watchdog.coalesce_s)
+            self._refresh_timer = self.hass.run_at(self._handle_refresh, when)
+
+    def _handle_refresh(self, *args, **kwargs):
+        self._refresh_timer = None
+        self.debug("Refreshing {} deferred preheats", len(self._preheats))
+        with self._measure(None):
+            for preheat in self._due_preheats():
+                preheat.update()
+
+    def _due_preheats(self):
+        '''return the preheats an update should recompute, marking those lazy refresh defers as stale'''
+        if self.refresh_policy is None:
+            return list(self._preheats.values())
+        now = self.hass.datetime().astimezone(timezone.utc)
+        due = []
+        for name, preheat in self._preheats.items():
+            if preheat.deferrable(now):
+                self._stale.add(name)
+                self.refresh_policy.deferred += 1
+            else:
+                self._stale.discard(name)
+                due.append(preheat)
+        self._schedule_stale_refresh()
+        return due
+
+    def _schedule_stale_refresh(self):
+        '''keep one timer for the earliest refresh of a stale preheat'''
+        self._stale = {name for name in self._stale if name in self._preheats and
+                       self._preheats[name].next_refresh is not None}
+        due = min((self._preheats[name].next_refresh for name in self._stale), default=None)
+        if due == self._stale_timer_due:
+            return
+        if self._stale_timer is not None:
+            self.hass.cancel_timer(self._stale_timer)
+            self._stale_timer = None
+        self._stale_timer_due = due
+        if due is not None:
+            self._stale_timer = self.hass.run_at(self._handle_stale_refresh, due.astimezone().replace(tzinfo=None))
+
+    def _handle_stale_refresh(self, *args, **kwargs):
+        self._stale_timer = None
+        self._stale_timer_due = None
+        now = self.hass.datetime().astimezone(timezone.utc)
+        for name in sorted(self._stale):
+            preheat = self._preheats.get(name, None)
+            if preheat is not None and not preheat.deferrable(now):
+                self._stale.discard(name)
+                self.refresh_policy.refreshed += 1
+                preheat.update()
+        self._schedule_stale_refresh()
+
+    def _handle_forecast_updated(self, entity_id, new, old):
+        self.debug("Forecast {} updated", entity_id)
+        self._replan()
+
+    def _replan(self):
+        if self.planner is None:
+            return
+        self.planner.forget()
+        events = [preheat for preheat in self._preheats.values()
+                  if isinstance(preheat, SmartEvent) and not preheat.triggered]
+        self.planner.plan(events)
+        for preheat in events:
             preheat.update()
 
     def _handle_set_preheat(self, event, data):
@@ -66,28 +319,116 @@ class ZoneImpl(HassLog):
             return
 
         name = data['name']
+        self._schedule.remove(name)
         if name in self._preheats:
             self.debug("Cancelling existing preheat {}", name)
-            self._preheats[name].cancel()
+            self._preheats.pop(name).cancel()
+            if self.planner is not None:
+                self.planner.forget(name)
 
         target_temp = float(data['target_temp'])
         preheat_type = data.get('type', 'event')
+        quantile = data.get('quantile', self.hass.config.get('preheat_quantile', None))
+        quantile = float(quantile) if quantile is not None else None
         if preheat_type == 'event':
             target_time = data['target_time']
             self.info("Adding preheat event {} temp={}, time={}", name, target_temp, target_time)
-            self._preheats[name] = SmartEvent(name, target_temp, target_time, self)
+            self._preheats[name] = SmartEvent(name, target_temp, target_time, self, quantile=quantile)
+        elif preheat_type == 'schedule':
+            rule = ScheduleRule.parse(data)
+            self.info("Adding preheat schedule {} temp={}, next at {}", name, target_temp,
+                      rule.next_after(self.hass.datetime()))
+            self._schedule.add(name, rule,
+                               lambda target_time: SmartEvent(name, target_temp, target_time, self, quantile=quantile))
         elif preheat_type == 'sensor':
+            confidence = data.get('confidence', None)
             self.info("Adding preheat sensor {} temp={}", name, target_temp)
-            self._preheats[name] = SmartSensor(name, target_temp, self)
+            self._preheats[name] = SmartSensor(name, target_temp, self,
+                                               confidence=float(confidence) if confidence is not None else None)
 
     def _handle_clear_preheat(self, event, data):
         name = data['name']
+        if name in self._schedule:
+            self.info("Clearing preheat schedule {}", name)
+            self._schedule.remove(name)
         if name in self._preheats:
             self.info("Clearing preheat {}", name)
             self._preheats[name].cancel()
             del self._preheats[name]
+            if self.planner is not None:
+                self.planner.forget(name)
+
+    def _activate_preheat(self, name, preheat):
+        self._preheats[name] = preheat
+
+    def _expire_preheat(self, name):
+        preheat = self._preheats.pop(name, None)
+        if preheat is not None:
+            preheat.cancel()
+        if self.planner is not None:
+            self.planner.forget(name)
 
-    def add_datapoint(self, target_temp, start_temp, sensor_readings, duration_s):
+    def _handle_query(self, event, data):
+        if data.get('zone', None) != self.hass.name:
+            return
+
+        target_temps = data.get('target_temps', [data['target_temp']] if 'target_temp' in data else [])
+        current_temp = data.get('current_temp', None)
+        if current_temp is None:
+            current_temp = self.hass.get_state(self._climate_entity, attribute='current_temperature')
+        sensor_values = self._query_sensor_values(data.get('sensors', {}))
+
+        results = []
+        ready = False
+        if current_temp is None or sensor_values is None:
+            error = 'missing readings'
+        else:
+            error = None
+            grid = list(product([float(target_temp) for target_temp in target_temps], *sensor_values.values()))
+            predictions = self.predictor.predict_many([[row[0], float(current_temp)] + list(row[1:])
+                                                       for row in grid], list(sensor_values)) if grid else []
+            ready = predictions is not None
+            if predictions is None:
+                predictions = [self.default_preheat] * len(grid)
+            results = [{'target_temp': row[0], 'sensors': dict(zip(sensor_values, row[1:])), 'duration_s': duration}
+                       for row, duration in zip(grid, predictions)]
+
+        self.debug("Answering query {} with {} results", data.get('id', None), len(results))
+        self.hass.fire_event('smartclimate.query_result', zone=self.hass.name, id=data.get('id', None),
+                             current_temp=current_temp, ready=ready, results=results, error=error)
+
+    def _handle_memory_report(self, event, data):
+        if self._claims_tracer:
+            from memoryreport import TRACER
+            if TRACER.claim(self):
+                TRACER.report(self.hass, self, data)
+        if data.get('zone', self.hass.name) != self.hass.name:
+            return
+
+        report = self.memory_report()
+        total = sum(report[key] for key in ('memory_bytes', 'predictor_bytes', 'tracker_bytes', 'sensor_bytes'))
+        self.info("Memory report for zone {}: {}", self.hass.name, report)
+        if data.get('output', 'sensor') == 'sensor':
+            report['unit_of_measurement'] = 'B'
+            self.hass.set_state('sensor.smartclimate_{}_memory'.format(self.hass.name), state=total,
+                                attributes=report)
+
+    def _query_sensor_values(self, overrides):
+        '''return {sensor name: [values]} from overrides or current readings, or None if any are missing'''
+        names = self._sensors.names()
+        readings = {}
+        if not all(name in overrides for name in names):
+            readings = dict(self._sensors.get_readings() or [])
+
+        sensor_values = {}
+        for name in names:
+            values = overrides.get(name, readings.get(name, None))
+            if values is None:
+                return None
+            sensor_values[name] = [float(value) for value in (values if isinstance(values, list) else [values])]
+        return sensor_values
+
+    def add_datapoint(self, target_temp, start_temp, sensor_readings, duration_s, curve=None):
         '''add a datapoint to the predictor'''
         datapoint = {
             'start_temp' : start_temp,
@@ -95,17 +436,135 @@ class ZoneImpl(HassLog):
             'sensor_readings': sensor_readings,
             'duration_s' : duration_s
         }
-        datapoints = None
-        with self._store.lock:
-            self._store.data[self.hass.name]['datapoints'].append(datapoint)
-            self._store.save()
-            datapoints = self._store.data[self.hass.name]['datapoints']
-        self.predictor.learn(datapoints)
+        if curve is not None:
+            datapoint['curve'] = curve
+        # learn from the snapshot published by this write, without holding the store lock
+        datapoints = self._store.add_datapoint(self.hass.name, datapoint)
+        if self._prior is not None:
+            self._prior.add(self.hass.name, datapoint)
+        self._learn(datapoints)
+
+    def wait_fitted(self, timeout=None):
+        '''block until a background fit or model selection has finished, returning whether it has
+
+        A finished fit isn't in use yet: it is installed by a timer on the
+        zone's callback path about a second later, so callers wanting
+        predictions from it must let that timer run.'''
+        if self._fit_future is None:
+            return True
+        from concurrent.futures import TimeoutError as FutureTimeout
+        try:
+            self._fit_future.result(timeout)
+        except FutureTimeout:
+            return False
+        return True
 
-    def predict(self, target_temp):
-        '''predict the number of seconds required to reach target_temp'''
+    def _background_fit(self, datapoints, initial):
+        '''fit on a worker thread, to be installed by a timer on the zone's callback path
+
+        The initial fit is always installed. Later ones come from model
+        selection, and are only fitted and installed when another kind wins.'''
+        try:
+            started = time.perf_counter()
+            training = self._training_datapoints(datapoints)
+            kind = self._selected_kind
+            if self._predictor_kind == 'auto' and self.predictor.check_ready(training):
+                kind = self._best_kind(training)
+            if not initial and kind == self._selected_kind:
+                return
+            predictor = self._create_predictor(kind)
+            predictor.learn(training)
+            self.info("Fitted {} predictor for zone {} in {:.2f}s", kind, self.hass.name,
+                      time.perf_counter() - started)
+            def install(*args, **kwargs):
+                self._install_predictor(kind, predictor, datapoints.version)
+            self.hass.run_at(install, self.hass.datetime() + timedelta(seconds=1))
+        except Exception: # pylint: disable=broad-except
+            self.error("Background fit for zone {} failed", self.hass.name, exc_info=True)
+
+    def _install_predictor(self, kind, predictor, version):
+        if self._learned_version is not None and self._learned_version > version:
+            # datapoints arrived while fitting, catch up as add_datapoint would have
+            predictor.learn(self._training_datapoints(self._store.snapshot(self.hass.name)))
+            version = self._learned_version
+        if kind != self._selected_kind:
+            self.info("Selected {} predictor for zone {}", kind, self.hass.name)
+            self._selected_kind = kind
+        self.predictor = predictor
+        self._learned_version = version
+        self._update_sensor_thresholds()
+        self._replan()
+        for preheat in list(self._preheats.values()):
+            preheat.update()
+
+    def _learn(self, datapoints):
+        self.debug("Learning from version {} of zone {} datapoints", datapoints.version, self.hass.name)
+        self._learned_version = datapoints.version
+        training = self._training_datapoints(datapoints)
+        if self._selection_due(datapoints, training):
+            # cross validation takes seconds, so never on the callback thread
+            self._selected_at = len(datapoints)
+            self._fit_future = get_fit_executor().submit(self._background_fit, datapoints, False)
+        self.predictor.learn(training)
+        self._update_sensor_thresholds()
+        self._replan()
+
+    def _selection_due(self, datapoints, training):
+        '''return whether auto selection should run again, every reselect_every datapoints'''
+        if self._predictor_kind != 'auto' or not self.predictor.check_ready(training):
+            return False
+        if self._fit_future is not None and not self._fit_future.done():
+            return False
+        return self._selected_at is None or \
+            len(datapoints) - self._selected_at >= int(self.hass.config.get("reselect_every", 10))
+
+    def _training_datapoints(self, datapoints):
+        limit = self.hass.config.get("learn_limit", None)
+        if hasattr(datapoints, 'recent'):
+            # store can query by time, e.g. SqliteDatapoints
+            return datapoints.recent(limit=limit, days=self.hass.config.get("learn_days", None))
+        return datapoints[-limit:] if limit else datapoints
+
+    def _best_kind(self, datapoints):
+        from concurrent.futures import TimeoutError as FutureTimeout
+        from modelselection import select_predictor, get_executor
+        timeout_s = float(self.hass.config.get("selection_timeout_s", 120))
+        try:
+            kind, results = select_predictor(datapoints, folds=self.hass.config.get("cv_folds", 5),
+                                             executor=get_executor(), timeout=timeout_s)
+        except FutureTimeout:
+            self.warning("Model selection for zone {} took over {}s, keeping {} predictor",
+                         self.hass.name, timeout_s, self._selected_kind)
+            return self._selected_kind
+        for result in results.values():
+            self.info("Model {} for zone {}: error={:.0f}s fit={:.4f}s predict={:.6f}s",
+                      result['kind'], self.hass.name, result['error_s'],
+                      result['fit_time_s'], result['predict_time_s'])
+        return kind
+
+    def _create_predictor(self, kind):
+        predictor = create_predictor(kind, self.hass.name, self)
+        if self._prior is not None:
+            predictor = PooledPredictor(predictor, self._prior, self.hass.name,
+                                        weight=float(self.hass.config.get("prior_weight", 5)))
+        return predictor
+
+    def predict(self, target_temp, quantile=None):
+        '''predict the number of seconds required to reach target_temp
+
+        With quantile, predict that quantile of the time instead of the mean.'''
         current_temp = self.hass.get_state(self._climate_entity, attribute='current_temperature')
         if current_temp is None:
             return None
         sensor_readings = self._sensors.get_readings()
+        if quantile is not None:
+            return self.predictor.predict_quantile(target_temp, current_temp, sensor_readings, quantile)
         return self.predictor.predict(target_temp, current_temp, sensor_readings)
+
+    def predict_interval(self, target_temp, confidence):
+        '''predict (lower, upper) bounds on the seconds required to reach target_temp'''
+        current_temp = self.hass.get_state(self._climate_entity, attribute='current_temperature')
+        if current_temp is None:
+            return None
+        sensor_readings = self._sensors.get_readings()
+        return self.predictor.prediction_interval(target_temp, current_temp, sensor_readings, confidence)
@@ -1,6 +1,9 @@
-from uuid import uuid4 as uuid
+import heapq
+from itertools import count
 from datetime import datetime, timezone, timedelta, date, time
 from threading import Lock
+from memoryreport import zone_data_size
+from snapshots import SnapshotStore
 
 def relative_time(seconds):
     '''Return a time relative to other usages of relative_time'''
@@ -10,7 +13,7 @@ def time_of_day(hour=0, minute=0, second=0, extradays=0):
     '''return a time of day'''
     return datetime.combine(date(2019, 1, 1)+timedelta(days=extradays), time(hour, minute, second))
 
-class FakeStore:
+class FakeStore(SnapshotStore):
     def __init__(self):
         self.data = {'_version': 1}
         self.lock = Lock()
@@ -20,6 +23,9 @@ class FakeStore:
         '''save'''
         self.saved = True
 
+    def zone_size(self, zone):
+        return zone_data_size({'datapoints': list(self.snapshot(zone))})
+
 class FakeLogger:
     # pylint: disable=invalid-name
     def isEnabledFor(self, level):
@@ -34,8 +40,11 @@ class FakeHass:
         self.time = relative_time(0)
         self._state_listeners = {}
         self._event_listeners = {}
-        self._time_triggers = {}
+        self._timers = []
+        self._timer_callbacks = {}
+        self._timer_handles = count(1)
         self.set_states = {}
+        self.set_state_calls = []
         self.fired_events = []
 
     def get_app(self, name):
@@ -48,6 +57,7 @@ class FakeHass:
         return state.get('state', None)
 
     def set_state(self, entity_id, state, attributes=None):
+        self.set_state_calls.append(entity_id)
         self.set_states[entity_id] = {'state': state}
         if attributes is not None:
             self.set_states[entity_id]['attributes'] = attributes
@@ -55,6 +65,12 @@ class FakeHass:
     def listen_state(self, callback, entity_id, attribute=None):
         self._state_listeners[entity_id] = callback
 
+    def listens_state(self, entity_id):
+        return entity_id in self._state_listeners
+
+    def listens_event(self, event):
+        return event in self._event_listeners
+
     def trigger_state_callback(self, entity_id, attribute, old, new):
         self._state_listeners[entity_id](entity_id, attribute, old, new, {})
 
@@ -75,24 +91,39 @@ class FakeHass:
         return self.time
 
     def run_at(self, callback, when):
-        handle = uuid()
-        self._time_triggers[handle] = (when, callback)
+        handle = next(self._timer_handles)
+        self._timer_callbacks[handle] = callback
+        heapq.heappush(self._timers, (when.astimezone(timezone.utc), handle, when))
         return handle
 
-    def cancel_timer(self, handle):
-        del self._time_triggers[handle]
+    def run_in(self, callback, delay):
+        return self.run_at(lambda: callback({}), self.time + timedelta(seconds=delay))
 
-    def advance_time(self, when):
-        callbacks = [callback
-                     for (time, callback) in self._time_triggers.values()
-                     if time.astimezone(timezone.utc) <= when.astimezone(timezone.utc)]
-        for callback in callbacks:
+    def cancel_timer(self, handle):
+        # the heap entry is skipped when it reaches the top
+        del self._timer_callbacks[handle]
+        if len(self._timers) > 2 * len(self._timer_callbacks) + 64:
+            self._timers = [timer for timer in self._timers if timer[1] in self._timer_callbacks]
+            heapq.heapify(self._timers)
+
+    def pending_timers(self):
+        return len(self._timer_callbacks)
+
+    def advance_to(self, when):
+        '''move the clock to when, firing due timers in time order, including ones they schedule'''
+        until = when.astimezone(timezone.utc)
+        while self._timers and self._timers[0][0] <= until:
+            _, handle, due = heapq.heappop(self._timers)
+            callback = self._timer_callbacks.pop(handle, None)
+            if callback is None:
+                continue
+            if due.astimezone(timezone.utc) > self.time.astimezone(timezone.utc):
+                self.time = due
             callback()
-        self._time_triggers = {handle: (time, callback)
-                               for handle, (time, callback) in self._time_triggers.items()
-                               if time.astimezone(timezone.utc) > when.astimezone(timezone.utc)}
         self.time = when
 
+    advance_time = advance_to
+
     def get_main_log(self):
         return FakeLogger()
 
@@ -0,0 +1,49 @@
+'''
+Replays a recorded callback log into a FakeHass
+
+Timer records only move the clock, since the zone's own timers fire again
+as FakeHass reaches their times.
+'''
+import time
+from datetime import datetime
+from callbacklog import read_log
+
+def apply_state(hass, entity_id, attribute, new):
+    '''update hass.states as AppDaemon would have seen it'''
+    if attribute == 'all':
+        hass.states[entity_id] = new
+    elif attribute is None:
+        hass.states.setdefault(entity_id, {})['state'] = new
+    else:
+        hass.states.setdefault(entity_id, {}).setdefault('attributes', {})[attribute] = new
+
+def replay(hass, records, realtime=False, speed=1.):
+    '''feed (timestamp, kind, args) records into hass, as fast as possible or at speed x real time
+
+    Returns the number of callbacks delivered.'''
+    delivered = 0
+    first = started = None
+    for timestamp, kind, args in records:
+        if realtime:
+            if first is None:
+                first, started = timestamp, time.monotonic()
+            delay = (timestamp - first) / speed - (time.monotonic() - started)
+            if delay > 0:
+                time.sleep(delay)
+        hass.advance_to(datetime.fromtimestamp(timestamp))
+        if kind == 'state':
+            entity_id, attribute, old, new = args
+            apply_state(hass, entity_id, attribute, new)
+            if hass.listens_state(entity_id):
+                hass.trigger_state_callback(entity_id, attribute, old, new)
+                delivered += 1
+        elif kind == 'event':
+            event, data = args
+            if hass.listens_event(event):
+                hass.trigger_event_callback(event, data)
+                delivered += 1
+    return delivered
+
+def replay_log(hass, path, realtime=False, speed=1.):
+    '''replay a callback log and its rotated backups into hass'''
+    return replay(hass, read_log(path), realtime=realtime, speed=speed)
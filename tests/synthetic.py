@@ -0,0 +1,133 @@
+'''
+Vectorized synthetic thermal data for load and accuracy testing
+
+Zones follow Newton's law with a heater, dT/dt = h*on - k(T - o), where h is
+the heating rate in *C/s, k the heat loss rate in 1/s and o the outdoor
+temperature. With the heater on the zone approaches e = o + h/k, so heating
+from s to g takes ln((e - s) / (e - g)) / k.
+
+datapoint_arrays draws ground truth heat-ups straight from that formula.
+simulate steps a thermostat schedule through time for every zone at once,
+and state_events/drive turn the result into state callbacks for FakeHass.
+'''
+from datetime import timedelta
+import numpy as np
+from .common import relative_time
+
+def random_zones(zones, seed=0, heat_rate=(1.e-3, 3.e-3), loss_rate=(2.e-5, 8.e-5)):
+    '''return {'heat_rate': array, 'loss_rate': array} drawn uniformly for each zone'''
+    rng = np.random.default_rng(seed)
+    return {'heat_rate': rng.uniform(*heat_rate, size=zones),
+            'loss_rate': rng.uniform(*loss_rate, size=zones)}
+
+def heatup_duration(heat_rate, loss_rate, start_temp, target_temp, outside):
+    '''return seconds to heat from start_temp to target_temp, inf where it can't be reached'''
+    equilibrium = outside + heat_rate / loss_rate
+    with np.errstate(divide='ignore', invalid='ignore'):
+        duration = np.log((equilibrium - start_temp) / (equilibrium - target_temp)) / loss_rate
+    return np.where(equilibrium > target_temp, duration, np.inf)
+
+def outdoor_temperature(times_s, mean=5., amplitude=5., coldest_h=5., noise=0., seed=0):
+    '''return a daily sinusoid of outdoor temperatures at times_s, coldest at coldest_h'''
+    times_s = np.asarray(times_s, dtype=float)
+    temps = mean - amplitude * np.cos(2 * np.pi * (times_s - coldest_h * 3600) / 86400)
+    if noise:
+        temps += np.random.default_rng(seed).normal(0., noise, size=times_s.shape)
+    return temps
+
+def datapoint_arrays(count, zones=None, seed=0, noise_s=60., start=(14., 20.), rise=(0.5, 4.), outside=(-5., 15.)):
+    '''return ground truth heat-ups as {'zone', 'start_temp', 'target_temp', 'outside', 'duration_s'} arrays
+
+    zones defaults to a single random zone. Heat-ups are spread evenly between zones, and
+    those a zone can't reach are dropped.'''
+    rng = np.random.default_rng(seed)
+    zones = zones if zones is not None else random_zones(1, seed)
+    zone = rng.integers(0, len(zones['heat_rate']), size=count)
+    start_temp = rng.uniform(*start, size=count)
+    target_temp = start_temp + rng.uniform(*rise, size=count)
+    outside_temp = rng.uniform(*outside, size=count)
+    duration = heatup_duration(zones['heat_rate'][zone], zones['loss_rate'][zone],
+                               start_temp, target_temp, outside_temp)
+    duration = duration + rng.normal(0., noise_s, size=count) if noise_s else duration
+    keep = np.isfinite(duration)
+    return {'zone': zone[keep], 'start_temp': start_temp[keep], 'target_temp': target_temp[keep],
+            'outside': outside_temp[keep], 'duration_s': duration[keep]}
+
+def to_datapoints(arrays, zone=None, sensor='outside'):
+    '''return store datapoints from datapoint_arrays, optionally only for one zone'''
+    rows = np.nonzero(arrays['zone'] == zone)[0] if zone is not None else range(len(arrays['zone']))
+    return [{'start_temp': float(arrays['start_temp'][i]), 'target_temp': float(arrays['target_temp'][i]),
+             'sensor_readings': [(sensor, float(arrays['outside'][i]))], 'duration_s': float(arrays['duration_s'][i])}
+            for i in rows]
+
+def simulate(zones, days, step_s=60, setback=16., comfort=21., comfort_hours=(7, 22), seed=0, **outdoor):
+    '''step every zone's temperature under a daily thermostat schedule
+
+    Returns {'time_s': (steps,), 'outside': (steps,), 'setpoint', 'current_temp', 'heating': (steps, zones)}.
+    Each zone's comfort period starts up to an hour later than comfort_hours[0].'''
+    rng = np.random.default_rng(seed)
+    count = len(zones['heat_rate'])
+    times = np.arange(0, days * 86400, step_s, dtype=float)
+    outside = outdoor_temperature(times, seed=seed, **outdoor)
+
+    start_s = comfort_hours[0] * 3600 + rng.integers(0, 60, size=count) * 60
+    time_of_day = (times % 86400)[:, None]
+    setpoint = np.where((time_of_day >= start_s) & (time_of_day < comfort_hours[1] * 3600), comfort, setback)
+
+    current = np.empty((len(times), count))
+    heating = np.empty((len(times), count), dtype=bool)
+    temp = np.full(count, setback)
+    decay = np.exp(-zones['loss_rate'] * step_s)
+    drive_temp = zones['heat_rate'] / zones['loss_rate']
+    for step, out in enumerate(outside):
+        current[step] = temp
+        heating[step] = temp < setpoint[step]
+        # exact solution over the step with the heater state held
+        equilibrium = out + heating[step] * drive_temp
+        temp = equilibrium + (temp - equilibrium) * decay
+    return {'time_s': times, 'outside': outside, 'setpoint': setpoint, 'current_temp': current, 'heating': heating}
+
+def heatup_datapoints(zones, simulation, zone, sensor='outside'):
+    '''return ground truth datapoints for each setpoint rise of zone in a simulation'''
+    setpoint = simulation['setpoint'][:, zone]
+    rises = np.nonzero(setpoint[1:] > setpoint[:-1])[0] + 1
+    start_temp = simulation['current_temp'][rises, zone]
+    durations = heatup_duration(zones['heat_rate'][zone], zones['loss_rate'][zone], start_temp,
+                                setpoint[rises], simulation['outside'][rises])
+    return [{'start_temp': float(start), 'target_temp': float(setpoint[i]),
+             'sensor_readings': [(sensor, float(simulation['outside'][i]))], 'duration_s': float(duration)}
+            for i, start, duration in zip(rises, start_temp, durations)]
+
+def state_events(simulation, zone, climate_entity, sensor_entity=None, resolution=0.1, sensor_resolution=0.5):
+    '''yield (time, entity_id, new_state) whenever a reported value of zone changes
+
+    Temperatures are rounded to resolution as a thermostat would report them.'''
+    reported = np.round(simulation['current_temp'][:, zone] / resolution) * resolution
+    setpoint = simulation['setpoint'][:, zone]
+    changed = np.ones(len(reported), dtype=bool)
+    changed[1:] = (reported[1:] != reported[:-1]) | (setpoint[1:] != setpoint[:-1])
+    streams = [(np.nonzero(changed)[0], lambda i: (climate_entity, {
+        'state': 'heat', 'attributes': {'temperature': float(setpoint[i]),
+                                        'current_temperature': round(float(reported[i]), 2)}}))]
+    if sensor_entity is not None:
+        outside = np.round(simulation['outside'] / sensor_resolution) * sensor_resolution
+        sensor_changed = np.ones(len(outside), dtype=bool)
+        sensor_changed[1:] = outside[1:] != outside[:-1]
+        streams.append((np.nonzero(sensor_changed)[0], lambda i: (sensor_entity, {'state': float(outside[i])})))
+
+    # sensors first at equal times, so the tracker sees current readings
+    steps = sorted((i, -stream) for stream, (indexes, _) in enumerate(streams) for i in indexes)
+    for i, stream in steps:
+        entity_id, state = streams[-stream][1](i)
+        yield relative_time(0) + timedelta(seconds=float(simulation['time_s'][i])), entity_id, state
+
+def drive(hass, events):
+    '''feed state_events into a FakeHass, advancing its clock to each one'''
+    for when, entity_id, new in events:
+        hass.advance_to(when)
+        old = hass.states.get(entity_id, None)
+        hass.states[entity_id] = new
+        if entity_id.startswith('climate.'):
+            hass.trigger_state_callback(entity_id, 'all', old, new)
+        else:
+            hass.trigger_state_callback(entity_id, None, old['state'] if old else None, new['state'])
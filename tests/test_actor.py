@@ -0,0 +1,61 @@
+'''
+Tests zones processing callbacks on a single worker thread
+'''
+import threading
+from zoneactor import ZoneActor
+from zoneimpl import ZoneImpl
+from .common import FakeStore, FakeHass, time_of_day
+
+# pylint: disable=global-statement
+# pylint: disable=invalid-name
+hass = None
+store = None
+
+def setup_function():
+    '''Initialize values for this test case class.'''
+    global hass, store
+    hass = FakeHass()
+    hass.args = {
+        'store': 'store',
+        'entity_id': 'climate.test',
+        'actor': True
+    }
+    store = FakeStore()
+    hass.apps['store'] = store
+
+def test_actor_processes_in_order_on_one_thread():
+    actor = ZoneActor('test', None)
+    calls = []
+    for i in range(100):
+        actor.submit(lambda i: calls.append((i, threading.current_thread().name)), i)
+    actor.join()
+    assert [i for i, _ in calls] == list(range(100))
+    assert {name for _, name in calls} == {'smartclimate-test'}
+    metrics = actor.metrics()
+    assert metrics['processed'] == 100
+    assert metrics['depth'] == 0
+    assert metrics['max_wait_s'] >= metrics['mean_wait_s'] >= 0.
+    actor.stop()
+
+def test_zone_callbacks_run_on_actor():
+    hass.time = time_of_day(hour=4)
+    hass.states['climate.test'] = {'state': 'Manual', 'attributes': {'temperature':18.0, 'current_temperature':20.5}}
+    datapoints = [{'start_temp':18.0, 'target_temp':19.0, 'duration_s':2700.0, 'sensor_readings':[]},
+                  {'start_temp':19.0, 'target_temp':20.0, 'duration_s':2700.0, 'sensor_readings':[]},
+                  {'start_temp':18.0, 'target_temp':20.0, 'duration_s':4500.0, 'sensor_readings':[]}]
+    store.data['test'] = {'datapoints': datapoints}
+    zone = ZoneImpl(hass, store)
+    hass.trigger_event_callback('smartclimate.set_preheat',
+                                {'zone': 'test', 'name': 'prediction', 'type': 'sensor', 'target_temp': 21})
+    hass.trigger_event_callback('smartclimate.set_preheat',
+                                {'zone': 'test', 'name': 'test', 'type': 'event',
+                                 'target_temp': '21', 'target_time': '07:00'})
+    zone._actor.join() # pylint: disable=protected-access
+    assert hass.set_states['sensor.prediction'] == {'state': 1800, 'attributes': {'target_temp': 21.0}}
+
+    hass.advance_time(time_of_day(6, 30))
+    zone._actor.join() # pylint: disable=protected-access
+    assert [event for event in hass.fired_events if event['event'] == 'smartclimate.start_preheat'] == \
+        [{'event': 'smartclimate.start_preheat', 'data':{'name': 'test', 'target_temp': 21}}]
+    assert zone.metrics()['processed'] == 3
+    zone.terminate()
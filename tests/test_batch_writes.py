@@ -0,0 +1,60 @@
+'''
+Tests batching writes made while handling a callback
+'''
+from appdaemon_hass_interface import AppDaemonHassInterface
+from zoneimpl import ZoneImpl
+from .common import FakeStore, FakeHass, time_of_day
+
+# pylint: disable=global-statement
+# pylint: disable=invalid-name
+hass = None
+store = None
+
+def setup_function():
+    '''Initialize values for this test case class.'''
+    global hass, store
+    hass = FakeHass()
+    hass.args = {
+        'store': 'store',
+        'entity_id': 'climate.test',
+        'batch_writes': True
+    }
+    store = FakeStore()
+    hass.apps['store'] = store
+
+def test_writes_flushed_after_callback():
+    interface = AppDaemonHassInterface(hass, batch_writes=True)
+    def handler(event, data):
+        interface.set_state('sensor.a', state=1)
+        interface.fire_event('first')
+        interface.set_state('sensor.b', state=2)
+        interface.set_state('sensor.a', state=3)
+        interface.fire_event('second')
+        assert not hass.set_state_calls and not hass.fired_events
+    interface.listen_event(handler, 'test')
+    hass.trigger_event_callback('test', {})
+
+    assert hass.set_state_calls == ['sensor.b', 'sensor.a']
+    assert hass.set_states['sensor.a'] == {'state': 3}
+    assert [event['event'] for event in hass.fired_events] == ['first', 'second']
+
+def test_writes_outside_callback_unbatched():
+    interface = AppDaemonHassInterface(hass, batch_writes=True)
+    interface.set_state('sensor.a', state=1)
+    assert hass.set_state_calls == ['sensor.a']
+
+def test_replacing_preheat_writes_once():
+    hass.time = time_of_day(hour=4)
+    hass.states['climate.test'] = {'state': 'Manual', 'attributes': {'temperature':18.0, 'current_temperature':20.5}}
+    store.data['test'] = {'datapoints': [
+        {'start_temp':18.0, 'target_temp':19.0, 'duration_s':2700.0, 'sensor_readings':[]},
+        {'start_temp':19.0, 'target_temp':20.0, 'duration_s':2700.0, 'sensor_readings':[]},
+        {'start_temp':18.0, 'target_temp':20.0, 'duration_s':4500.0, 'sensor_readings':[]}]}
+    ZoneImpl(hass, store)
+    for target_temp in (21, 22):
+        hass.trigger_event_callback('smartclimate.set_preheat',
+                                    {'zone': 'test', 'name': 'prediction', 'type': 'sensor',
+                                     'target_temp': target_temp})
+    # the cancelled sensor's 'unknown' state is never sent
+    assert hass.set_state_calls == ['sensor.prediction', 'sensor.prediction']
+    assert hass.set_states['sensor.prediction'] == {'state': 3600, 'attributes': {'target_temp': 22.0}}
@@ -0,0 +1,73 @@
+'''
+Tests recording inbound callbacks and replaying them through FakeHass
+'''
+import os
+from callbacklog import CallbackRecorder, read_log
+from zoneimpl import ZoneImpl
+from .common import FakeStore, FakeHass, time_of_day
+from .replay import replay_log
+
+# pylint: disable=invalid-name
+
+DATAPOINTS = [{'start_temp':18.0, 'target_temp':19.0, 'duration_s':2700.0, 'sensor_readings':[]},
+              {'start_temp':19.0, 'target_temp':20.0, 'duration_s':2700.0, 'sensor_readings':[]},
+              {'start_temp':18.0, 'target_temp':20.0, 'duration_s':4500.0, 'sensor_readings':[]}]
+
+def make_zone(**args):
+    hass = FakeHass()
+    hass.time = time_of_day(hour=4)
+    hass.args = dict({'store': 'store', 'entity_id': 'climate.test'}, **args)
+    hass.states['climate.test'] = {'state': 'Manual', 'attributes': {'temperature':18.0, 'current_temperature':20.5}}
+    store = FakeStore()
+    store.data['test'] = {'datapoints': list(DATAPOINTS)}
+    return hass, ZoneImpl(hass, store)
+
+def climate_update(hass, current_temp, target_temp=18.0):
+    old = hass.states['climate.test']
+    new = {'state': 'Manual', 'attributes': {'temperature': target_temp, 'current_temperature': current_temp}}
+    hass.states['climate.test'] = new
+    hass.trigger_state_callback('climate.test', 'all', old, new)
+
+def test_record_and_replay(tmp_path):
+    path = os.path.join(str(tmp_path), 'callbacks.log')
+    hass, zone = make_zone(record_callbacks=path)
+    hass.trigger_event_callback('smartclimate.set_preheat',
+                                {'zone': 'test', 'name': 'morning', 'type': 'event',
+                                 'target_temp': '21', 'target_time': '07:00'})
+    hass.trigger_event_callback('smartclimate.set_preheat',
+                                {'zone': 'test', 'name': 'prediction', 'type': 'sensor', 'target_temp': 21})
+    hass.advance_time(time_of_day(5))
+    climate_update(hass, 20.0)
+    hass.advance_time(time_of_day(5, 30))
+    climate_update(hass, 20.0, target_temp=22.0)
+    hass.advance_time(time_of_day(7))
+    climate_update(hass, 22.0, target_temp=22.0)
+    zone.terminate()
+
+    records = list(read_log(path))
+    assert [kind for _, kind, _ in records] == ['event', 'event', 'state', 'state', 'timer', 'state']
+
+    replayed, _ = make_zone()
+    assert replay_log(replayed, path) == 5
+    assert replayed.fired_events == hass.fired_events
+    assert replayed.set_states == hass.set_states
+
+def test_rotation(tmp_path):
+    path = os.path.join(str(tmp_path), 'callbacks.log')
+    recorder = CallbackRecorder(path, max_bytes=200, backups=2)
+    for i in range(20):
+        recorder.record(time_of_day(4, i), 'event', 'test', {'i': i})
+    recorder.close()
+    assert os.path.exists(path + '.2') and not os.path.exists(path + '.3')
+    indexes = [args[1]['i'] for _, _, args in read_log(path)]
+    assert indexes == list(range(indexes[0], 20))
+
+def test_partial_record_ignored(tmp_path):
+    path = os.path.join(str(tmp_path), 'callbacks.log')
+    recorder = CallbackRecorder(path)
+    recorder.record(time_of_day(4), 'event', 'test', {})
+    recorder.record(time_of_day(5), 'event', 'test', {})
+    recorder.close()
+    with open(path, 'r+b') as file:
+        file.truncate(os.path.getsize(path) - 3)
+    assert len(list(read_log(path))) == 1
@@ -0,0 +1,40 @@
+'''
+Tests the FakeHass virtual clock used by the other tests
+'''
+from .common import FakeHass, relative_time
+
+# pylint: disable=global-statement
+# pylint: disable=invalid-name
+hass = None
+
+def setup_function():
+    '''Initialize values for this test case class.'''
+    global hass
+    hass = FakeHass()
+
+def test_timers_fire_in_time_order():
+    fired = []
+    for seconds in [300, 100, 200]:
+        hass.run_at(lambda seconds=seconds: fired.append((seconds, hass.datetime())), relative_time(seconds))
+    hass.advance_to(relative_time(250))
+    assert fired == [(100, relative_time(100)), (200, relative_time(200))]
+    assert hass.datetime() == relative_time(250)
+
+def test_timers_scheduled_by_callbacks_fire_in_same_advance():
+    fired = []
+    def tick():
+        fired.append(hass.datetime())
+        hass.run_at(tick, hass.datetime() + (relative_time(60) - relative_time(0)))
+    hass.run_at(tick, relative_time(60))
+    hass.advance_to(relative_time(300))
+    assert fired == [relative_time(seconds) for seconds in [60, 120, 180, 240, 300]]
+    assert hass.pending_timers() == 1
+
+def test_cancelled_timers_do_not_fire():
+    fired = []
+    handles = [hass.run_at(lambda i=i: fired.append(i), relative_time(i)) for i in range(1000)]
+    for handle in handles[:-1]:
+        hass.cancel_timer(handle)
+    hass.advance_to(relative_time(1000))
+    assert fired == [999]
+    assert hass.pending_timers() == 0
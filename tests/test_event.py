@@ -12,6 +12,7 @@ where t = time to heat in seconds
 
 for tests with no o, s == o
 '''
+from datetime import timedelta
 from zoneimpl import ZoneImpl
 from .common import FakeStore, FakeHass, time_of_day
 
@@ -225,3 +226,48 @@ def test_preheat_event_after_trigger_time_triggers_next_day():
 
 def events():
     return [event for event in hass.fired_events if event['event'] == 'smartclimate.start_preheat']
+
+def test_preheat_event_at_upper_quantile_triggers_earlier():
+    hass.time = time_of_day(hour=4)
+    hass.states['climate.test'] = {'state': 'Manual', 'attributes': {'temperature':18.0, 'current_temperature':20.5}}
+    datapoints = [{'start_temp':18.0, 'target_temp':19.0, 'duration_s':2600.0, 'sensor_readings':[]},
+                  {'start_temp':19.0, 'target_temp':20.0, 'duration_s':2800.0, 'sensor_readings':[]},
+                  {'start_temp':18.0, 'target_temp':20.0, 'duration_s':4500.0, 'sensor_readings':[]},
+                  {'start_temp':17.0, 'target_temp':20.0, 'duration_s':6400.0, 'sensor_readings':[]},
+                  {'start_temp':19.0, 'target_temp':21.0, 'duration_s':4400.0, 'sensor_readings':[]}]
+    store.data['test'] = {'datapoints': datapoints}
+    zone = ZoneImpl(hass, store)
+    mean = zone.predict(21)
+    upper = zone.predict(21, quantile=0.9)
+    assert upper > mean
+    hass.trigger_event_callback('smartclimate.set_preheat',
+                                {'zone': 'test', 'name': 'test', 'type': 'event',
+                                 'target_temp': '21', 'target_time': '07:00', 'quantile': 0.9})
+    hass.advance_time(time_of_day(6, 59, 59) - timedelta(seconds=mean))
+    assert len(events()) == 1
+
+class LoggingHass(FakeHass):
+    def __init__(self):
+        super().__init__()
+        self.logs = []
+
+    def log(self, message, level=None):
+        self.logs.append((level, message))
+
+def test_quantile_with_exponential_model_warns_once():
+    global hass
+    hass = LoggingHass()
+    hass.args = {'store': 'store', 'entity_id': 'climate.test', 'predictor': 'exponential'}
+    hass.time = time_of_day(hour=4)
+    hass.states['climate.test'] = {'state': 'Manual', 'attributes': {'temperature':18.0, 'current_temperature':20.5}}
+    store.data['test'] = {'datapoints': [
+        {'start_temp':18.0, 'target_temp':19.0, 'duration_s':2600.0, 'sensor_readings':[]},
+        {'start_temp':19.0, 'target_temp':20.0, 'duration_s':2800.0, 'sensor_readings':[]},
+        {'start_temp':18.0, 'target_temp':20.0, 'duration_s':4500.0, 'sensor_readings':[]},
+        {'start_temp':17.0, 'target_temp':20.0, 'duration_s':6400.0, 'sensor_readings':[]},
+        {'start_temp':19.0, 'target_temp':21.0, 'duration_s':4400.0, 'sensor_readings':[]}]}
+    zone = ZoneImpl(hass, store)
+    assert zone.predict(21, quantile=0.9) == zone.predict(21)
+    assert zone.predict_interval(21, 0.9) is None
+    warnings = [message for level, message in hass.logs if level == 'WARNING']
+    assert len(warnings) == 1 and 'no prediction interval' in warnings[0]
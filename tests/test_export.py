@@ -0,0 +1,81 @@
+'''
+Tests streaming datapoints out of a data file
+'''
+import csv
+import json
+import os
+import pickle
+import numpy as np
+from export import export, main, open_source
+from sqlitestore import SqliteDataStoreImpl
+from .common import FakeHass
+
+# pylint: disable=invalid-name
+
+def datapoint(start, target, duration, outside=None, curve=None):
+    datapoint = {'start_temp': start, 'target_temp': target, 'duration_s': duration, 'completed_at': 100. + duration,
+                 'sensor_readings': [('outside', outside)] if outside is not None else []}
+    if curve is not None:
+        datapoint['curve'] = curve
+    return datapoint
+
+DATA = {'_version': 1,
+        'lounge': {'datapoints': [datapoint(18., 20., 5100., outside=5.), datapoint(19., 20., 2700., curve=b'\x00\x01')]},
+        'bedroom': {'datapoints': [datapoint(17., 21., 8000., outside=-2.)]}}
+
+def pickle_file(tmp_path):
+    data_file = os.path.join(str(tmp_path), 'data.pickle')
+    with open(data_file, 'wb') as file:
+        pickle.dump(DATA, file)
+    return data_file
+
+def sqlite_file(tmp_path):
+    app = FakeHass()
+    app.args = {'data_file': os.path.join(str(tmp_path), 'data.db')}
+    store = SqliteDataStoreImpl(app)
+    for zone in ('lounge', 'bedroom'):
+        store.add_datapoints(zone, DATA[zone]['datapoints'])
+    store.close()
+    return app.args['data_file']
+
+def test_jsonl_from_pickle_and_sqlite(tmp_path):
+    for data_file in (pickle_file(tmp_path), sqlite_file(tmp_path)):
+        output = os.path.join(str(tmp_path), 'out.jsonl')
+        assert export(data_file, output, 'jsonl') == 3
+        with open(output) as file:
+            records = [json.loads(line) for line in file]
+        # zones are exported in order, datapoints in store order within them
+        assert [record['zone'] for record in records] == ['bedroom', 'lounge', 'lounge']
+        assert sorted(record['duration_s'] for record in records) == [2700., 5100., 8000.]
+        assert records[0]['sensor_readings'] == [['outside', -2.]]
+        assert 'AAE=' in [record.get('curve', None) for record in records]
+
+def test_csv_single_zone(tmp_path):
+    output = os.path.join(str(tmp_path), 'out.csv')
+    main([sqlite_file(tmp_path), output, '--zone', 'lounge'])
+    with open(output, newline='') as file:
+        rows = list(csv.DictReader(file))
+    assert [row['zone'] for row in rows] == ['lounge', 'lounge']
+    assert json.loads(rows[1]['sensor_readings']) == [['outside', 5.]]
+
+def test_npz(tmp_path):
+    output = os.path.join(str(tmp_path), 'out.npz')
+    assert export(pickle_file(tmp_path), output, 'npz') == 3
+    arrays = np.load(output)
+    assert list(arrays['zones']) == ['bedroom', 'lounge']
+    assert list(arrays['sensor_names']) == ['outside']
+    assert list(arrays['zone']) == [0, 1, 1]
+    assert list(arrays['duration_s']) == [8000., 5100., 2700.]
+    assert arrays['sensors'].shape == (3, 1)
+    assert np.isnan(arrays['sensors'][2, 0]) and arrays['sensors'][1, 0] == 5.
+
+def test_sqlite_snapshot_ignores_concurrent_writes(tmp_path):
+    data_file = sqlite_file(tmp_path)
+    app = FakeHass()
+    app.args = {'data_file': data_file}
+    store = SqliteDataStoreImpl(app)
+    with open_source(data_file) as source:
+        before = len(list(source.records()))
+        store.add_datapoints('lounge', [datapoint(18., 19., 2000.)])
+        assert len(list(source.records())) == before
+    store.close()
@@ -0,0 +1,92 @@
+'''
+Tests sensor features are matched by name when the sensor config changes
+
+All tests assume following formula for time to heat:
+t = 1800(g - s) + 60(s - o) + 900
+    = 1800g - 1740s - 60o + 900
+
+where t = time to heat in seconds
+        g = goal temperature in *C
+        s = starting temperature in *C
+        o = outside temperature in *C
+        w = wind speed, which has no effect
+'''
+from featureschema import FeatureSchema
+from zoneimpl import ZoneImpl
+from .common import FakeStore, FakeHass, time_of_day
+
+# pylint: disable=global-statement
+# pylint: disable=invalid-name
+hass = None
+store = None
+
+def setup_function():
+    '''Initialize values for this test case class.'''
+    global hass, store
+    hass = FakeHass()
+    hass.args = {
+        'store': 'store',
+        'entity_id': 'climate.test'
+    }
+    hass.time = time_of_day(hour=4)
+    hass.states['climate.test'] = {'state': 'Manual', 'attributes': {'temperature':18.0, 'current_temperature':20.5}}
+    hass.states['sensor.outside'] = {'state': 10.5}
+    hass.states['sensor.wind'] = {'state': 3.0}
+    store = FakeStore()
+    hass.apps['store'] = store
+
+def datapoint(start, target, outside, wind=None):
+    readings = [('outside', outside)] + ([('wind', wind)] if wind is not None else [])
+    return {'start_temp': start, 'target_temp': target, 'sensor_readings': readings,
+            'duration_s': 1800*(target - start) + 60*(start - outside) + 900}
+
+OUTSIDE = [datapoint(18., 19., 12.), datapoint(19., 20., 13.), datapoint(18., 20., 8.), datapoint(20., 21., 16.)]
+
+def test_sensor_added_keeps_old_history():
+    hass.args['sensors'] = [{'name': 'wind', 'entity_id': 'sensor.wind'},
+                            {'name': 'outside', 'entity_id': 'sensor.outside'}]
+    store.data['test'] = {'datapoints': OUTSIDE + [datapoint(17., 20., 5., 2.), datapoint(16., 18., 0., 6.),
+                                                   datapoint(19., 22., 10., 4.)]}
+    zone = ZoneImpl(hass, store)
+    assert zone.predict(21) == 2400
+
+def test_sensor_removed_keeps_old_history():
+    hass.args['sensors'] = [{'name': 'outside', 'entity_id': 'sensor.outside'}]
+    store.data['test'] = {'datapoints': [datapoint(17., 20., 5., 2.), datapoint(16., 18., 0., 6.),
+                                         datapoint(19., 22., 10., 4.), datapoint(18., 21., -2., 1.)] + OUTSIDE}
+    zone = ZoneImpl(hass, store)
+    assert zone.predict(21) == 2400
+
+def test_new_sensor_ignored_until_observed():
+    schema = FeatureSchema()
+    schema.update(OUTSIDE + [datapoint(17., 20., 5., 2.)])
+    assert schema.names == ['outside']
+    assert schema.vector(21., 20.5, [('wind', 9.), ('outside', 10.5)]) == [21., 20.5, 10.5]
+
+def test_missing_readings_are_imputed():
+    schema = FeatureSchema()
+    schema.update([datapoint(18., 19., 12., 2.), datapoint(19., 20., 13., 4.),
+                   datapoint(18., 20., 8., 6.), datapoint(20., 21., 16.)])
+    x_values, _ = schema.design()
+    assert list(x_values[3]) == [21., 20., 16., 4.]
+    assert schema.vector(21., 20.5, [('outside', 10.5)]) == [21., 20.5, 10.5, 4.]
+
+def test_appended_datapoints_update_incrementally():
+    schema = FeatureSchema()
+    datapoints = list(OUTSIDE)
+    schema.update(datapoints)
+    datapoints.append(datapoint(17., 20., 5., 2.))
+    schema.update(datapoints)
+    assert len(schema) == 5
+    x_values, y_values = schema.design()
+    assert list(x_values[4]) == [20., 17., 5.]
+    assert y_values[4] == datapoints[4]['duration_s']
+
+def test_new_sensor_only_grows_columns():
+    schema = FeatureSchema()
+    schema.update(OUTSIDE)
+    rows, columns = schema._values.shape # pylint: disable=protected-access
+    schema.update(OUTSIDE + [datapoint(17., 20., 5., 2.)])
+    assert schema._values.shape == (rows, columns + 1) # pylint: disable=protected-access
+    x_values, _ = schema.design()
+    assert list(x_values[4]) == [20., 17., 5.]
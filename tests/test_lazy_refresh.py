@@ -0,0 +1,72 @@
+'''
+Tests refreshing events far from their trigger on a coarse schedule
+
+Uses t = 1800(g - s) + 900 with no sensors, see test_sensor.
+'''
+from datetime import timedelta
+from zoneimpl import ZoneImpl
+from .common import FakeStore, FakeHass, time_of_day
+
+# pylint: disable=invalid-name
+
+DATAPOINTS = [{'start_temp':18.0, 'target_temp':19.0, 'duration_s':2700.0, 'sensor_readings':[]},
+              {'start_temp':19.0, 'target_temp':20.0, 'duration_s':2700.0, 'sensor_readings':[]},
+              {'start_temp':18.0, 'target_temp':20.0, 'duration_s':4500.0, 'sensor_readings':[]}]
+
+def make_zone(**args):
+    hass = FakeHass()
+    hass.time = time_of_day(hour=8)
+    hass.args = dict({'store': 'store', 'entity_id': 'climate.test'}, **args)
+    hass.states['climate.test'] = {'state': 'Manual', 'attributes': {'temperature':18.0, 'current_temperature':20.0}}
+    store = FakeStore()
+    store.data['test'] = {'datapoints': list(DATAPOINTS)}
+    zone = ZoneImpl(hass, store)
+    predictions = []
+    predict = zone.predict
+    zone.predict = lambda *args, **kwargs: predictions.append(hass.time) or predict(*args, **kwargs)
+    return hass, zone, predictions
+
+def climate_update(hass, current_temp):
+    old_state = hass.states['climate.test']
+    new_state = {'state': 'Manual', 'attributes': {'temperature':18.0, 'current_temperature':current_temp}}
+    hass.states['climate.test'] = new_state
+    hass.trigger_state_callback('climate.test', 'all', old_state, new_state)
+
+def run_day(hass):
+    '''a preheat for 07:00 tomorrow, with the house cooling a little every minute until then'''
+    started = []
+    hass.fire_event = lambda event, **kwargs: started.append(hass.time) if event == 'smartclimate.start_preheat' \
+        else None
+    hass.trigger_event_callback('smartclimate.set_preheat',
+                                {'zone': 'test', 'name': 'morning', 'type': 'event',
+                                 'target_temp': '21', 'target_time': '07:00'})
+    for minute in range(1, 23 * 60):
+        hass.advance_time(time_of_day(8) + timedelta(minutes=minute))
+        climate_update(hass, round(20. - minute / 600., 2))
+    return started
+
+def test_far_events_refresh_lazily():
+    hass, _, eager_predictions = make_zone()
+    eager = run_day(hass)
+    hass, zone, lazy_predictions = make_zone(lazy_refresh={'fraction': 0.1, 'min_s': 60, 'window_s': 1800})
+    lazy = run_day(hass)
+
+    # every update is recomputed from the window on, so the event fires at the same time
+    assert len(lazy) == 1 and lazy == eager
+    assert len(eager_predictions) > 15 * len(lazy_predictions)
+    assert zone.metrics()['lazy_refresh']['deferred'] > 1000
+
+def test_stale_event_refreshed_without_updates():
+    hass, zone, predictions = make_zone(lazy_refresh=True)
+    hass.trigger_event_callback('smartclimate.set_preheat',
+                                {'zone': 'test', 'name': 'morning', 'type': 'event',
+                                 'target_temp': '21', 'target_time': '07:00'})
+    hass.advance_time(time_of_day(8, 1))
+    climate_update(hass, 18.0)
+    assert len(predictions) == 1
+
+    # no more updates arrive, but the deferred one is applied when its refresh is due
+    hass.advance_time(time_of_day(12))
+    assert len(predictions) == 2
+    assert zone.metrics()['lazy_refresh'] == {'deferred': 1, 'refreshed': 1}
+    assert hass.pending_timers() == 1
@@ -0,0 +1,95 @@
+'''
+Tests per zone memory and store size reporting
+'''
+import pickle
+import memoryreport
+from memoryreport import AllocationTracer, deep_sizeof
+from zoneimpl import ZoneImpl
+from .common import FakeStore, FakeHass, time_of_day
+
+# pylint: disable=global-statement
+# pylint: disable=invalid-name
+hass = None
+store = None
+
+DATAPOINTS = [{'start_temp':18.0, 'target_temp':19.0, 'duration_s':2700.0, 'sensor_readings':[]},
+              {'start_temp':19.0, 'target_temp':20.0, 'duration_s':2700.0, 'sensor_readings':[]},
+              {'start_temp':18.0, 'target_temp':20.0, 'duration_s':4500.0, 'sensor_readings':[]}]
+
+def setup_function():
+    '''Initialize values for this test case class.'''
+    global hass, store
+    hass = FakeHass()
+    hass.args = {
+        'store': 'store',
+        'entity_id': 'climate.test',
+        'curve_points': 64
+    }
+    store = FakeStore()
+    hass.apps['store'] = store
+    hass.time = time_of_day(hour=4)
+    hass.states['climate.test'] = {'state': 'Manual', 'attributes': {'temperature':18.0, 'current_temperature':20.5}}
+    # zones from other tests may still hold the process wide tracer
+    memoryreport.TRACER = AllocationTracer()
+
+def test_deep_sizeof():
+    small = deep_sizeof({'a': [1.5]})
+    assert deep_sizeof({'a': [float(i) for i in range(1000)]}) > small + 1000 * 8
+    shared = [0.] * 100
+    # shared references are only counted once, excluded objects not at all
+    assert deep_sizeof([shared, shared]) < 2 * deep_sizeof(shared)
+    assert deep_sizeof([shared], exclude=[shared]) < deep_sizeof(shared)
+
+def test_zone_memory_report():
+    store.data['test'] = {'datapoints': DATAPOINTS * 10}
+    zone = ZoneImpl(hass, store)
+    report = zone.memory_report()
+    assert report['datapoints'] == 30
+    assert report['serialized_bytes'] == len(pickle.dumps(store.data['test']))
+    assert report['memory_bytes'] > report['serialized_bytes']
+    assert report['predictor_bytes'] > 0 and report['tracker_bytes'] > 0 and report['sensor_bytes'] > 0
+
+def test_memory_report_event():
+    store.data['test'] = {'datapoints': list(DATAPOINTS)}
+    ZoneImpl(hass, store)
+    hass.trigger_event_callback('smartclimate.memory_report', {'zone': 'other'})
+    assert 'sensor.smartclimate_test_memory' not in hass.set_states
+
+    hass.trigger_event_callback('smartclimate.memory_report', {'tracemalloc': True})
+    state = hass.set_states['sensor.smartclimate_test_memory']
+    assert 'tracemalloc' not in state['attributes']
+    assert state['state'] > state['attributes']['predictor_bytes']
+    assert hass.set_states['sensor.smartclimate_memory']['attributes']['tracemalloc'] is None
+
+    hass.trigger_event_callback('smartclimate.memory_report', {'tracemalloc': True, 'top': 3})
+    assert len(hass.set_states['sensor.smartclimate_memory']['attributes']['tracemalloc']) <= 3
+    hass.trigger_event_callback('smartclimate.memory_report', {'tracemalloc': 'stop'})
+
+def make_zone(name):
+    zone_hass = FakeHass()
+    zone_hass.name = name
+    zone_hass.time = time_of_day(hour=4)
+    zone_hass.args = {'store': 'store', 'entity_id': 'climate.' + name}
+    zone_hass.states['climate.' + name] = hass.states['climate.test']
+    return zone_hass, ZoneImpl(zone_hass, store)
+
+def test_allocations_diffed_once_per_event():
+    zones = [make_zone('lounge'), make_zone('bedroom')]
+    diffs = []
+    diff = memoryreport.TRACER.diff
+    memoryreport.TRACER.diff = lambda top: diffs.append(top) or diff(top)
+    # AppDaemon delivers the broadcast to every zone's listener
+    for zone_hass, _ in zones:
+        zone_hass.trigger_event_callback('smartclimate.memory_report', {'tracemalloc': True})
+    assert len(diffs) == 1
+    assert 'sensor.smartclimate_memory' in zones[0][0].set_states
+    assert 'sensor.smartclimate_memory' not in zones[1][0].set_states
+    assert all('sensor.smartclimate_{}_memory'.format(zone_hass.name) in zone_hass.set_states
+               for zone_hass, _ in zones)
+
+    # once the first zone stops, another takes over
+    zones[0][1].terminate()
+    zones[1][0].trigger_event_callback('smartclimate.memory_report', {'tracemalloc': True})
+    assert len(diffs) == 2
+    assert 'sensor.smartclimate_memory' in zones[1][0].set_states
+    memoryreport.TRACER.stop()
@@ -0,0 +1,160 @@
+'''
+Tests predictor families and cross validated model selection
+
+All tests assume following formula for time to heat:
+t = 1800(g - s) + 60(s - o) + 900
+    = 1800g - 1740s - 60o + 900
+
+where t = time to heat in seconds
+        g = goal temperature in *C
+        s = starting temperature in *C
+        o = outside temperature in *C
+
+for tests with no o, s == o
+'''
+import subprocess
+import sys
+from concurrent.futures import TimeoutError as FutureTimeout
+import os
+from os import path
+from threading import Event
+import modelselection
+from modelselection import select_predictor, cross_validate
+from predictor import PREDICTORS
+from zoneimpl import ZoneImpl
+from .common import FakeStore, FakeHass, time_of_day
+
+# pylint: disable=global-statement
+# pylint: disable=invalid-name
+hass = None
+store = None
+
+def setup_function():
+    '''Initialize values for this test case class.'''
+    global hass, store
+    hass = FakeHass()
+    hass.args = {
+        'store': 'store',
+        'entity_id': 'climate.test'
+    }
+    store = FakeStore()
+    hass.apps['store'] = store
+
+def datapoints():
+    return [{'start_temp': start, 'target_temp': target,
+             'duration_s': 1800*(target - start) + 60*(start - outside) + 900,
+             'sensor_readings': [('outside', outside)]}
+            for start, target, outside in [(18., 19., 12.), (19., 20., 13.), (18., 20., 8.), (20., 21., 16.),
+                                           (17., 20., 5.), (16., 18., 0.), (19., 22., 10.), (18., 21., -2.),
+                                           (17., 19., 3.), (20., 22., 14.)]]
+
+def test_cross_validate_reports_error_and_timings():
+    result = cross_validate('linear', datapoints(), folds=5)
+    assert result['kind'] == 'linear'
+    assert result['error_s'] < 1.
+    assert result['fit_time_s'] > 0.
+    assert result['predict_time_s'] > 0.
+
+def test_select_predictor_picks_lowest_error():
+    best, results = select_predictor(datapoints(), folds=5)
+    assert set(results) == {'linear', 'ridge', 'huber', 'exponential'}
+    assert results[best]['error_s'] == min(result['error_s'] for result in results.values())
+
+def test_select_predictor_with_insufficient_data_defaults_to_linear():
+    best, results = select_predictor(datapoints()[:3], folds=5)
+    assert best == 'linear'
+    assert results['linear']['error_s'] == float('inf')
+
+def test_configured_predictor_family():
+    hass.time = time_of_day(hour=4)
+    hass.args['predictor'] = 'ridge'
+    hass.args['sensors'] = [{'entity_id': 'sensor.outside'}]
+    hass.states['climate.test'] = {'state': 'Manual', 'attributes': {'temperature':18.0, 'current_temperature':20.5}}
+    hass.states['sensor.outside'] = {'state': 10.5}
+    store.data['test'] = {'datapoints': datapoints()}
+    zone = ZoneImpl(hass, store)
+    assert type(zone.predictor).__name__ == 'RidgePredictor'
+    assert zone.predict(21) is not None
+
+def test_auto_selection_runs_off_the_callback_thread(monkeypatch):
+    release = Event()
+    selections = []
+    def select_predictor_stub(datapoints, candidates=None, folds=5, executor=None, timeout=None):
+        release.wait(30)
+        selections.append(len(datapoints))
+        return 'ridge', {}
+    monkeypatch.setattr(modelselection, 'select_predictor', select_predictor_stub)
+
+    hass.time = time_of_day(hour=4)
+    hass.args['predictor'] = 'auto'
+    hass.args['reselect_every'] = 3
+    hass.args['sensors'] = [{'entity_id': 'sensor.outside'}]
+    hass.states['climate.test'] = {'state': 'Manual', 'attributes': {'temperature':18.0, 'current_temperature':20.5}}
+    hass.states['sensor.outside'] = {'state': 10.5}
+    store.data['test'] = {'datapoints': datapoints()}
+    # init doesn't wait for the selection, and predicts with the linear model meanwhile
+    zone = ZoneImpl(hass, store)
+    assert type(zone.predictor).__name__ == 'LinearPredictor'
+    assert zone.predict(21) is not None
+    release.set()
+    assert zone.wait_fitted(timeout=30)
+    assert type(zone.predictor).__name__ == 'LinearPredictor'
+
+    # the winner is installed on the zone's callback path
+    hass.advance_time(time_of_day(4, 0, 1))
+    assert type(zone.predictor).__name__ == 'RidgePredictor'
+    assert selections == [10]
+
+    # and selection only runs again every reselect_every datapoints
+    for _ in range(3):
+        zone.add_datapoint(20., 18., [('outside', 10.)], 1800*2 + 60*8 + 900)
+        assert zone.wait_fitted(timeout=30)
+    assert selections == [10, 13]
+
+def test_slow_selection_keeps_the_current_predictor(monkeypatch):
+    timeouts = []
+    def select_predictor_stub(datapoints, candidates=None, folds=5, executor=None, timeout=None):
+        timeouts.append(timeout)
+        raise FutureTimeout()
+    monkeypatch.setattr(modelselection, 'select_predictor', select_predictor_stub)
+
+    hass.time = time_of_day(hour=4)
+    hass.args['predictor'] = 'auto'
+    hass.args['selection_timeout_s'] = 5
+    hass.args['sensors'] = [{'entity_id': 'sensor.outside'}]
+    hass.states['climate.test'] = {'state': 'Manual', 'attributes': {'temperature':18.0, 'current_temperature':20.5}}
+    hass.states['sensor.outside'] = {'state': 10.5}
+    store.data['test'] = {'datapoints': datapoints()}
+    zone = ZoneImpl(hass, store)
+    assert zone.wait_fitted(timeout=30)
+    hass.advance_time(time_of_day(4, 0, 1))
+    assert timeouts == [5.]
+    assert type(zone.predictor).__name__ == 'LinearPredictor'
+    assert zone.predict(21) is not None
+
+AUTO_SELECTION = """
+from tests.common import FakeHass, FakeStore, time_of_day
+from tests.test_model_selection import datapoints
+from zoneimpl import ZoneImpl
+hass = FakeHass()
+hass.time = time_of_day(hour=4)
+hass.args = {'store': 'store', 'entity_id': 'climate.test', 'predictor': 'auto',
+             'sensors': [{'entity_id': 'sensor.outside'}]}
+hass.states['climate.test'] = {'state': 'Manual', 'attributes': {'temperature':18.0, 'current_temperature':20.5}}
+hass.states['sensor.outside'] = {'state': 10.5}
+store = FakeStore()
+store.data['test'] = {'datapoints': datapoints()}
+zone = ZoneImpl(hass, store)
+assert zone.wait_fitted(timeout=60)
+hass.advance_time(time_of_day(4, 0, 1))
+print(type(zone.predictor).__name__)
+"""
+
+def test_auto_selection_in_a_fresh_process():
+    # a fresh interpreter, so sklearn is imported by the zone while selection starts its workers
+    root = path.dirname(path.dirname(path.realpath(__file__)))
+    result = subprocess.run([sys.executable, '-c', AUTO_SELECTION], cwd=root, timeout=120,
+                            capture_output=True, text=True, check=False,
+                            env=dict(os.environ, PYTHONPATH=os.pathsep.join([root, path.join(root, 'smartclimate')])))
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() in [predictor.__name__ for predictor in PREDICTORS.values()]
@@ -0,0 +1,104 @@
+'''
+Tests planning preheat events from a weather forecast
+
+All tests assume following formula for time to heat:
+t = 1800(g - s) + 60(s - o) + 900
+    = 1800g - 1740s - 60o + 900
+
+where t = time to heat in seconds
+        g = goal temperature in *C
+        s = starting temperature in *C
+        o = outside temperature in *C
+'''
+from zoneimpl import ZoneImpl
+from .common import FakeStore, FakeHass, time_of_day
+
+# pylint: disable=global-statement
+# pylint: disable=invalid-name
+hass = None
+store = None
+
+def setup_function():
+    '''Initialize values for this test case class.'''
+    global hass, store
+    hass = FakeHass()
+    hass.args = {
+        'store': 'store',
+        'entity_id': 'climate.test',
+        'sensors': [{'name': 'outside', 'entity_id': 'sensor.outside'}],
+        'forecast': {'entity_id': 'weather.home', 'sensor': 'outside'}
+    }
+    hass.time = time_of_day(hour=4)
+    hass.states['climate.test'] = {'state': 'Manual', 'attributes': {'temperature':18.0, 'current_temperature':20.5}}
+    hass.states['sensor.outside'] = {'state': 10.5}
+    store = FakeStore()
+    store.data['test'] = {'datapoints': [
+        {'start_temp':18.0, 'target_temp':19.0, 'duration_s':3060.0, 'sensor_readings':[('outside', 12.0)]},
+        {'start_temp':19.0, 'target_temp':20.0, 'duration_s':3060.0, 'sensor_readings':[('outside', 13.0)]},
+        {'start_temp':18.0, 'target_temp':20.0, 'duration_s':5100.0, 'sensor_readings':[('outside', 8.0)]},
+        {'start_temp':20.0, 'target_temp':21.0, 'duration_s':2940.0, 'sensor_readings':[('outside', 16.0)]}]}
+
+def forecast(*points):
+    return {'state': 'cloudy', 'attributes': {'forecast': [
+        {'datetime': time_of_day(hour).isoformat(), 'temperature': temp} for hour, temp in points]}}
+
+def set_event():
+    hass.trigger_event_callback('smartclimate.set_preheat',
+                                {'zone': 'test', 'name': 'test', 'type': 'event',
+                                 'target_temp': '21', 'target_time': '07:00'})
+
+def events():
+    return [event for event in hass.fired_events if event['event'] == 'smartclimate.start_preheat']
+
+def test_trigger_planned_from_falling_forecast():
+    hass.states['weather.home'] = forecast((4, 10.5), (6, 0.5), (9, 0.5))
+    ZoneImpl(hass, store)
+    set_event()
+    hass.advance_time(time_of_day(6, 9, 59))
+    assert events() == []
+    hass.advance_time(time_of_day(6, 10))
+    assert len(events()) == 1
+
+def test_plan_updates_when_forecast_changes():
+    hass.states['weather.home'] = forecast((4, 10.5), (9, 10.5))
+    ZoneImpl(hass, store)
+    set_event()
+    hass.states['weather.home'] = forecast((4, 10.5), (6, 0.5), (9, 0.5))
+    hass.trigger_state_callback('weather.home', 'forecast', None, hass.states['weather.home'])
+    hass.advance_time(time_of_day(6, 9, 59))
+    assert events() == []
+    hass.advance_time(time_of_day(6, 10))
+    assert len(events()) == 1
+
+def test_live_reading_corrects_plan():
+    hass.states['weather.home'] = forecast((4, 10.5), (9, 10.5))
+    ZoneImpl(hass, store)
+    set_event()
+    hass.states['sensor.outside'] = {'state': 0.5}
+    hass.trigger_state_callback('sensor.outside', None, None, hass.states['sensor.outside'])
+    hass.advance_time(time_of_day(6, 9, 59))
+    assert events() == []
+    hass.advance_time(time_of_day(6, 10))
+    assert len(events()) == 1
+
+def test_without_forecast_uses_live_prediction():
+    ZoneImpl(hass, store)
+    set_event()
+    hass.advance_time(time_of_day(6, 19, 59))
+    assert events() == []
+    hass.advance_time(time_of_day(6, 20))
+    assert len(events()) == 1
+
+def test_plan_and_live_prediction_use_the_event_quantile():
+    store.data['test']['datapoints'] += [
+        {'start_temp':17.0, 'target_temp':20.0, 'duration_s':6400.0, 'sensor_readings':[('outside', 9.0)]},
+        {'start_temp':19.0, 'target_temp':21.0, 'duration_s':4400.0, 'sensor_readings':[('outside', 11.0)]}]
+    hass.states['weather.home'] = forecast((4, 10.5), (9, 10.5))
+    zone = ZoneImpl(hass, store)
+    upper = zone.predict(21, quantile=0.9)
+    assert upper > zone.predict(21)
+    hass.trigger_event_callback('smartclimate.set_preheat',
+                                {'zone': 'test', 'name': 'test', 'type': 'event',
+                                 'target_temp': '21', 'target_time': '07:00', 'quantile': 0.9})
+    _, baseline = zone.planner._plans['test'] # pylint: disable=protected-access
+    assert abs(baseline - upper) <= 1
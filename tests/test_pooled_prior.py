@@ -0,0 +1,70 @@
+'''
+Tests pooling datapoints across zones as a prior for new zones
+
+Other zones follow t = 1800(g - s) + 900, see test_sensor.
+'''
+import numpy as np
+from pooledprior import PooledPrior
+from zoneimpl import ZoneImpl
+from .common import FakeStore, FakeHass, time_of_day
+
+# pylint: disable=global-statement
+# pylint: disable=invalid-name
+store = None
+
+def datapoint(start, target, rate=1800., offset=900.):
+    return {'start_temp': start, 'target_temp': target, 'duration_s': rate * (target - start) + offset,
+            'sensor_readings': []}
+
+LOUNGE = [datapoint(18., 19.), datapoint(19., 20.), datapoint(18., 20.), datapoint(17., 21.), datapoint(16., 19.5)]
+
+def setup_function():
+    '''Initialize values for this test case class.'''
+    global store
+    store = FakeStore()
+    store.data['lounge'] = {'datapoints': list(LOUNGE)}
+
+def make_zone(name, **args):
+    hass = FakeHass()
+    hass.name = name
+    hass.time = time_of_day(hour=4)
+    hass.args = dict({'store': 'store', 'entity_id': 'climate.' + name, 'pooled_prior': True}, **args)
+    hass.states['climate.' + name] = {'state': 'Manual',
+                                      'attributes': {'temperature':18.0, 'current_temperature':20.5}}
+    return hass, ZoneImpl(hass, store)
+
+def test_new_zone_uses_prior():
+    _, bedroom = make_zone('bedroom')
+    assert bedroom.predict(21.) == 1800
+
+    _, attic = make_zone('attic', pooled_prior=False)
+    assert attic.predict(21.) is None
+
+def test_zone_shrinks_toward_own_fit():
+    _, bedroom = make_zone('bedroom')
+    # the bedroom heats at half the rate, so its own model predicts 3600
+    for start, target in ((18., 19.), (19., 20.), (18., 20.)):
+        bedroom.add_datapoint(target, start, [], datapoint(start, target, 3600., 1800.)['duration_s'])
+    assert bedroom.predict(21.) == round(3 / 8. * 3600 + 5 / 8. * 1800)
+    for _ in range(20):
+        bedroom.add_datapoint(20., 18., [], 9000.)
+    assert bedroom.predict(21.) == round(23 / 28. * 3600 + 5 / 28. * 1800)
+
+def test_prior_excludes_own_zone():
+    _, lounge = make_zone('lounge')
+    _, bedroom = make_zone('bedroom')
+    for start, target in ((18., 19.), (19., 20.), (18., 20.)):
+        bedroom.add_datapoint(target, start, [], datapoint(start, target, 3600., 1800.)['duration_s'])
+    # the lounge's own fit predicts 1800 and its prior, only from the bedroom, 3600
+    assert lounge.predict(21.) == 2700
+
+def test_incremental_update_matches_rebuild():
+    incremental = PooledPrior()
+    for point in LOUNGE:
+        incremental.add('lounge', point)
+    rebuilt = PooledPrior()
+    rebuilt.set_zone('lounge', LOUNGE)
+    rebuilt.set_zone('lounge', LOUNGE)
+    assert np.allclose(incremental.coefficients(), rebuilt.coefficients())
+    assert np.allclose(rebuilt.coefficients(), [900., 1800., -1800.], atol=1e-3)
+    assert rebuilt.coefficients(exclude='lounge') is None
@@ -0,0 +1,82 @@
+'''
+Tests what-if prediction queries
+
+All tests assume following formula for time to heat:
+t = 1800(g - s) + 60(s - o) + 900
+    = 1800g - 1740s - 60o + 900
+
+where t = time to heat in seconds
+        g = goal temperature in *C
+        s = starting temperature in *C
+        o = outside temperature in *C
+
+for tests with no o, s == o
+'''
+from zoneimpl import ZoneImpl
+from .common import FakeStore, FakeHass, time_of_day
+
+# pylint: disable=global-statement
+# pylint: disable=invalid-name
+hass = None
+store = None
+
+def setup_function():
+    '''Initialize values for this test case class.'''
+    global hass, store
+    hass = FakeHass()
+    hass.args = {
+        'store': 'store',
+        'entity_id': 'climate.test',
+        'sensors': [{'name': 'outside', 'entity_id': 'sensor.outside'}]
+    }
+    hass.time = time_of_day(hour=4)
+    hass.states['climate.test'] = {'state': 'Manual', 'attributes': {'temperature':18.0, 'current_temperature':20.5}}
+    hass.states['sensor.outside'] = {'state': 10.5}
+    store = FakeStore()
+    hass.apps['store'] = store
+
+def learn():
+    store.data['test'] = {'datapoints': [
+        {'start_temp':18.0, 'target_temp':19.0, 'duration_s':3060.0, 'sensor_readings':[('outside', 12.0)]},
+        {'start_temp':19.0, 'target_temp':20.0, 'duration_s':3060.0, 'sensor_readings':[('outside', 13.0)]},
+        {'start_temp':18.0, 'target_temp':20.0, 'duration_s':5100.0, 'sensor_readings':[('outside', 8.0)]},
+        {'start_temp':20.0, 'target_temp':21.0, 'duration_s':2940.0, 'sensor_readings':[('outside', 16.0)]}]}
+
+def result():
+    results = [event for event in hass.fired_events if event['event'] == 'smartclimate.query_result']
+    assert len(results) == 1
+    return results[0]['data']
+
+def test_query_grid_of_targets_with_current_readings():
+    learn()
+    ZoneImpl(hass, store)
+    hass.trigger_event_callback('smartclimate.query', {'zone': 'test', 'id': 1, 'target_temps': [21, 22]})
+    data = result()
+    assert data['id'] == 1
+    assert data['ready']
+    assert data['error'] is None
+    assert [(r['target_temp'], r['sensors'], r['duration_s']) for r in data['results']] == \
+        [(21., {'outside': 10.5}, 2400), (22., {'outside': 10.5}, 4200)]
+
+def test_query_with_sensor_overrides():
+    learn()
+    ZoneImpl(hass, store)
+    hass.trigger_event_callback('smartclimate.query', {'zone': 'test', 'target_temps': [21],
+                                                       'current_temp': 20., 'sensors': {'outside': [-5, 10]}})
+    assert [(r['sensors']['outside'], r['duration_s']) for r in result()['results']] == \
+        [(-5., 4200), (10., 3300)]
+
+def test_query_before_learning_uses_default():
+    ZoneImpl(hass, store)
+    hass.trigger_event_callback('smartclimate.query', {'zone': 'test', 'target_temps': [21]})
+    data = result()
+    assert not data['ready']
+    assert data['results'][0]['duration_s'] == 3600
+
+def test_query_with_missing_reading():
+    del hass.states['sensor.outside']
+    learn()
+    ZoneImpl(hass, store)
+    hass.trigger_event_callback('smartclimate.query', {'zone': 'test', 'target_temps': [21]})
+    assert result()['error'] == 'missing readings'
+    assert result()['results'] == []
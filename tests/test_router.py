@@ -0,0 +1,111 @@
+'''
+Tests routing of preheat events through a shared EventRouter
+'''
+from eventrouterimpl import EventRouterImpl
+from zoneimpl import ZoneImpl
+from .common import FakeStore, FakeHass, time_of_day
+
+# pylint: disable=global-statement
+# pylint: disable=invalid-name
+router_hass = None
+router = None
+store = None
+
+def setup_function():
+    '''Initialize values for this test case class.'''
+    global router_hass, router, store
+    router_hass = FakeHass()
+    router_hass.name = 'router'
+    router = EventRouterImpl(router_hass)
+    store = FakeStore()
+
+def make_zone(name):
+    hass = FakeHass()
+    hass.name = name
+    hass.time = time_of_day(hour=4)
+    hass.args = {'store': 'store', 'entity_id': 'climate.' + name}
+    hass.states['climate.' + name] = {'state': 'Manual',
+                                      'attributes': {'temperature':18.0, 'current_temperature':20.5}}
+    ZoneImpl(hass, store, router=router)
+    return hass
+
+def test_zone_does_not_listen_for_events_itself():
+    hass = make_zone('lounge')
+    assert not hass._event_listeners # pylint: disable=protected-access
+
+def deliver(*zones):
+    '''run the handlers the router dispatched onto each zone'''
+    for hass in zones:
+        hass.advance_time(hass.time)
+
+def test_set_preheat_is_routed_to_zone():
+    lounge = make_zone('lounge')
+    bedroom = make_zone('bedroom')
+    router_hass.trigger_event_callback('smartclimate.set_preheat',
+                                       {'zone': 'bedroom', 'name': 'prediction', 'type': 'sensor', 'target_temp': 21})
+    # handled on the zone's own thread, not the router's
+    assert 'sensor.prediction' not in bedroom.set_states
+    deliver(lounge, bedroom)
+    assert 'sensor.prediction' in bedroom.set_states
+    assert 'sensor.prediction' not in lounge.set_states
+
+def test_clear_preheat_without_zone_is_routed_by_name():
+    lounge = make_zone('lounge')
+    bedroom = make_zone('bedroom')
+    router_hass.trigger_event_callback('smartclimate.set_preheat',
+                                       {'zone': 'lounge', 'name': 'lounge_pred', 'type': 'sensor', 'target_temp': 21})
+    router_hass.trigger_event_callback('smartclimate.set_preheat',
+                                       {'zone': 'bedroom', 'name': 'bed_pred', 'type': 'sensor', 'target_temp': 21})
+    router_hass.trigger_event_callback('smartclimate.clear_preheat', {'name': 'bed_pred'})
+    deliver(lounge, bedroom)
+    assert bedroom.set_states['sensor.bed_pred'] == {'state': 'unknown'}
+    assert lounge.set_states['sensor.lounge_pred'] != {'state': 'unknown'}
+
+def test_events_for_unknown_zone_are_ignored():
+    lounge = make_zone('lounge')
+    router_hass.trigger_event_callback('smartclimate.set_preheat',
+                                       {'zone': 'attic', 'name': 'prediction', 'type': 'sensor', 'target_temp': 21})
+    router_hass.trigger_event_callback('smartclimate.clear_preheat', {'name': 'prediction'})
+    router_hass.trigger_event_callback('smartclimate.query', {'zone': 'attic', 'target_temp': 21})
+    assert lounge.pending_timers() == 0
+    deliver(lounge)
+    assert not lounge.set_states
+    assert [event['event'] for event in lounge.fired_events] == ['smartclimate.up']
+
+def test_terminated_zone_is_unregistered():
+    lounge = make_zone('lounge')
+    bedroom = FakeHass()
+    bedroom.name = 'bedroom'
+    bedroom.time = time_of_day(hour=4)
+    bedroom.args = {'store': 'store', 'entity_id': 'climate.bedroom'}
+    bedroom.states['climate.bedroom'] = {'state': 'Manual',
+                                         'attributes': {'temperature':18.0, 'current_temperature':20.5}}
+    ZoneImpl(bedroom, store, router=router).terminate()
+    router_hass.trigger_event_callback('smartclimate.set_preheat',
+                                       {'zone': 'bedroom', 'name': 'prediction', 'type': 'sensor', 'target_temp': 21})
+    router_hass.trigger_event_callback('smartclimate.memory_report', {})
+    assert bedroom.pending_timers() == 0
+    deliver(lounge, bedroom)
+    assert not bedroom.set_states
+    assert 'sensor.smartclimate_lounge_memory' in lounge.set_states
+
+def test_memory_report_without_zone_goes_to_all_zones():
+    lounge = make_zone('lounge')
+    bedroom = make_zone('bedroom')
+    router_hass.trigger_event_callback('smartclimate.memory_report', {'zone': 'lounge'})
+    deliver(lounge, bedroom)
+    assert 'sensor.smartclimate_lounge_memory' in lounge.set_states
+    assert not bedroom.set_states
+    router_hass.trigger_event_callback('smartclimate.memory_report', {})
+    deliver(lounge, bedroom)
+    assert 'sensor.smartclimate_bedroom_memory' in bedroom.set_states
+
+def test_router_diffs_allocations_once():
+    lounge = make_zone('lounge')
+    bedroom = make_zone('bedroom')
+    router_hass.trigger_event_callback('smartclimate.memory_report', {'tracemalloc': True})
+    deliver(lounge, bedroom)
+    assert 'sensor.smartclimate_memory' in router_hass.set_states
+    assert 'sensor.smartclimate_memory' not in lounge.set_states
+    assert 'sensor.smartclimate_memory' not in bedroom.set_states
+    router_hass.trigger_event_callback('smartclimate.memory_report', {'tracemalloc': 'stop'})
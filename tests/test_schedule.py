@@ -0,0 +1,94 @@
+'''
+Tests recurring preheat schedules
+
+Uses t = 1800(g - s) + 900 with no sensors, see test_event.
+1 Jan 2019 is a Tuesday.
+'''
+from datetime import datetime
+from schedule import ScheduleRule
+from zoneimpl import ZoneImpl
+from .common import FakeStore, FakeHass, time_of_day
+
+# pylint: disable=global-statement
+# pylint: disable=invalid-name
+hass = None
+store = None
+started = None
+
+def setup_function():
+    '''Initialize values for this test case class.'''
+    global hass, store, started
+    hass = FakeHass()
+    started = []
+    def fire_event(event, **kwargs):
+        if event == 'smartclimate.start_preheat':
+            started.append((kwargs['name'], hass.time))
+    hass.fire_event = fire_event
+    hass.args = {
+        'store': 'store',
+        'entity_id': 'climate.test'
+    }
+    store = FakeStore()
+    store.data['test'] = {'datapoints': [
+        {'start_temp':18.0, 'target_temp':19.0, 'duration_s':2700.0, 'sensor_readings':[]},
+        {'start_temp':19.0, 'target_temp':20.0, 'duration_s':2700.0, 'sensor_readings':[]},
+        {'start_temp':18.0, 'target_temp':20.0, 'duration_s':4500.0, 'sensor_readings':[]}]}
+    hass.time = time_of_day(hour=4)
+    hass.states['climate.test'] = {'state': 'Manual', 'attributes': {'temperature':18.0, 'current_temperature':20.5}}
+
+def test_rule_days():
+    rule = ScheduleRule.parse({'target_time': '07:00', 'days': 'weekends'})
+    assert rule.next_after(time_of_day(8)) == datetime(2019, 1, 5, 7, 0)
+    rule = ScheduleRule.parse({'target_time': '07:30', 'days': ['Monday', 'wed']})
+    assert rule.next_after(time_of_day(8)) == datetime(2019, 1, 2, 7, 30)
+    assert rule.next_after(datetime(2019, 1, 2, 7, 30)) == datetime(2019, 1, 7, 7, 30)
+    rule = ScheduleRule.parse({'target_time': '07:00', 'days': 'mon-fri'})
+    assert rule.next_after(datetime(2019, 1, 4, 7, 0)) == datetime(2019, 1, 7, 7, 0)
+
+def test_rule_cron():
+    rule = ScheduleRule.from_cron('30 6,18 * * 1-5')
+    assert rule.next_after(time_of_day(8)) == datetime(2019, 1, 1, 18, 30)
+    assert rule.next_after(datetime(2019, 1, 4, 18, 30)) == datetime(2019, 1, 7, 6, 30)
+    rule = ScheduleRule.from_cron('*/15 7 1 2 *')
+    assert rule.next_after(time_of_day(8)) == datetime(2019, 2, 1, 7, 0)
+    assert rule.next_after(datetime(2019, 2, 1, 7, 0)) == datetime(2019, 2, 1, 7, 15)
+    # cron ORs restricted days of the month and weekdays
+    rule = ScheduleRule.from_cron('0 7 15 * 0')
+    assert rule.next_after(time_of_day(8)) == datetime(2019, 1, 6, 7, 0)
+    assert rule.next_after(datetime(2019, 1, 13, 7, 0)) == datetime(2019, 1, 15, 7, 0)
+
+def test_daily_schedule_rearms():
+    ZoneImpl(hass, store)
+    hass.trigger_event_callback('smartclimate.set_preheat',
+                                {'zone': 'test', 'name': 'morning', 'type': 'schedule',
+                                 'target_temp': '21', 'target_time': '07:00', 'days': 'daily'})
+    hass.advance_time(time_of_day(12, extradays=2))
+    assert started == [('morning', time_of_day(6, 30, extradays=day)) for day in range(3)]
+
+def test_weekday_schedule_skips_weekend():
+    ZoneImpl(hass, store)
+    hass.trigger_event_callback('smartclimate.set_preheat',
+                                {'zone': 'test', 'name': 'work', 'type': 'schedule',
+                                 'target_temp': '21', 'cron': '0 7 * * 1-5'})
+    hass.advance_time(time_of_day(12, extradays=6))
+    assert [when.weekday() for _, when in started] == [1, 2, 3, 4, 0]
+
+def test_clear_schedule():
+    ZoneImpl(hass, store)
+    hass.trigger_event_callback('smartclimate.set_preheat',
+                                {'zone': 'test', 'name': 'morning', 'type': 'schedule',
+                                 'target_temp': '21', 'target_time': '07:00'})
+    hass.advance_time(time_of_day(12))
+    hass.trigger_event_callback('smartclimate.clear_preheat', {'zone': 'test', 'name': 'morning'})
+    hass.advance_time(time_of_day(12, extradays=3))
+    assert started == [('morning', time_of_day(6, 30))]
+
+def test_rules_lazy_at_rest():
+    zone = ZoneImpl(hass, store)
+    for i in range(200):
+        hass.trigger_event_callback('smartclimate.set_preheat',
+                                    {'zone': 'test', 'name': 'rule{}'.format(i), 'type': 'schedule',
+                                     'target_temp': '21', 'target_time': '{}:{:02}'.format(12 + i % 12, i % 60)})
+    # nothing is within the lookahead yet, so only the engine's timer is pending
+    assert hass.pending_timers() == 1
+    assert not zone._preheats # pylint: disable=protected-access
@@ -0,0 +1,85 @@
+'''
+Tests dropping sensor updates too small to change a prediction
+
+Uses t = 1800(g - s) + 60(s - o) + 900, see test_sensor, so a change of
+1/60 *C outside moves predictions by a second.
+'''
+from zoneimpl import ZoneImpl
+from .common import FakeStore, FakeHass, time_of_day
+
+# pylint: disable=global-statement
+# pylint: disable=invalid-name
+hass = None
+store = None
+
+DATAPOINTS = [{'start_temp':18.0, 'target_temp':19.0, 'duration_s':3060.0, 'sensor_readings':[('outside', 12.0)]},
+              {'start_temp':19.0, 'target_temp':20.0, 'duration_s':3060.0, 'sensor_readings':[('outside', 13.0)]},
+              {'start_temp':18.0, 'target_temp':20.0, 'duration_s':5100.0, 'sensor_readings':[('outside', 8.0)]},
+              {'start_temp':20.0, 'target_temp':21.0, 'duration_s':2940.0, 'sensor_readings':[('outside', 16.0)]}]
+
+def setup_function():
+    '''Initialize values for this test case class.'''
+    global hass, store
+    hass = FakeHass()
+    hass.args = {
+        'store': 'store',
+        'entity_id': 'climate.test',
+        'sensors': [{'name': 'outside', 'entity_id': 'sensor.outside'}, {'name': 'wind', 'entity_id': 'sensor.wind'}]
+    }
+    store = FakeStore()
+    hass.apps['store'] = store
+    hass.time = time_of_day(hour=4)
+    hass.states['climate.test'] = {'state': 'Manual', 'attributes': {'temperature':18.0, 'current_temperature':20.5}}
+    hass.states['sensor.outside'] = {'state': 10.5}
+    hass.states['sensor.wind'] = {'state': 3.0}
+
+def sensor_update(entity_id, value):
+    old_state = hass.states[entity_id]
+    hass.states[entity_id] = {'state': value}
+    hass.trigger_state_callback(entity_id, None, old_state['state'], value)
+
+def test_small_sensor_changes_dropped():
+    store.data['test'] = {'datapoints': list(DATAPOINTS)}
+    zone = ZoneImpl(hass, store)
+    assert abs(zone._sensor_thresholds[0] - 1 / 60.) < 1e-3 # pylint: disable=protected-access
+    hass.trigger_event_callback('smartclimate.set_preheat',
+                                {'zone': 'test', 'name': 'prediction', 'type': 'sensor', 'target_temp': 21})
+    assert hass.set_states['sensor.prediction']['state'] == 2400
+
+    sensor_update('sensor.outside', 10.5)
+    writes = len(hass.set_state_calls)
+    for value in (10.505, 10.51, 10.5):
+        sensor_update('sensor.outside', value)
+    assert len(hass.set_state_calls) == writes
+
+    # small changes add up against the last value acted on
+    sensor_update('sensor.outside', 10.52)
+    sensor_update('sensor.outside', 10.53)
+    assert len(hass.set_state_calls) == writes + 1
+    sensor_update('sensor.outside', 0.5)
+    assert hass.set_states['sensor.prediction']['state'] == 3000
+
+def test_unused_sensor_ignored():
+    store.data['test'] = {'datapoints': list(DATAPOINTS)}
+    ZoneImpl(hass, store)
+    hass.trigger_event_callback('smartclimate.set_preheat',
+                                {'zone': 'test', 'name': 'prediction', 'type': 'sensor', 'target_temp': 21})
+    sensor_update('sensor.wind', 5.0)
+    writes = len(hass.set_state_calls)
+    sensor_update('sensor.wind', 20.0)
+    assert len(hass.set_state_calls) == writes
+
+def test_thresholds_follow_learning():
+    store.data['test'] = {'datapoints': DATAPOINTS[:3]}
+    zone = ZoneImpl(hass, store)
+    assert zone._sensor_thresholds == [None, None] # pylint: disable=protected-access
+    zone.add_datapoint(21.0, 20.0, [('outside', 16.0)], 2940.0)
+    assert abs(zone._sensor_thresholds[0] - 1 / 60.) < 1e-3 # pylint: disable=protected-access
+
+def test_exponential_sensitivities():
+    hass.args['predictor'] = 'exponential'
+    store.data['test'] = {'datapoints': DATAPOINTS * 3}
+    zone = ZoneImpl(hass, store)
+    sensitivities = zone.predictor.sensitivities()
+    assert list(sensitivities) == ['outside']
+    assert sensitivities['outside'] > 0.
@@ -163,3 +163,20 @@ def test_preheat_sensor_with_sensor_updates_on_sensor_change():
     hass.trigger_state_callback('sensor.test', None, old_state, new_state)
 
     assert hass.set_states['sensor.prediction'] == {'state': 2400, 'attributes': {'target_temp': 21.0}}
+
+def test_preheat_sensor_with_confidence_interval():
+    hass.time = time_of_day(hour=4)
+    hass.states['climate.test'] = {'state': 'Manual', 'attributes': {'temperature':18.0, 'current_temperature':20.5}}
+    datapoints = [{'start_temp':18.0, 'target_temp':19.0, 'duration_s':2600.0, 'sensor_readings':[]},
+                  {'start_temp':19.0, 'target_temp':20.0, 'duration_s':2800.0, 'sensor_readings':[]},
+                  {'start_temp':18.0, 'target_temp':20.0, 'duration_s':4500.0, 'sensor_readings':[]},
+                  {'start_temp':17.0, 'target_temp':20.0, 'duration_s':6400.0, 'sensor_readings':[]},
+                  {'start_temp':19.0, 'target_temp':21.0, 'duration_s':4400.0, 'sensor_readings':[]}]
+    store.data['test'] = {'datapoints': datapoints}
+    ZoneImpl(hass, store)
+    hass.trigger_event_callback('smartclimate.set_preheat',
+                                {'zone': 'test', 'name': 'prediction', 'type': 'sensor', 'target_temp': 21,
+                                 'confidence': 0.9})
+    state = hass.set_states['sensor.prediction']
+    assert state['attributes']['confidence'] == 0.9
+    assert state['attributes']['lower'] < state['state'] < state['attributes']['upper']
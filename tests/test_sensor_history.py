@@ -0,0 +1,80 @@
+'''
+Tests sensor history buffers and smoothed sensor readings
+
+All tests assume following formula for time to heat:
+t = 1800(g - s) + 60(s - o) + 900
+    = 1800g - 1740s - 60o + 900
+
+where t = time to heat in seconds
+        g = goal temperature in *C
+        s = starting temperature in *C
+        o = outside temperature in *C
+'''
+from sensorhistory import SensorHistory
+from zoneimpl import ZoneImpl
+from .common import FakeStore, FakeHass, time_of_day
+
+# pylint: disable=global-statement
+# pylint: disable=invalid-name
+hass = None
+store = None
+
+def setup_function():
+    '''Initialize values for this test case class.'''
+    global hass, store
+    hass = FakeHass()
+    hass.args = {
+        'store': 'store',
+        'entity_id': 'climate.test'
+    }
+    store = FakeStore()
+    hass.apps['store'] = store
+
+def test_rolling_statistics():
+    history = SensorHistory(3)
+    for i, value in enumerate([5., 1., 3., 4., 2.]):
+        history.append(i * 60., value)
+    assert len(history) == 3
+    assert history.latest == 2.
+    assert history.mean == 3.
+    assert history.min == 2.
+    assert history.max == 4.
+    timestamps, values = history.readings()
+    assert list(timestamps) == [120., 180., 240.]
+    assert list(values) == [3., 4., 2.]
+
+def test_ewma_weights_by_elapsed_time():
+    history = SensorHistory(10, ewma_tau_s=60.)
+    history.append(0., 10.)
+    history.append(1., 20.)
+    assert 10. < history.ewma < 11.
+    history.append(6000., 20.)
+    assert abs(history.ewma - 20.) < 1e-6
+
+def test_empty_history():
+    history = SensorHistory(3)
+    assert len(history) == 0
+    assert history.mean is None
+    assert history.min is None
+
+def test_smoothed_sensor_reading_ignores_spike():
+    hass.time = time_of_day(hour=4)
+    hass.args['sensors'] = [{'entity_id': 'sensor.test', 'smoothing': 'mean'}]
+    hass.states['climate.test'] = {'state': 'Manual', 'attributes': {'temperature':18.0, 'current_temperature':20.5}}
+    datapoints = [{'start_temp':18.0, 'target_temp':19.0, 'duration_s':3060.0,
+                   'sensor_readings':[('sensor.test', 12.0)]},
+                  {'start_temp':19.0, 'target_temp':20.0, 'duration_s':3060.0,
+                   'sensor_readings':[('sensor.test', 13.0)]},
+                  {'start_temp':18.0, 'target_temp':20.0, 'duration_s':5100.0,
+                   'sensor_readings':[('sensor.test', 8.0)]},
+                  {'start_temp':20.0, 'target_temp':21.0, 'duration_s':2940.0,
+                   'sensor_readings':[('sensor.test', 16.0)]}]
+    store.data['test'] = {'datapoints': datapoints}
+    ZoneImpl(hass, store)
+
+    hass.trigger_state_callback('sensor.test', None, None, {'state': '10.0'})
+    hass.trigger_state_callback('sensor.test', None, None, {'state': '11.0'})
+    hass.states['sensor.test'] = {'state': 30.0}
+    hass.trigger_event_callback('smartclimate.set_preheat',
+                                {'zone': 'test', 'name': 'prediction', 'type': 'sensor', 'target_temp': 21})
+    assert hass.set_states['sensor.prediction'] == {'state': 2400, 'attributes': {'target_temp': 21.0}}
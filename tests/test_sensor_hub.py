@@ -0,0 +1,94 @@
+'''
+Tests sensors shared between zones through a SensorHub
+
+All tests assume following formula for time to heat:
+t = 1800(g - s) + 60(s - o) + 900
+    = 1800g - 1740s - 60o + 900
+
+where t = time to heat in seconds
+        g = goal temperature in *C
+        s = starting temperature in *C
+        o = outside temperature in *C
+'''
+from sensorhubimpl import SensorHubImpl
+from zoneimpl import ZoneImpl
+from .common import FakeStore, FakeHass, time_of_day
+
+# pylint: disable=global-statement
+# pylint: disable=invalid-name
+hub_hass = None
+hub = None
+store = None
+
+class CountingHass(FakeHass):
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+
+    def get_state(self, entity_id, attribute=None):
+        self.reads += 1
+        return super().get_state(entity_id, attribute)
+
+def setup_function():
+    '''Initialize values for this test case class.'''
+    global hub_hass, hub, store
+    hub_hass = CountingHass()
+    hub_hass.name = 'hub'
+    hub_hass.states['sensor.outside'] = {'state': '10'}
+    hub = SensorHubImpl(hub_hass)
+    store = FakeStore()
+    datapoints = [{'start_temp':18.0, 'target_temp':19.0, 'duration_s':3060.0,
+                   'sensor_readings':[('sensor.outside', 12.0)]},
+                  {'start_temp':19.0, 'target_temp':20.0, 'duration_s':3060.0,
+                   'sensor_readings':[('sensor.outside', 13.0)]},
+                  {'start_temp':18.0, 'target_temp':20.0, 'duration_s':5100.0,
+                   'sensor_readings':[('sensor.outside', 8.0)]},
+                  {'start_temp':20.0, 'target_temp':21.0, 'duration_s':2940.0,
+                   'sensor_readings':[('sensor.outside', 16.0)]}]
+    store.data['lounge'] = {'datapoints': list(datapoints)}
+    store.data['bedroom'] = {'datapoints': list(datapoints)}
+
+def make_zone(name, zones=None):
+    hass = FakeHass()
+    hass.name = name
+    hass.time = time_of_day(hour=4)
+    hass.args = {'store': 'store', 'entity_id': 'climate.' + name, 'sensors': [{'entity_id': 'sensor.outside'}]}
+    hass.states['climate.' + name] = {'state': 'Manual',
+                                      'attributes': {'temperature':18.0, 'current_temperature':20.5}}
+    zone = ZoneImpl(hass, store, sensor_hub=hub)
+    if zones is not None:
+        zones.append(zone)
+    hass.trigger_event_callback('smartclimate.set_preheat',
+                                {'zone': name, 'name': name, 'type': 'sensor', 'target_temp': 21})
+    return hass
+
+def test_zones_share_one_subscription_and_reading():
+    lounge = make_zone('lounge')
+    bedroom = make_zone('bedroom')
+    assert list(hub_hass._state_listeners) == ['sensor.outside'] # pylint: disable=protected-access
+    assert not lounge._state_listeners.get('sensor.outside') # pylint: disable=protected-access
+    assert hub_hass.reads == 1
+    assert lounge.set_states['sensor.lounge']['state'] == 2430
+    assert bedroom.set_states['sensor.bedroom']['state'] == 2430
+
+def test_update_fans_out_to_zones():
+    lounge = make_zone('lounge')
+    bedroom = make_zone('bedroom')
+    hub_hass.trigger_state_callback('sensor.outside', None, {'state': '10'}, {'state': '10.5'})
+    assert hub_hass.reads == 1
+    # each zone handles the update on its own thread
+    assert lounge.set_states['sensor.lounge']['state'] == 2430
+    lounge.advance_time(lounge.time)
+    bedroom.advance_time(bedroom.time)
+    assert lounge.set_states['sensor.lounge']['state'] == 2400
+    assert bedroom.set_states['sensor.bedroom']['state'] == 2400
+
+def test_terminated_zone_is_unsubscribed():
+    zones = []
+    lounge = make_zone('lounge')
+    bedroom = make_zone('bedroom', zones)
+    zones[0].terminate()
+    hub_hass.trigger_state_callback('sensor.outside', None, {'state': '10'}, {'state': '10.5'})
+    assert bedroom.pending_timers() == 0
+    lounge.advance_time(lounge.time)
+    assert lounge.set_states['sensor.lounge']['state'] == 2400
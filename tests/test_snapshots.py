@@ -0,0 +1,89 @@
+'''
+Tests copy-on-write datapoint snapshots, which readers take without the store lock
+'''
+import pickle
+from threading import Thread
+from sqlitestore import SqliteDataStoreImpl
+from zoneimpl import ZoneImpl
+from .common import FakeStore, FakeHass, time_of_day
+
+# pylint: disable=invalid-name
+
+def datapoint(start, target, duration):
+    return {'start_temp': start, 'target_temp': target, 'duration_s': duration, 'sensor_readings': []}
+
+DATAPOINTS = [datapoint(18., 19., 2700.), datapoint(19., 20., 2700.), datapoint(18., 20., 4500.)]
+
+def test_snapshot_is_unchanged_by_writes():
+    store = FakeStore()
+    store.data['test'] = {'datapoints': list(DATAPOINTS)}
+    before = store.snapshot('test')
+    after = store.add_datapoint('test', datapoint(17., 20., 6300.))
+    assert len(before) == 3 and len(after) == 4
+    assert after.version == before.version + 1
+    assert store.snapshot('test') is after
+    assert store.data['test']['datapoints'] == list(after)
+    assert store.saved
+
+def test_pickled_snapshot_drops_source():
+    store = FakeStore()
+    store.data['test'] = {'datapoints': list(DATAPOINTS)}
+    snapshot = store.add_datapoint('test', datapoint(17., 20., 6300.))
+    copy = pickle.loads(pickle.dumps(snapshot))
+    assert copy == snapshot and copy.version == snapshot.version
+    assert copy._source is None # pylint: disable=protected-access
+
+def test_snapshot_does_not_take_lock():
+    store = FakeStore()
+    store.data['test'] = {'datapoints': list(DATAPOINTS)}
+    current = store.snapshot('test')
+    snapshots = []
+    with store.lock:
+        reader = Thread(target=lambda: snapshots.append(store.snapshot('test')))
+        reader.start()
+        reader.join(timeout=5)
+    assert snapshots == [current]
+
+def test_direct_appends_are_noticed():
+    store = FakeStore()
+    store.data['test'] = {'datapoints': list(DATAPOINTS)}
+    before = store.snapshot('test')
+    store.data['test']['datapoints'].append(datapoint(17., 20., 6300.))
+    after = store.snapshot('test')
+    assert len(before) == 3 and len(after) == 4 and after.version > before.version
+    store.data['test'] = {'datapoints': []}
+    assert len(store.snapshot('test')) == 0
+
+def test_concurrent_writer():
+    store = FakeStore()
+    writer = Thread(target=lambda: [store.add_datapoint('test', datapoint(18., 19., 2700. + i)) for i in range(500)])
+    writer.start()
+    while writer.is_alive():
+        snapshot = store.snapshot('test')
+        assert [dp['duration_s'] for dp in snapshot] == [2700. + i for i in range(len(snapshot))]
+    writer.join()
+    assert len(store.snapshot('test')) == 500
+
+def test_sqlite_snapshot(tmp_path):
+    store_hass = FakeHass()
+    store_hass.args = {'data_file': str(tmp_path / 'smartclimate.db')}
+    store = SqliteDataStoreImpl(store_hass)
+    store.add_datapoints('test', DATAPOINTS)
+    before = store.snapshot('test')
+    after = store.add_datapoint('test', datapoint(17., 20., 6300.))
+    assert len(before) == 3 and len(list(before)) == 3 and len(before.recent(limit=5)) == 3
+    assert len(after) == 4 and after.version > before.version
+    assert before[-1]['duration_s'] == 4500.
+
+def test_zone_learns_from_snapshot():
+    store = FakeStore()
+    store.data['test'] = {'datapoints': list(DATAPOINTS)}
+    hass = FakeHass()
+    hass.time = time_of_day(hour=4)
+    hass.args = {'store': 'store', 'entity_id': 'climate.test'}
+    hass.states['climate.test'] = {'state': 'Manual', 'attributes': {'temperature': 18.0, 'current_temperature': 18.0}}
+    zone = ZoneImpl(hass, store)
+    version = store.snapshot('test').version
+    zone.add_datapoint(21., 18., [], 6300.)
+    assert store.snapshot('test').version == version + 1
+    assert len(store.data['test']['datapoints']) == 4
@@ -0,0 +1,136 @@
+'''
+Tests the SQLite data store backend
+'''
+import sqlite3
+import pytest
+from sqlitestore import SqliteDataStoreImpl
+from zoneimpl import ZoneImpl
+from .common import FakeHass, relative_time, time_of_day
+
+# pylint: disable=invalid-name
+
+def make_store(tmp_path):
+    store_hass = FakeHass()
+    store_hass.args = {'data_file': str(tmp_path / 'smartclimate.db')}
+    return SqliteDataStoreImpl(store_hass)
+
+def make_hass():
+    hass = FakeHass()
+    hass.args = {
+        'store': 'store',
+        'entity_id': 'climate.test'
+    }
+    return hass
+
+def datapoint(start, target, duration):
+    return {'start_temp': start, 'target_temp': target, 'duration_s': duration, 'sensor_readings': []}
+
+def test_records_datapoint_as_row(tmp_path):
+    store = make_store(tmp_path)
+    hass = make_hass()
+    ZoneImpl(hass, store)
+
+    old_state = {'state': 'Smart Schedule', 'attributes': {'temperature': 18., 'current_temperature' : 18.}}
+    new_state = {'state': 'Manual', 'attributes': {'temperature': 20., 'current_temperature' : 18.}}
+    hass.trigger_state_callback('climate.test', None, old_state, new_state)
+    old_state = new_state
+    new_state = {'state': 'Smart Schedule', 'attributes' :{'temperature': 20., 'current_temperature' : 20.}}
+    hass.time = relative_time(5100)
+    hass.trigger_state_callback('climate.test', None, old_state, new_state)
+
+    datapoints = store.data['test']['datapoints']
+    assert len(datapoints) == 1
+    assert {key: value for key, value in datapoints[0].items() if key != 'completed_at'} == \
+        {'start_temp': 18., 'target_temp': 20., 'sensor_readings': [], 'duration_s': 5100.0}
+
+def test_data_survives_reopening(tmp_path):
+    store = make_store(tmp_path)
+    store.data['test'] = {'datapoints': [datapoint(18., 19., 2700.), datapoint(19., 20., 2700.)]}
+    store.data['test']['datapoints'].append(
+        {'start_temp': 18., 'target_temp': 20., 'duration_s': 4500., 'sensor_readings': [('outside', 5.)]})
+    store.save()
+    store.close()
+
+    store = make_store(tmp_path)
+    assert 'test' in store.data
+    assert list(store.data) == ['_version', 'test']
+    datapoints = list(store.data['test']['datapoints'])
+    assert [dp['duration_s'] for dp in datapoints] == [2700., 2700., 4500.]
+    assert datapoints[2]['sensor_readings'] == [('outside', 5.)]
+
+def test_recent_datapoints(tmp_path):
+    store = make_store(tmp_path)
+    points = [dict(datapoint(18., 19., 1000. + i), completed_at=1000. + i) for i in range(10)]
+    store.add_datapoints('test', points)
+    assert [dp['duration_s'] for dp in store.recent('test', limit=3)] == [1007., 1008., 1009.]
+    assert [dp['duration_s'] for dp in store.query('test', since=1008.)] == [1008., 1009.]
+    assert store.data['test']['datapoints'][-1]['duration_s'] == 1009.
+
+def test_zone_learns_from_limited_history(tmp_path):
+    store = make_store(tmp_path)
+    store.data['test'] = {'datapoints': [datapoint(10., 30., 100000.)] * 5 +
+                                        [datapoint(18., 19., 2700.), datapoint(19., 20., 2700.),
+                                         datapoint(18., 20., 4500.)]}
+    hass = make_hass()
+    hass.args['learn_limit'] = 3
+    hass.time = time_of_day(hour=4)
+    hass.states['climate.test'] = {'state': 'Manual', 'attributes': {'temperature':18.0, 'current_temperature':20.5}}
+    zone = ZoneImpl(hass, store)
+    assert zone.predict(21) == 1800
+
+def test_zone_size(tmp_path):
+    store = make_store(tmp_path)
+    store.add_datapoints('test', [datapoint(18., 20., 5100.)] * 3)
+    size = store.zone_size('test')
+    assert size['datapoints'] == 3 and size['serialized_bytes'] > 0
+    assert store.zone_size('missing') == {'datapoints': 0, 'memory_bytes': 0, 'serialized_bytes': 0}
+
+def test_failed_write_rolls_back(tmp_path):
+    store = make_store(tmp_path)
+    store.add_datapoints('test', [datapoint(18., 19., 2700.)])
+    with pytest.raises(sqlite3.IntegrityError):
+        store.add_datapoints('test', [datapoint(19., 20., 2700.), datapoint(None, 20., 2700.)])
+    assert store.count('test') == 1
+    # every pooled connection, including the one that failed, can still write
+    for _ in range(5):
+        store.add_datapoints('test', [datapoint(18., 20., 4500.)])
+    assert store.count('test') == 6
+
+class FailingCommit:
+    '''connection whose COMMITs fail while fail is set'''
+    def __init__(self, conn):
+        self.conn = conn
+        self.fail = True
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+    def execute(self, sql, *args):
+        if sql == 'COMMIT' and self.fail:
+            raise sqlite3.OperationalError('database is locked')
+        return self.conn.execute(sql, *args)
+
+def test_failed_commit_rolls_back(tmp_path):
+    store = make_store(tmp_path)
+    store.add_datapoints('test', [datapoint(18., 19., 2700.)])
+    pool = store._pool # pylint: disable=protected-access
+    conns = [FailingCommit(pool.get()) for _ in range(pool.qsize())]
+    for conn in conns:
+        pool.put(conn)
+    with pytest.raises(sqlite3.OperationalError):
+        store.add_datapoints('test', [datapoint(19., 20., 2700.)])
+    assert not any(conn.in_transaction for conn in conns)
+    assert store.count('test') == 1
+    for conn in conns:
+        conn.fail = False
+    store.add_datapoints('test', [datapoint(19., 20., 2700.)])
+    assert store.count('test') == 2
+
+def test_replacing_datapoints_is_one_transaction(tmp_path):
+    store = make_store(tmp_path)
+    store.add_datapoints('test', [datapoint(18., 19., 2700.)])
+    with pytest.raises(sqlite3.IntegrityError):
+        store.data['test']['datapoints'] = [datapoint(None, 20., 2700.)]
+    assert store.count('test') == 1
+    store.data['test']['datapoints'] = [datapoint(19., 20., 2700.), datapoint(18., 20., 4500.)]
+    assert store.count('test') == 2
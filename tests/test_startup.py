@@ -0,0 +1,63 @@
+'''
+Tests zone startup: light imports and fitting off AppDaemon's initialise thread
+
+Uses t = 1800(g - s) + 900 with no sensors, see test_sensor.
+'''
+import subprocess
+import sys
+from os import path
+from zoneimpl import ZoneImpl
+from .common import FakeStore, FakeHass, time_of_day
+
+# pylint: disable=invalid-name
+
+DATAPOINTS = [{'start_temp':18.0, 'target_temp':19.0, 'duration_s':2700.0, 'sensor_readings':[]},
+              {'start_temp':19.0, 'target_temp':20.0, 'duration_s':2700.0, 'sensor_readings':[]},
+              {'start_temp':18.0, 'target_temp':20.0, 'duration_s':4500.0, 'sensor_readings':[]}]
+
+def make_zone(name, store, **args):
+    hass = FakeHass()
+    hass.name = name
+    hass.time = time_of_day(hour=4)
+    hass.args = dict({'store': 'store', 'entity_id': 'climate.' + name}, **args)
+    hass.states['climate.' + name] = {'state': 'Manual',
+                                      'attributes': {'temperature':18.0, 'current_temperature':20.5}}
+    store.data[name] = {'datapoints': list(DATAPOINTS)}
+    return hass, ZoneImpl(hass, store)
+
+def test_imports_stay_light():
+    mod_path = path.join(path.dirname(path.realpath(__file__)), '../smartclimate')
+    code = 'import sys; sys.path.append({!r}); import zoneimpl, eventrouterimpl, sensorhubimpl, sqlitestore; ' \
+           'print(sorted(name for name in ("numpy", "scipy", "sklearn") if name in sys.modules))'.format(mod_path)
+    output = subprocess.run([sys.executable, '-c', code], stdout=subprocess.PIPE, check=True).stdout
+    assert output.decode().strip() == '[]'
+
+def test_background_fit():
+    store = FakeStore()
+    hass, zone = make_zone('test', store, background_fit=True)
+    hass.trigger_event_callback('smartclimate.set_preheat',
+                                {'zone': 'test', 'name': 'prediction', 'type': 'sensor', 'target_temp': 21})
+    assert zone.wait_fitted(timeout=30)
+    # installed on the zone's own callback path, then preheats are updated
+    assert hass.set_states['sensor.prediction']['state'] == ZoneImpl.default_preheat
+    hass.advance_time(time_of_day(4, 0, 1))
+    assert hass.set_states['sensor.prediction']['state'] == 1800
+
+def test_zones_fit_concurrently():
+    store = FakeStore()
+    zones = [make_zone('zone{}'.format(i), store, background_fit=True) for i in range(4)]
+    for hass, zone in zones:
+        assert zone.wait_fitted(timeout=30)
+        hass.advance_time(time_of_day(4, 0, 1))
+        assert zone.predict(21.) == 1800
+
+def test_newer_datapoints_are_caught_up():
+    store = FakeStore()
+    hass, zone = make_zone('test', store, background_fit=True)
+    assert zone.wait_fitted(timeout=30)
+    # a datapoint completed before the background fit was installed
+    zone.add_datapoint(21., 18., [], 6300.)
+    learned = zone.predictor.predict(22., 20.5, [])
+    hass.advance_time(time_of_day(4, 0, 1))
+    # the background fit is caught up on the newer datapoints before it is installed
+    assert zone.predict(22.) == learned
@@ -0,0 +1,49 @@
+'''
+Tests the synthetic thermal data generator
+'''
+import numpy as np
+from zoneimpl import ZoneImpl
+from .common import FakeStore, FakeHass
+from .synthetic import random_zones, heatup_duration, datapoint_arrays, to_datapoints, simulate, \
+    heatup_datapoints, state_events, drive
+
+def test_heatup_duration():
+    # equilibrium 20 + 0.002/0.0001 = 40, so ln(20/10) / 0.0001
+    assert abs(heatup_duration(0.002, 1e-4, 20., 30., 20.) - np.log(2) * 1e4) < 1e-6
+    assert heatup_duration(0.002, 1e-4, 20., 45., 20.) == np.inf
+
+def test_datapoint_arrays_scale():
+    zones = random_zones(100)
+    arrays = datapoint_arrays(1000000, zones=zones, noise_s=0.)
+    assert 900000 < len(arrays['duration_s']) <= 1000000
+    assert (arrays['duration_s'] > 0).all()
+    assert set(np.unique(arrays['zone'])) == set(range(100))
+
+    arrays = datapoint_arrays(50, zones=zones, seed=1)
+    datapoints = to_datapoints(arrays, zone=arrays['zone'][0])
+    assert datapoints and all(len(datapoint['sensor_readings']) == 1 for datapoint in datapoints)
+
+def test_simulation_holds_setpoint():
+    zones = random_zones(20)
+    simulation = simulate(zones, days=2)
+    assert simulation['current_temp'].shape == (2 * 1440, 20)
+    evening = simulation['time_s'] % 86400 == 21 * 3600
+    assert np.allclose(simulation['current_temp'][evening], 21., atol=0.2)
+    assert len(heatup_datapoints(zones, simulation, 0)) == 2
+
+def test_zone_learns_ground_truth():
+    zones = random_zones(1, seed=2)
+    simulation = simulate(zones, days=3)
+    hass = FakeHass()
+    hass.args = {'store': 'store', 'entity_id': 'climate.test',
+                 'sensors': [{'name': 'outside', 'entity_id': 'sensor.outside'}]}
+    store = FakeStore()
+    ZoneImpl(hass, store)
+    drive(hass, state_events(simulation, 0, 'climate.test', 'sensor.outside'))
+
+    learned = store.data['test']['datapoints']
+    truth = heatup_datapoints(zones, simulation, 0)
+    assert len(learned) == len(truth) == 3
+    for datapoint, expected in zip(learned, truth):
+        assert datapoint['target_temp'] == expected['target_temp']
+        assert abs(datapoint['duration_s'] - expected['duration_s']) < 0.1 * expected['duration_s']
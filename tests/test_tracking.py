@@ -13,6 +13,7 @@ where t = time to heat in seconds
 for tests with no o, s == o
 '''
 from copy import deepcopy
+from heatcurve import HeatCurve
 from zoneimpl import ZoneImpl
 from .common import FakeStore, FakeHass, relative_time
 
@@ -249,3 +250,41 @@ def test_doesnt_record_missing_sensor_reading():
 
     assert store.saved is False
     assert store.data == initial_data
+
+def test_records_heat_up_curve():
+    '''Test intermediate temperatures are stored with the datapoint when enabled'''
+    hass.args['curve_points'] = 4
+    ZoneImpl(hass, store)
+
+    old_state = {'state': 'Smart Schedule', 'attributes': {'temperature': 18., 'current_temperature' : 18.}}
+    new_state = {'state': 'Manual', 'attributes': {'temperature': 20., 'current_temperature' : 18.}}
+    hass.trigger_state_callback('climate.test', None, old_state, new_state)
+
+    for i, temp in enumerate([18.25, 18.5, 18.75, 19., 19.25, 19.5, 19.75]):
+        old_state = new_state
+        new_state = {'state': 'Manual', 'attributes': {'temperature': 20., 'current_temperature' : temp}}
+        hass.time = relative_time(600 * (i + 1))
+        hass.trigger_state_callback('climate.test', None, old_state, new_state)
+
+    old_state = new_state
+    new_state = {'state': 'Manual', 'attributes': {'temperature': 20., 'current_temperature' : 20.}}
+    hass.time = relative_time(5100)
+    hass.trigger_state_callback('climate.test', None, old_state, new_state)
+
+    datapoint = store.data['test']['datapoints'][0]
+    assert datapoint['duration_s'] == 5100.0
+    curve = HeatCurve.decode(datapoint['curve'])
+    assert len(curve) <= 4
+    assert tuple(curve[0]) == (0., 18.)
+    assert tuple(curve[-1]) == (5100., 20.)
+    assert list(curve[:, 0]) == sorted(curve[:, 0])
+
+def test_heat_curve_is_bounded():
+    '''Test a long session decimates to the buffer capacity'''
+    curve = HeatCurve(8)
+    for i in range(1000):
+        curve.append(float(i), 18. + i / 1000.)
+    samples = curve.samples()
+    assert len(samples) <= 8
+    assert samples[0][0] == 0.
+    assert samples[-1][0] >= 1000 - 1000 // 4
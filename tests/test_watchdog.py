@@ -0,0 +1,94 @@
+'''
+Tests shedding load when zone callbacks fall behind
+
+Uses t = 1800(g - s) + 900 with no sensors, see test_sensor.
+'''
+from datetime import timedelta, timezone
+from zoneimpl import ZoneImpl
+from .common import FakeStore, FakeHass, time_of_day
+
+# pylint: disable=global-statement
+# pylint: disable=invalid-name
+hass = None
+store = None
+
+def setup_function():
+    '''Initialize values for this test case class.'''
+    global hass, store
+    hass = FakeHass()
+    hass.args = {
+        'store': 'store',
+        'entity_id': 'climate.test',
+        'load_shedding': {'delay_s': 5, 'coalesce_s': 30, 'urgent_s': 600}
+    }
+    store = FakeStore()
+    hass.apps['store'] = store
+    store.data['test'] = {'datapoints': [
+        {'start_temp':18.0, 'target_temp':19.0, 'duration_s':2700.0, 'sensor_readings':[]},
+        {'start_temp':19.0, 'target_temp':20.0, 'duration_s':2700.0, 'sensor_readings':[]},
+        {'start_temp':18.0, 'target_temp':20.0, 'duration_s':4500.0, 'sensor_readings':[]}]}
+
+def climate_update(current_temp, delay_s):
+    '''set the climate entity's current temperature and deliver the update delay_s late'''
+    old_state = hass.states['climate.test']
+    new_state = {'state': 'Manual', 'attributes': {'temperature':18.0, 'current_temperature':current_temp},
+                 'last_updated': (hass.time - timedelta(seconds=delay_s)).astimezone(timezone.utc).isoformat()}
+    hass.states['climate.test'] = new_state
+    hass.trigger_state_callback('climate.test', None, old_state, new_state)
+
+def test_sensor_publishes_deferred_when_overloaded():
+    hass.time = time_of_day(hour=4)
+    hass.states['climate.test'] = {'state': 'Manual', 'attributes': {'temperature':18.0, 'current_temperature':20.5}}
+    zone = ZoneImpl(hass, store)
+    hass.trigger_event_callback('smartclimate.set_preheat',
+                                {'zone': 'test', 'name': 'prediction', 'type': 'sensor', 'target_temp': 21})
+    assert hass.set_states['sensor.prediction']['state'] == 1800
+
+    climate_update(20.0, delay_s=0)
+    assert hass.set_states['sensor.prediction']['state'] == 2700
+
+    # the late update is still handled, then the zone is overloaded
+    climate_update(19.5, delay_s=60)
+    assert hass.set_states['sensor.prediction']['state'] == 3600
+    assert zone.metrics()['watchdog']['overloaded']
+    climate_update(19.2, delay_s=60)
+    climate_update(19.0, delay_s=60)
+    assert hass.set_states['sensor.prediction']['state'] == 3600
+    assert hass.pending_timers() == 1
+
+    hass.advance_time(time_of_day(4, 0, 30))
+    assert hass.set_states['sensor.prediction']['state'] == 4500
+    assert zone.metrics()['watchdog']['shed'] == 2
+
+def test_urgent_events_update_when_overloaded():
+    hass.time = time_of_day(6, 25)
+    hass.states['climate.test'] = {'state': 'Manual', 'attributes': {'temperature':18.0, 'current_temperature':20.5}}
+    ZoneImpl(hass, store)
+    hass.trigger_event_callback('smartclimate.set_preheat',
+                                {'zone': 'test', 'name': 'soon', 'type': 'event',
+                                 'target_temp': '21', 'target_time': '07:00'})
+    hass.trigger_event_callback('smartclimate.set_preheat',
+                                {'zone': 'test', 'name': 'later', 'type': 'event',
+                                 'target_temp': '21', 'target_time': '09:00'})
+
+    climate_update(20.5, delay_s=60)
+    climate_update(19.5, delay_s=60)
+    started = [event['data']['name'] for event in hass.fired_events if event['event'] == 'smartclimate.start_preheat']
+    assert started == ['soon']
+
+    # the deferred refresh moves the later event's timer from 08:30 to 08:00
+    hass.advance_time(time_of_day(8, 5))
+    started = [event['data']['name'] for event in hass.fired_events if event['event'] == 'smartclimate.start_preheat']
+    assert started == ['soon', 'later']
+
+def test_no_shedding_without_delay():
+    hass.time = time_of_day(hour=4)
+    hass.states['climate.test'] = {'state': 'Manual', 'attributes': {'temperature':18.0, 'current_temperature':20.5}}
+    zone = ZoneImpl(hass, store)
+    hass.trigger_event_callback('smartclimate.set_preheat',
+                                {'zone': 'test', 'name': 'prediction', 'type': 'sensor', 'target_temp': 21})
+    for temp in (20.0, 19.5, 19.0):
+        climate_update(temp, delay_s=1)
+    assert hass.set_states['sensor.prediction']['state'] == 4500
+    assert not zone.metrics()['watchdog']['overloaded']
+    assert hass.pending_timers() == 0